@@ -0,0 +1,93 @@
+"""
+Per-cycle batching and cooldown rate limiting of alert events.
+
+Alerts fired anywhere during an evaluation cycle are queued here and sent as
+one batched event per kind when the cycle ends, instead of one Socket.IO
+broadcast per alert. System alerts additionally pass through cooldowns: a
+per-type cooldown on each (symbol, type) pair and an optional per-symbol
+cooldown across all types.
+
+Every queued alert gets a trace of {'source', 'ingest', 'evaluate', 'emit'}:
+where its start time comes from, that start time, when the alert was queued
+and (set by the flush) when it was broadcast. Alerts evaluated on live ticks
+start at the ingest time of the symbol's tick ('tick'); scheduled checks such
+as range scans and volume spikes start when the scan started ('scan'). Traces
+are kept next to the alerts rather than in them, so the stored alerts stay
+clean; the flush sends each client a copy of the alert with its trace.
+"""
+
+import time
+import threading
+
+
+class AlertDispatcher:
+    """Collects alerts during a cycle and flushes them as batched events."""
+
+    def __init__(self, type_cooldowns=None, default_cooldown=0, symbol_cooldown=0):
+        self.type_cooldowns = dict(type_cooldowns or {})  # {alert type: seconds}
+        self.default_cooldown = default_cooldown          # seconds, for types not listed
+        self.symbol_cooldown = symbol_cooldown            # seconds between any two alerts of a symbol
+        self._lock = threading.Lock()
+        self._last_by_pair = {}    # {(symbol, type): last emitted time}
+        self._last_by_symbol = {}  # {symbol: last emitted time}
+        self._system_alerts = []   # [(alert, setting, trace)]
+        self._triggered = []       # [(event, trace)]
+        self._changed = {}         # {alert id: alert} whose state changed this cycle
+        self._ticks = {}           # Ticks evaluated this cycle, for ingest timestamps
+        self.suppressed = 0
+
+    def allow(self, alert, now=None):
+        """Applies the cooldowns to a system alert; records it as emitted if allowed."""
+        now = time.time() if now is None else now
+        symbol, alert_type = alert['symbol'], alert['type']
+        cooldown = self.type_cooldowns.get(alert_type, self.default_cooldown)
+        with self._lock:
+            last = self._last_by_pair.get((symbol, alert_type))
+            if last is not None and now - last < cooldown:
+                self.suppressed += 1
+                return False
+            last = self._last_by_symbol.get(symbol)
+            if self.symbol_cooldown and last is not None and now - last < self.symbol_cooldown:
+                self.suppressed += 1
+                return False
+            self._last_by_pair[(symbol, alert_type)] = now
+            self._last_by_symbol[symbol] = now
+            return True
+
+    def begin_cycle(self, ticks):
+        """Sets the {symbol: tick} snapshot being evaluated; ticks carry an 'ingest_ts'."""
+        self._ticks = ticks
+
+    def _trace(self, symbol, scan_started=None):
+        if scan_started is not None:
+            return {'source': 'scan', 'ingest': scan_started, 'evaluate': time.time()}
+        tick = self._ticks.get(symbol)
+        return {
+            'source': 'tick',
+            'ingest': tick.get('ingest_ts') if isinstance(tick, dict) else None,
+            'evaluate': time.time(),
+        }
+
+    def add_system_alert(self, alert, setting, scan_started=None):
+        """
+        Queues a system alert; `setting` is the alert setting it is routed by. Alerts of a
+        scheduled scan pass the scan's start time, which their trace starts from.
+        """
+        trace = self._trace(alert['symbol'], scan_started)
+        with self._lock:
+            self._system_alerts.append((alert, setting, trace))
+
+    def add_triggered(self, event, alert=None):
+        """Queues a user alert trigger; `alert` is included in the next alert delta if its state changed."""
+        trace = self._trace(event['symbol'])
+        with self._lock:
+            self._triggered.append((event, trace))
+            if alert is not None:
+                self._changed[alert['id']] = alert
+
+    def take(self):
+        """Returns and clears everything queued: ([(system_alert, setting, trace)], [(event, trace)], changed_alerts)."""
+        with self._lock:
+            batch = (self._system_alerts, self._triggered, list(self._changed.values()))
+            self._system_alerts, self._triggered, self._changed = [], [], {}
+            return batch
@@ -0,0 +1,134 @@
+"""
+Bounded system alert history with symbol/type indexes and paging.
+
+Alerts live in a fixed-size ring buffer and are numbered with a
+monotonically increasing `seq`. Per-symbol and per-type indexes hold the seqs
+of the alerts still in the buffer, so a filtered page is read straight from
+the index instead of scanning the whole history. When the buffer is full the
+oldest alert is evicted (and optionally appended to a JSON-lines archive), so
+memory stays flat however long the session runs.
+"""
+
+import json
+import threading
+from collections import deque
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class AlertHistory:
+    """Ring buffer of system alerts, newest last, addressed by seq."""
+
+    def __init__(self, capacity=2000, archive_path=None):
+        self.capacity = capacity
+        self.archive_path = archive_path
+        self._lock = threading.Lock()
+        self._slots = [None] * capacity
+        self._next_seq = 1       # seq given to the next alert
+        self._by_symbol = {}     # {symbol: deque of seqs, oldest first}
+        self._by_type = {}       # {type: deque of seqs, oldest first}
+
+    def __len__(self):
+        return min(self._next_seq - 1, self.capacity)
+
+    @property
+    def latest_seq(self):
+        return self._next_seq - 1
+
+    @property
+    def oldest_seq(self):
+        return max(1, self._next_seq - self.capacity)
+
+    def _get(self, seq):
+        return self._slots[seq % self.capacity]
+
+    def add(self, alert):
+        """Appends an alert, stamping it with its seq; evicts the oldest alert when full."""
+        with self._lock:
+            seq = self._next_seq
+            evicted = self._slots[seq % self.capacity]
+            if evicted is not None:
+                self._unindex(evicted)
+                if self.archive_path:
+                    self._archive(evicted)
+
+            alert['seq'] = seq
+            self._slots[seq % self.capacity] = alert
+            self._by_symbol.setdefault(alert.get('symbol'), deque()).append(seq)
+            self._by_type.setdefault(alert.get('type'), deque()).append(seq)
+            self._next_seq += 1
+            return seq
+
+    def extend(self, alerts):
+        """Adds alerts given oldest first (e.g. warmed up from the database)."""
+        for alert in alerts:
+            self.add(alert)
+
+    def _unindex(self, alert):
+        # The evicted alert is always the oldest entry of its symbol and type indexes
+        for index, key in ((self._by_symbol, alert.get('symbol')), (self._by_type, alert.get('type'))):
+            seqs = index.get(key)
+            if seqs:
+                seqs.popleft()
+                if not seqs:
+                    del index[key]
+
+    def _archive(self, alert):
+        try:
+            with open(self.archive_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(alert, default=str) + '\n')
+        except OSError as e:
+            print(f"Error archiving system alert {alert.get('id')}: {e}")
+
+    def page(self, since=None, before=None, limit=DEFAULT_PAGE_SIZE, alert_type=None, symbol=None):
+        """
+        Returns one page of alerts, newest first.
+
+        since:  only alerts with seq > since (what a client has not seen yet)
+        before: only alerts with seq < before (scrolling back through older pages)
+        """
+        limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        with self._lock:
+            low = max(self.oldest_seq, (since or 0) + 1)
+            high = min(self.latest_seq, before - 1 if before else self.latest_seq)
+
+            if alert_type is not None or symbol is not None:
+                candidates = self._filtered_seqs(alert_type, symbol)
+            else:
+                candidates = range(high, low - 1, -1)
+
+            alerts = []
+            has_more = False
+            for seq in candidates:
+                if seq > high:
+                    continue
+                if seq < low:
+                    break
+                if len(alerts) == limit:
+                    has_more = True
+                    break
+                alerts.append(self._get(seq))
+
+            return {
+                'alerts': alerts,
+                'latest_seq': self.latest_seq,
+                'oldest_seq': self.oldest_seq if len(self) else 0,
+                'has_more': has_more,
+            }
+
+    def _filtered_seqs(self, alert_type, symbol):
+        """Seqs matching the filters, newest first, walking the smaller index."""
+        indexes = []
+        if alert_type is not None:
+            indexes.append(self._by_type.get(alert_type, ()))
+        if symbol is not None:
+            indexes.append(self._by_symbol.get(symbol, ()))
+        smallest = min(indexes, key=len)
+        for seq in reversed(smallest):
+            alert = self._get(seq)
+            if alert_type is not None and alert.get('type') != alert_type:
+                continue
+            if symbol is not None and alert.get('symbol') != symbol:
+                continue
+            yield seq
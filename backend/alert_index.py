@@ -0,0 +1,140 @@
+"""
+Per-symbol threshold index for user price alerts.
+
+Untriggered alerts are kept per symbol in two ascending threshold arrays, one
+for '>=' and one for '<='. A tick only bisects the arrays of its own symbol,
+so the cost is O(log n + fired) regardless of how many alerts exist in total.
+"""
+
+import math
+import threading
+from bisect import bisect_left, bisect_right
+
+SUPPORTED_OPERATORS = ('>=', '<=')
+
+
+class _ThresholdBook:
+    """Sorted thresholds (with parallel alert ids) for one symbol and operator."""
+
+    __slots__ = ('values', 'ids')
+
+    def __init__(self):
+        self.values = []
+        self.ids = []
+
+    def add(self, value, alert_id):
+        i = bisect_right(self.values, value)
+        self.values.insert(i, value)
+        self.ids.insert(i, alert_id)
+
+    def remove(self, value, alert_id):
+        i = bisect_left(self.values, value)
+        while i < len(self.values) and self.values[i] == value:
+            if self.ids[i] == alert_id:
+                del self.values[i]
+                del self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def pop_at_or_below(self, price):
+        """Removes and returns the ids of thresholds <= price (fired '>=' alerts)."""
+        k = bisect_right(self.values, price)
+        if not k:
+            return []
+        fired = self.ids[:k]
+        del self.values[:k]
+        del self.ids[:k]
+        return fired
+
+    def pop_at_or_above(self, price):
+        """Removes and returns the ids of thresholds >= price (fired '<=' alerts)."""
+        k = bisect_left(self.values, price)
+        if k == len(self.values):
+            return []
+        fired = self.ids[k:]
+        del self.values[k:]
+        del self.ids[k:]
+        return fired
+
+    def __len__(self):
+        return len(self.values)
+
+
+class AlertIndex:
+    """
+    The user alert book: an id map plus per-symbol threshold arrays.
+
+    Alerts are plain dicts ({'id', 'symbol', 'operator', 'value', 'triggered'})
+    so they can be sent to clients as-is. Triggered alerts stay in the id map
+    (clients still list them) but leave the threshold arrays.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_id = {}
+        self._books = {}  # {symbol: {'>=': _ThresholdBook, '<=': _ThresholdBook}}
+
+    def add(self, alert):
+        """Adds an alert dict. Raises ValueError for unsupported operators or non-finite values."""
+        if alert['operator'] not in SUPPORTED_OPERATORS:
+            raise ValueError(f"Unsupported operator '{alert['operator']}'")
+        # A NaN would break the sort order of the threshold arrays, infinities never fire
+        if not isinstance(alert['value'], (int, float)) or not math.isfinite(alert['value']):
+            raise ValueError(f"Alert value must be a finite number, got {alert['value']!r}")
+        with self._lock:
+            self._by_id[alert['id']] = alert
+            if not alert.get('triggered', False):
+                self._book(alert['symbol'], alert['operator']).add(alert['value'], alert['id'])
+
+    def remove(self, alert_id):
+        """Removes an alert by id. Returns the removed alert, or None if unknown."""
+        with self._lock:
+            alert = self._by_id.pop(alert_id, None)
+            if alert is None:
+                return None
+            if not alert.get('triggered', False):
+                books = self._books.get(alert['symbol'])
+                if books:
+                    books[alert['operator']].remove(alert['value'], alert_id)
+                    if not books['>='] and not books['<=']:
+                        del self._books[alert['symbol']]
+            return alert
+
+    def check(self, symbol, ltp):
+        """Marks and returns the alerts for symbol that fire at ltp."""
+        # Symbols without alerts never take the lock
+        if symbol not in self._books:
+            return []
+        with self._lock:
+            books = self._books.get(symbol)
+            if not books:
+                return []
+            fired_ids = books['>='].pop_at_or_below(ltp) + books['<='].pop_at_or_above(ltp)
+            if not fired_ids:
+                return []
+            if not books['>='] and not books['<=']:
+                self._books.pop(symbol, None)
+            fired = []
+            for alert_id in fired_ids:
+                alert = self._by_id[alert_id]
+                alert['triggered'] = True
+                fired.append(alert)
+            return fired
+
+    def get(self, alert_id):
+        return self._by_id.get(alert_id)
+
+    def alerts(self):
+        """All alerts in creation order, as sent in 'update_alerts'."""
+        with self._lock:
+            return list(self._by_id.values())
+
+    def _book(self, symbol, operator):
+        books = self._books.get(symbol)
+        if books is None:
+            books = self._books[symbol] = {'>=': _ThresholdBook(), '<=': _ThresholdBook()}
+        return books[operator]
+
+    def __len__(self):
+        return len(self._by_id)
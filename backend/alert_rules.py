@@ -0,0 +1,356 @@
+"""
+Compiled alert-rule expressions evaluated in batch over live snapshots.
+
+A rule is a small expression over live and static fields, e.g.
+
+    ltp > pdh and rvol > 3 and gap between 2 and 8
+
+Rules are parsed once into canonical expression trees. All active rules are
+compiled together into a single evaluation plan in which identical
+subexpressions (say `ltp > pdh` used by several rules) appear once, and the
+plan is run against the UniverseArrays columns as NumPy operations, once per
+snapshot.
+"""
+
+import re
+import threading
+
+import numpy as np
+
+# Expression field names -> UniverseArrays column names
+FIELD_ALIASES = {
+    'ltp': 'ltp',
+    'price': 'ltp',
+    'change': 'change',
+    'chp': 'change',
+    'volume': 'volume',
+    'high': 'high',
+    'low': 'low',
+    'open': 'open',
+    'pdh': 'pdh',
+    'pdl': 'pdl',
+    'pdc': 'pdc',
+    'pwh': 'pwh',
+    'pwl': 'pwl',
+    'pwc': 'pwc',
+    'pmh': 'pmh',
+    'pml': 'pml',
+    'pmc': 'pmc',
+    'gap': 'gap',
+    'newsweight': 'newsWeight',
+    'rvol': 'rvol',
+    'candle_volume': 'candle_volume',
+}
+
+COMPARISONS = {
+    '>': np.greater,
+    '>=': np.greater_equal,
+    '<': np.less,
+    '<=': np.less_equal,
+    '==': np.equal,
+    '!=': np.not_equal,
+}
+
+ARITHMETIC = {
+    '+': np.add,
+    '-': np.subtract,
+    '*': np.multiply,
+    '/': np.divide,
+}
+
+KEYWORDS = {'and', 'or', 'not', 'between'}
+
+_TOKEN_RE = re.compile(r"\s*(?:(\d+\.\d*|\.\d+|\d+)|([A-Za-z_][A-Za-z_0-9]*)|(>=|<=|==|!=|>|<|\(|\)|\+|-|\*|/))")
+
+
+class RuleSyntaxError(ValueError):
+    """Raised when an alert rule cannot be parsed."""
+
+
+# --- Parsing ---
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.strip()
+    while pos < len(text):
+        match = _TOKEN_RE.match(text, pos)
+        if not match or match.end() == pos:
+            raise RuleSyntaxError(f"Unexpected character at position {pos}: '{text[pos:pos + 10]}'")
+        number, name, symbol = match.groups()
+        if number is not None:
+            tokens.append(('num', float(number)))
+        elif name is not None:
+            lowered = name.lower()
+            tokens.append(('kw', lowered) if lowered in KEYWORDS else ('name', lowered))
+        else:
+            tokens.append(('op', symbol))
+        pos = match.end()
+    return tokens
+
+
+class _Parser:
+    """
+    Recursive descent parser producing canonical, hashable expression tuples:
+
+        ('field', name) | ('num', value) | ('arith', op, left, right)
+        ('cmp', op, left, right) | ('not', node) | ('and', nodes...) | ('or', nodes...)
+
+    `x between a and b` becomes ('and', ('cmp', '>=', x, a), ('cmp', '<=', x, b)).
+    and/or operands are flattened and sorted so `a and b` equals `b and a`.
+    """
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def parse(self):
+        if not self.tokens:
+            raise RuleSyntaxError("Empty rule")
+        node = self._or()
+        if self.pos != len(self.tokens):
+            raise RuleSyntaxError(f"Unexpected '{self.tokens[self.pos][1]}'")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _take(self, kind=None, value=None):
+        token = self._peek()
+        if token[0] is None or (kind and token[0] != kind) or (value and token[1] != value):
+            expected = value or kind or 'a token'
+            found = token[1] if token[0] else 'end of rule'
+            raise RuleSyntaxError(f"Expected {expected}, found {found}")
+        self.pos += 1
+        return token
+
+    def _or(self):
+        nodes = [self._and()]
+        while self._peek() == ('kw', 'or'):
+            self._take()
+            nodes.append(self._and())
+        return _join('or', nodes)
+
+    def _and(self):
+        nodes = [self._not()]
+        while self._peek() == ('kw', 'and'):
+            self._take()
+            nodes.append(self._not())
+        return _join('and', nodes)
+
+    def _not(self):
+        if self._peek() == ('kw', 'not'):
+            self._take()
+            return ('not', self._not())
+        return self._comparison()
+
+    def _comparison(self):
+        # A parenthesised boolean expression, e.g. (a or b)
+        if self._peek() == ('op', '(') and self._is_boolean_group():
+            self._take()
+            node = self._or()
+            self._take('op', ')')
+            return node
+
+        left = self._sum()
+        kind, value = self._peek()
+        if kind == 'op' and value in COMPARISONS:
+            self._take()
+            return ('cmp', value, left, self._sum())
+        if (kind, value) == ('kw', 'between'):
+            self._take()
+            low = self._sum()
+            self._take('kw', 'and')
+            high = self._sum()
+            return _join('and', [('cmp', '>=', left, low), ('cmp', '<=', left, high)])
+        raise RuleSyntaxError("Expected a comparison (>, >=, <, <=, ==, != or between)")
+
+    def _is_boolean_group(self):
+        # Look ahead to the matching ')' for a comparison or keyword at depth 1
+        depth = 0
+        for kind, value in self.tokens[self.pos:]:
+            if value == '(':
+                depth += 1
+            elif value == ')':
+                depth -= 1
+                if depth == 0:
+                    return False
+            elif depth == 1 and (kind == 'kw' or (kind == 'op' and value in COMPARISONS)):
+                return True
+        return False
+
+    def _sum(self):
+        node = self._product()
+        while self._peek()[0] == 'op' and self._peek()[1] in ('+', '-'):
+            op = self._take()[1]
+            node = ('arith', op, node, self._product())
+        return node
+
+    def _product(self):
+        node = self._atom()
+        while self._peek()[0] == 'op' and self._peek()[1] in ('*', '/'):
+            op = self._take()[1]
+            node = ('arith', op, node, self._atom())
+        return node
+
+    def _atom(self):
+        kind, value = self._peek()
+        if kind == 'num':
+            self._take()
+            return ('num', value)
+        if kind == 'name':
+            self._take()
+            if value not in FIELD_ALIASES:
+                raise RuleSyntaxError(f"Unknown field '{value}'. Known fields: {', '.join(sorted(FIELD_ALIASES))}")
+            return ('field', FIELD_ALIASES[value])
+        if (kind, value) == ('op', '-'):
+            self._take()
+            operand = self._atom()
+            return ('num', -operand[1]) if operand[0] == 'num' else ('arith', '-', ('num', 0.0), operand)
+        if (kind, value) == ('op', '('):
+            self._take()
+            node = self._sum()
+            self._take('op', ')')
+            return node
+        raise RuleSyntaxError(f"Expected a field or number, found {value if kind else 'end of rule'}")
+
+
+def _join(op, nodes):
+    flat = []
+    for node in nodes:
+        flat.extend(node[1:] if node[0] == op else [node])
+    unique = sorted(set(flat), key=repr)
+    return unique[0] if len(unique) == 1 else (op, *unique)
+
+
+def parse_rule(text):
+    """Parses a rule expression into its canonical tree. Raises RuleSyntaxError."""
+    if not isinstance(text, str):
+        raise RuleSyntaxError("Rule must be a string")
+    return _Parser(text).parse()
+
+
+# --- Compilation ---
+def compile_plan(roots):
+    """
+    Flattens expression trees into one evaluation plan with shared subexpressions.
+
+    Returns (plan, slots): plan is a list of (node, child_slot_indices) in
+    dependency order and slots maps every node to its position in the plan.
+    """
+    plan, slots = [], {}
+
+    def visit(node):
+        if node in slots:
+            return slots[node]
+        if node[0] in ('field', 'num'):
+            children = ()
+        elif node[0] in ('arith', 'cmp'):
+            children = (visit(node[2]), visit(node[3]))
+        else:
+            children = tuple(visit(child) for child in node[1:])
+        slots[node] = len(plan)
+        plan.append((node, children))
+        return slots[node]
+
+    for root in roots:
+        visit(root)
+    return plan, slots
+
+
+def run_plan(plan, arrays):
+    """Evaluates a compiled plan against UniverseArrays; returns the value of every slot."""
+    values = [None] * len(plan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, (node, children) in enumerate(plan):
+            kind = node[0]
+            if kind == 'field':
+                values[k] = arrays[node[1]]
+            elif kind == 'num':
+                values[k] = node[1]
+            elif kind == 'arith':
+                values[k] = ARITHMETIC[node[1]](values[children[0]], values[children[1]])
+            elif kind == 'cmp':
+                values[k] = COMPARISONS[node[1]](values[children[0]], values[children[1]])
+            elif kind == 'not':
+                values[k] = np.logical_not(values[children[0]])
+            elif kind == 'and':
+                values[k] = np.logical_and.reduce([values[c] for c in children])
+            elif kind == 'or':
+                values[k] = np.logical_or.reduce([values[c] for c in children])
+    return values
+
+
+class RuleBook:
+    """
+    User alerts defined by rule expressions.
+
+    An alert with a symbol fires once, for that symbol. An alert without a
+    symbol is a universe-wide scan: it fires once per symbol that matches and
+    stays active.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._alerts = {}   # {alert_id: alert dict}
+        self._trees = {}    # {alert_id: parsed expression}
+        self._fired = {}    # {alert_id: set of symbols already fired (scans)}
+        self._plan = None
+        self._slots = None
+
+    def add(self, alert):
+        """Adds an alert dict with a 'condition' expression. Raises RuleSyntaxError."""
+        tree = parse_rule(alert['condition'])
+        with self._lock:
+            self._alerts[alert['id']] = alert
+            self._trees[alert['id']] = tree
+            self._fired[alert['id']] = set()
+            self._plan = None
+
+    def remove(self, alert_id):
+        with self._lock:
+            alert = self._alerts.pop(alert_id, None)
+            if alert is not None:
+                del self._trees[alert_id]
+                del self._fired[alert_id]
+                self._plan = None
+            return alert
+
+    def alerts(self):
+        with self._lock:
+            return list(self._alerts.values())
+
+    def __contains__(self, alert_id):
+        return alert_id in self._alerts
+
+    def __len__(self):
+        return len(self._alerts)
+
+    def evaluate(self, arrays):
+        """Runs every active rule against the current arrays; returns [(alert, symbol)] that fired."""
+        with self._lock:
+            active = {alert_id: tree for alert_id, tree in self._trees.items()
+                      if not self._alerts[alert_id].get('triggered', False)}
+            if not active or not len(arrays):
+                return []
+            if self._plan is None:
+                self._plan, self._slots = compile_plan(self._trees.values())
+            values = run_plan(self._plan, arrays)
+
+            fired = []
+            for alert_id, tree in active.items():
+                alert = self._alerts[alert_id]
+                result = np.broadcast_to(values[self._slots[tree]], (len(arrays),))
+                symbol = alert.get('symbol')
+                if symbol:
+                    row = arrays.index.get(symbol)
+                    if row is not None and arrays.has_quote[row] and result[row]:
+                        alert['triggered'] = True
+                        fired.append((alert, symbol))
+                else:
+                    already_fired = self._fired[alert_id]
+                    for row in np.flatnonzero(result & arrays.has_quote):
+                        matched_symbol = arrays.symbols[row]
+                        if matched_symbol not in already_fired:
+                            already_fired.add(matched_symbol)
+                            fired.append((alert, matched_symbol))
+            return fired
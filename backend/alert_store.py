@@ -0,0 +1,181 @@
+"""
+Persistent alert store in PostgreSQL with batched write-through.
+
+The in-memory AlertIndex and system alert history stay the source of truth
+for reads. Every change is queued here and a background thread writes the
+queue to the database in batches, so socket handlers and the data stream
+never wait on the database.
+
+A batch that fails to write is kept and retried with exponential backoff,
+ahead of anything queued since, so a database outage delays writes instead of
+losing them. Only a batch that keeps failing for another reason (bad data) is
+given up after MAX_DATA_ERROR_RETRIES attempts.
+"""
+
+import time
+import queue
+import threading
+from datetime import datetime, timezone
+
+from psycopg import OperationalError
+from psycopg.types.json import Jsonb
+
+from database import pool
+
+RETRY_DELAY = 1         # Seconds before the first retry of a failed batch
+MAX_RETRY_DELAY = 60    # Backoff cap
+MAX_DATA_ERROR_RETRIES = 5
+
+
+class AlertStore:
+    """Queues alert changes and flushes them to PostgreSQL in batches."""
+
+    def __init__(self, flush_interval=0.5, max_batch=1000):
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = None
+
+    # --- Write-through (called from handlers / trigger events) ---
+    def save_alert(self, alert):
+        self._queue.put(('save_alert', alert))
+
+    def delete_alert(self, alert_id):
+        self._queue.put(('delete_alert', alert_id))
+
+    def mark_triggered(self, alert_id):
+        self._queue.put(('mark_triggered', (alert_id, datetime.now(timezone.utc))))
+
+    def save_system_alert(self, alert):
+        self._queue.put(('save_system_alert', alert))
+
+    # --- Startup warm-up ---
+    def load_alerts(self):
+        """Returns all persisted user alerts (one query) and the last issued alert id."""
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                # The counter row comes back with a NULL operator
+                cur.execute("""
+                    SELECT id, symbol, operator, value, triggered, condition FROM user_alerts
+                    UNION ALL
+                    SELECT value, NULL, NULL, NULL, NULL, NULL FROM alert_counters WHERE name = 'user_alert'
+                    ORDER BY id;
+                """)
+                rows = cur.fetchall()
+
+        alerts = []
+        last_id = 0
+        for alert_id, symbol, operator, value, triggered, condition in rows:
+            last_id = max(last_id, alert_id)
+            if operator is None:
+                continue
+            alert = {
+                "id": alert_id,
+                "symbol": symbol,
+                "operator": operator,
+                "value": float(value) if value is not None else None,
+                "triggered": triggered
+            }
+            if condition is not None:
+                alert["condition"] = condition
+            alerts.append(alert)
+        return alerts, last_id
+
+    def load_system_alert_history(self, limit=500):
+        """Returns the most recent system alerts, newest first."""
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT payload FROM system_alert_history
+                    ORDER BY created_at DESC
+                    LIMIT %s;
+                """, (limit,))
+                return [row[0] for row in cur.fetchall()]
+
+    # --- Background writer ---
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._writer_thread, daemon=True)
+            self._thread.start()
+            print("Alert store writer thread started.")
+
+    def _writer_thread(self):
+        batch = []
+        delay = RETRY_DELAY
+        data_errors = 0
+        while True:
+            if not batch:
+                batch = [self._queue.get()]
+                # Give the rest of the burst a moment to arrive, then take it all
+                time.sleep(self.flush_interval)
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # The batch is written in one transaction and every operation is idempotent,
+                # so it is simply written again (with whatever was queued meanwhile)
+                if not isinstance(e, OperationalError):
+                    data_errors += 1
+                    if data_errors >= MAX_DATA_ERROR_RETRIES:
+                        print(f"❌ Dropping {len(batch)} alert changes after {data_errors} failed attempts: {e}")
+                        batch, delay, data_errors = [], RETRY_DELAY, 0
+                        continue
+                print(f"⚠️  Error persisting {len(batch)} alert changes, retrying in {delay}s: {e}")
+                time.sleep(delay)
+                delay = min(delay * 2, MAX_RETRY_DELAY)
+                continue
+            batch, delay, data_errors = [], RETRY_DELAY, 0
+
+    def _flush(self, batch):
+        saves, deletes, triggers, system_alerts = [], [], [], []
+        last_id = 0
+        for op, payload in batch:
+            if op == 'save_alert':
+                saves.append((
+                    payload['id'], payload['symbol'], payload['operator'], payload['value'],
+                    payload.get('triggered', False), payload.get('condition')
+                ))
+                last_id = max(last_id, payload['id'])
+            elif op == 'delete_alert':
+                deletes.append((payload,))
+            elif op == 'mark_triggered':
+                triggers.append((payload[1], payload[0]))
+            elif op == 'save_system_alert':
+                system_alerts.append((
+                    payload['id'], payload['symbol'], payload['type'], payload['message'],
+                    datetime.fromisoformat(payload['timestamp']), Jsonb(payload)
+                ))
+
+        # Operations are applied in a fixed order: an alert created and
+        # deleted inside the same batch is inserted, then removed.
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                if saves:
+                    cur.executemany("""
+                        INSERT INTO user_alerts (id, symbol, operator, value, triggered, condition)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (id) DO UPDATE SET
+                            symbol = EXCLUDED.symbol, operator = EXCLUDED.operator,
+                            value = EXCLUDED.value, triggered = EXCLUDED.triggered,
+                            condition = EXCLUDED.condition;
+                    """, saves)
+                    cur.execute("""
+                        INSERT INTO alert_counters (name, value) VALUES ('user_alert', %s)
+                        ON CONFLICT (name) DO UPDATE SET value = GREATEST(alert_counters.value, EXCLUDED.value);
+                    """, (last_id,))
+                if triggers:
+                    cur.executemany("""
+                        UPDATE user_alerts SET triggered = TRUE, triggered_at = %s WHERE id = %s;
+                    """, triggers)
+                if deletes:
+                    cur.executemany("DELETE FROM user_alerts WHERE id = %s;", deletes)
+                if system_alerts:
+                    cur.executemany("""
+                        INSERT INTO system_alert_history (alert_id, symbol, type, message, created_at, payload)
+                        VALUES (%s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (alert_id) DO NOTHING;
+                    """, system_alerts)
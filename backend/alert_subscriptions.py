@@ -0,0 +1,91 @@
+"""
+Per-session alert preferences mapped onto Socket.IO rooms.
+
+Every connected session has its own alert settings ({setting: bool}) and an
+optional watchlist. A session receives alerts of a setting through one room:
+
+    alerts:<setting>            all symbols (no watchlist)
+    alerts:<setting>:<symbol>   one room per watched symbol
+
+so an alert is delivered by emitting to at most two rooms, and sessions that
+did not subscribe never see it. Subscriber counts per setting tell the
+evaluation loop which rules nobody is listening to.
+"""
+
+import threading
+
+
+def setting_room(setting, symbol=None):
+    return f"alerts:{setting}" if symbol is None else f"alerts:{setting}:{symbol}"
+
+
+class AlertSubscriptions:
+    """Tracks each session's settings/watchlist and the rooms they imply."""
+
+    def __init__(self, default_settings):
+        self.default_settings = dict(default_settings)
+        self._lock = threading.Lock()
+        self._sessions = {}     # {sid: {'settings': {...}, 'watchlist': set or None}}
+        self._subscribers = {setting: 0 for setting in self.default_settings}
+
+    def _rooms(self, session):
+        rooms = set()
+        for setting, enabled in session['settings'].items():
+            if not enabled:
+                continue
+            if session['watchlist'] is None:
+                rooms.add(setting_room(setting))
+            else:
+                rooms.update(setting_room(setting, symbol) for symbol in session['watchlist'])
+        return rooms
+
+    def _count(self, session, delta):
+        for setting, enabled in session['settings'].items():
+            if enabled:
+                self._subscribers[setting] += delta
+
+    def register(self, sid):
+        """Adds a session with the default settings; returns the rooms it should join."""
+        session = {'settings': dict(self.default_settings), 'watchlist': None}
+        with self._lock:
+            self._sessions[sid] = session
+            self._count(session, 1)
+            return self._rooms(session)
+
+    def unregister(self, sid):
+        with self._lock:
+            session = self._sessions.pop(sid, None)
+            if session is not None:
+                self._count(session, -1)
+
+    def update(self, sid, settings=None, watchlist=None, clear_watchlist=False):
+        """
+        Applies new settings and/or watchlist for a session.
+
+        Unknown keys and non-boolean values are ignored. Returns
+        (rooms_to_leave, rooms_to_join, current settings).
+        """
+        with self._lock:
+            session = self._sessions.get(sid)
+            if session is None:
+                raise KeyError(f"Unknown session {sid}")
+            old_rooms = self._rooms(session)
+            self._count(session, -1)
+            for key, value in (settings or {}).items():
+                if key in session['settings'] and isinstance(value, bool):
+                    session['settings'][key] = value
+            if clear_watchlist:
+                session['watchlist'] = None
+            elif watchlist is not None:
+                session['watchlist'] = set(watchlist)
+            self._count(session, 1)
+            new_rooms = self._rooms(session)
+            return old_rooms - new_rooms, new_rooms - old_rooms, dict(session['settings'])
+
+    def active_settings(self):
+        """{setting: True if at least one session wants it}, as used to skip rule evaluation."""
+        with self._lock:
+            return {setting: count > 0 for setting, count in self._subscribers.items()}
+
+    def is_active(self, setting):
+        return self._subscribers.get(setting, 0) > 0
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+ASGI / asyncio entry point for the dashboard server.
+
+Runs the same Socket.IO events as optimized_flask_server_v2 (request_initial_data,
+get_alerts, add_alert, ...) on a python-socketio AsyncServer under uvicorn,
+instead of Flask-SocketIO's threading mode and development server:
+
+    python asgi_server.py                      # or
+    uvicorn asgi_server:asgi_app --host 0.0.0.0 --port 5000
+
+Connections are coroutines on one event loop rather than one OS thread each,
+and only the websocket transport is offered (no long-polling). The event
+handlers are the v2 server's own functions; they run on a thread pool because
+they touch the database and shared state, and the v2 background threads (data
+stream, candle flush, alert store, scans) keep running as they are. Their
+Socket.IO calls are bridged onto the event loop through one ordered queue, so
+clients see events in the order the server produced them. Incoming events are
+not ordered: two events of one client may be handled at the same time on the
+handler pool, as with Flask-SocketIO's threading mode.
+
+Keep a single worker process: all state lives in this process.
+"""
+
+import os
+import sys
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import socketio
+import uvicorn
+
+# --- Add backend directory to path to import local modules ---
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import optimized_flask_server_v2 as server
+
+HOST = '0.0.0.0'
+PORT = 5000
+HANDLER_WORKERS = 32 # Threads running event handlers (DB access, snapshot builds)
+ASGI_TRANSPORTS = ['websocket'] # Add 'polling' for clients that cannot open a websocket
+STATIC_FOLDER = (SCRIPT_DIR / '../frontend/trading-dashboard/build').resolve()
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', transports=ASGI_TRANSPORTS)
+handler_executor = ThreadPoolExecutor(max_workers=HANDLER_WORKERS, thread_name_prefix='sio-handler')
+
+
+class LoopBridge:
+    """
+    Stands in for the Flask-SocketIO object and its request-context helpers inside
+    the v2 module. Calls may come from any thread; they are queued onto the event
+    loop and executed there one at a time, in call order.
+    """
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.server = sio # What the v2 module inspects for per-client send queues
+        self.loop = None
+        self.queue = None
+        self._session = threading.local()
+
+    async def run(self):
+        """Drains the queue on the event loop; started once at startup."""
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        while True:
+            method, args, kwargs = await self.queue.get()
+            try:
+                result = method(*args, **kwargs)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                print(f"Error in socket bridge ({method.__name__}): {e}")
+
+    def _call(self, method, *args, **kwargs):
+        if self.loop is None:
+            return # Nothing can be connected before the loop runs
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (method, args, kwargs))
+
+    # --- Flask-SocketIO server object (socketio.emit from any thread) ---
+    def emit(self, event, data=None, to=None, room=None, **kwargs):
+        self._call(self.sio.emit, event, data, to=to or room)
+
+    # --- Request-context helpers used inside event handlers ---
+    @property
+    def sid(self):
+        return self._session.sid
+
+    def handler_emit(self, event, data=None, to=None, room=None, **kwargs):
+        self._call(self.sio.emit, event, data, to=to or room or self.sid)
+
+    def join_room(self, room, sid=None, **kwargs):
+        self._call(self.sio.enter_room, sid or self.sid, room)
+
+    def leave_room(self, room, sid=None, **kwargs):
+        self._call(self.sio.leave_room, sid or self.sid, room)
+
+    def run_handler(self, sid, handler, args):
+        """Runs a v2 handler in the calling (executor) thread with `sid` as the current session."""
+        self._session.sid = sid
+        try:
+            return handler(*args)
+        finally:
+            self._session.sid = None
+
+
+bridge = LoopBridge(sio)
+
+
+def bind_server_module():
+    """Points the v2 module's Socket.IO globals at the bridge (request.sid, emit, rooms)."""
+    server.socketio = bridge
+    server.request = bridge
+    server.emit = bridge.handler_emit
+    server.join_room = bridge.join_room
+    server.leave_room = bridge.leave_room
+
+
+def register_handlers():
+    for event, handler in server.EVENT_HANDLERS.items():
+        sio.on(event, make_async_handler(event, handler))
+
+
+def make_async_handler(event, handler):
+    async def async_handler(sid, *args):
+        # connect passes (environ[, auth]) and disconnect may pass a reason; v2 handlers take neither
+        handler_args = () if event in ('connect', 'disconnect') else args[:1]
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(handler_executor, bridge.run_handler, sid, handler, handler_args)
+        except Exception as e:
+            print(f"Error in '{event}' handler for {sid}: {e}")
+    return async_handler
+
+
+# --- HTTP routes next to Socket.IO ---
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def latency_stats(scope, send):
+    """Tick-to-alert latency percentiles per pipeline stage. ?reset=1 starts a new window."""
+    stats = server.latency_tracker.summary()
+    if parse_qs(scope.get('query_string', b'').decode()).get('reset') == ['1']:
+        server.latency_tracker.reset()
+    await send_json(send, stats)
+
+
+async def startup():
+    """Starts the bridge on the event loop, then the v2 background services off it."""
+    asyncio.get_running_loop().create_task(bridge.run())
+    if server.TARGET_CSV_FILE is None:
+        server.TARGET_CSV_FILE = os.environ.get('UNIVERSE_CSV') or find_target_csv()
+    await asyncio.get_running_loop().run_in_executor(handler_executor, server.start_background_services)
+
+
+def find_target_csv():
+    """Today's universe CSV, as chosen by the launcher."""
+    from run_optimized_dashboard_v2 import get_dynamic_csv_path
+    return get_dynamic_csv_path()
+
+
+socketio_app = socketio.ASGIApp(
+    sio,
+    static_files={'/': f'{STATIC_FOLDER}/'} if STATIC_FOLDER.is_dir() else None # Trailing slash: '/' serves index.html
+)
+
+
+async def asgi_app(scope, receive, send):
+    """Lifespan and /api routes; everything else goes to Socket.IO (and the static build)."""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await startup()
+                    await send({'type': 'lifespan.startup.complete'})
+                except Exception as e:
+                    print(f"❌ Server startup failed: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+            elif message['type'] == 'lifespan.shutdown':
+                handler_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    elif scope['type'] == 'http' and scope['path'] == '/api/latency':
+        await latency_stats(scope, send)
+    else:
+        await socketio_app(scope, receive, send)
+
+
+bind_server_module()
+register_handlers()
+
+
+if __name__ == '__main__':
+    print(f"Starting asyncio Socket.IO server (uvicorn) on http://{HOST}:{PORT}")
+    uvicorn.run(asgi_app, host=HOST, port=PORT, log_level='warning')
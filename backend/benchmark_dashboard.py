@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the dashboard backend hot spots.
+Run from the backend directory: python benchmark_dashboard.py [name ...]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+
+# --- Add backend directory to path to import local modules ---
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from universe_loader import COLUMN_MAPPING, build_csv_data, load_universe_frame, load_universe_snapshot
+from alert_index import AlertIndex
+from system_alerts import SystemAlertEngine
+from alert_rules import RuleBook, compile_plan
+from volume_spikes import VolumeSpikeDetector
+from wire_format import KeyDictionary, encode_groups, json_size, msgpack_available
+
+
+def timed(func, *args, repeat=5, **kwargs):
+    """Runs func `repeat` times and returns (best_seconds, last_result)."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def report(name, seconds, extra=""):
+    print(f"   {name:<40} {seconds * 1000:>10.3f} ms {extra}")
+
+
+# --- Synthetic universe ---
+def generate_universe_csv(csv_path, rows=5000, seed=42):
+    """Writes a consolidated_stock_view style CSV with `rows` symbols."""
+    rng = random.Random(seed)
+    strategies = ['Morning', 'Mid-day', 'Afternoon', 'Morning, Mid-day', 'Mid-day, Afternoon', '']
+    records = []
+    for i in range(rows):
+        records.append({
+            'Symbol': f"SYM{i:05d}",
+            'Announcement Weight': rng.choice(['-', '', '1', '2.5', 3, None]),
+            'chart-ink strategy': rng.choice(strategies),
+            'Announcement Description': rng.choice(['-', 'Board meeting outcome', None]),
+            'Announcement Links': 'https://example.invalid/a',
+            'Announcement Text': 'Lorem ipsum ' * 5,
+            'Nse_pre market': rng.choice(['Yes', 'no', 'TRUE', '1', None]),
+            'Open in Prev Range Top 20%': rng.choice(['yes', 'No']),
+            'Gap %': rng.choice([f"{rng.uniform(-5, 10):.2f}%", rng.uniform(-5, 10), '-']),
+            'PDC strong close': rng.choice(['yes', 'no']),
+            'Prev_High': round(rng.uniform(50, 5000), 2),
+            'Sector': rng.choice(['IT', 'Banks', 'Pharma', 'Auto']),
+        })
+    pd.DataFrame(records).to_csv(csv_path, index=False)
+    return csv_path
+
+
+def legacy_load_csv_data(csv_path):
+    """The original per-row, per-cell iterrows loader, kept here as the baseline."""
+    csv_data = {}
+    df = pd.read_csv(csv_path)
+    df.iloc[:, 0] = df.iloc[:, 0].astype(str)
+    for idx, row in df.iterrows():
+        wsym = row.iloc[0]
+        if not wsym.startswith("NSE:"):
+            wsym = f"NSE:{wsym}"
+        if not wsym.endswith("-EQ"):
+            wsym = f"{wsym}-EQ"
+        static_data = {}
+        for col_idx, col_name in enumerate(df.columns[1:], 1):
+            if col_name in ['Announcement Links', 'Announcement Text']:
+                continue
+            value = row.iloc[col_idx]
+            if pd.isna(value):
+                value = None
+            elif col_name == 'chart-ink strategy':
+                static_data['chartStrategy'] = str(value) if value and str(value) != 'nan' else ''
+            elif col_name.strip().lower() == 'announcement weight':
+                try:
+                    if isinstance(value, str) and value.strip() in ['-', '']:
+                        static_data['newsWeight'] = 0.0
+                    else:
+                        static_data['newsWeight'] = float(value)
+                except (ValueError, TypeError):
+                    static_data['newsWeight'] = 0.0
+            elif col_name == 'Gap %':
+                try:
+                    if isinstance(value, str):
+                        value = value.replace('%', '')
+                    static_data['gap'] = float(value) if value else 0
+                except:
+                    static_data['gap'] = 0
+            elif col_name == 'Prev_High':
+                try:
+                    static_data['pdh'] = float(value) if value else 0.0
+                except:
+                    static_data['pdh'] = 0.0
+            elif col_name in ['Nse_pre market', 'Open in Prev Range Top 20%', 'PDC strong close']:
+                static_data[COLUMN_MAPPING[col_name]] = 'yes' if str(value).lower() in ['yes', 'true', '1'] else 'no'
+            else:
+                static_data[COLUMN_MAPPING.get(col_name, col_name.lower().replace(' ', '_'))] = value
+        static_data['announcement'] = 'yes' if static_data.get('description') and static_data['description'] != '-' else 'no'
+        csv_data[wsym] = static_data
+    return csv_data
+
+
+def bench_universe_load(rows=5000):
+    """Startup cost of turning the universe CSV into csv_data."""
+    print(f"\n📊 Universe load ({rows} rows)")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = generate_universe_csv(os.path.join(tmp_dir, "consolidated_stock_view_bench_V2.csv"), rows=rows)
+
+        legacy_time, legacy_data = timed(legacy_load_csv_data, csv_path, repeat=1)
+        report("legacy iterrows loader", legacy_time)
+
+        vector_time, vector_data = timed(lambda: build_csv_data(load_universe_frame(csv_path)))
+        report("vectorized parse (cache miss)", vector_time, f"({legacy_time / vector_time:.1f}x faster)")
+
+        load_universe_snapshot(csv_path)  # Writes the binary snapshot
+        cached_time, _ = timed(load_universe_snapshot, csv_path)
+        report("binary snapshot load (cache hit)", cached_time, f"({legacy_time / cached_time:.1f}x faster)")
+
+        mismatched = [s for s in legacy_data if legacy_data[s].get('pdh') != vector_data.get(s, {}).get('pdh')]
+        print(f"   Symbols: legacy={len(legacy_data)} vectorized={len(vector_data)} pdh mismatches={len(mismatched)}")
+
+
+def bench_alert_index(total_alerts=100_000, symbols=5000):
+    """Per-tick cost of checking user alerts, scan vs threshold index."""
+    print(f"\n📊 User alert check ({total_alerts} alerts over {symbols} symbols)")
+    rng = random.Random(7)
+    symbol_names = [f"NSE:SYM{i:05d}-EQ" for i in range(symbols)]
+    prices = {symbol: rng.uniform(100, 3000) for symbol in symbol_names}
+
+    alerts = []
+    for alert_id in range(1, total_alerts + 1):
+        symbol = rng.choice(symbol_names)
+        operator = rng.choice(['>=', '<='])
+        # Thresholds 5-15% away from the price, so a tick rarely fires anything
+        offset = rng.uniform(1.05, 1.15)
+        value = prices[symbol] * offset if operator == '>=' else prices[symbol] / offset
+        alerts.append({'id': alert_id, 'symbol': symbol, 'operator': operator, 'value': value, 'triggered': False})
+
+    def legacy_check(symbol, ltp):
+        for alert in alerts:
+            if alert['symbol'] == symbol and not alert.get('triggered', False):
+                if (alert['operator'] == '>=' and ltp >= alert['value']) or (alert['operator'] == '<=' and ltp <= alert['value']):
+                    alert['triggered'] = True
+
+    index = AlertIndex()
+    for alert in alerts:
+        index.add(dict(alert))
+
+    sample = symbol_names[:50]
+    legacy_time, _ = timed(lambda: [legacy_check(symbol, prices[symbol]) for symbol in sample], repeat=1)
+    legacy_cycle = legacy_time / len(sample) * symbols
+    report("linear scan, full cycle (extrapolated)", legacy_cycle)
+
+    index_time, _ = timed(lambda: [index.check(symbol, prices[symbol]) for symbol in symbol_names])
+    report("threshold index, full cycle", index_time, f"({legacy_cycle / index_time:.0f}x faster)")
+
+    delete_time, _ = timed(lambda: [index.remove(alert_id) for alert_id in range(1, 1001)], repeat=1)
+    report("index delete (per alert)", delete_time / 1000)
+
+
+def make_universe(symbols, seed=11):
+    """Synthetic csv_data and a matching Fyers tick snapshot."""
+    rng = random.Random(seed)
+    csv_data, ltp_data = {}, {}
+    for i in range(symbols):
+        symbol = f"NSE:SYM{i:05d}-EQ"
+        pdh = rng.uniform(100, 3000)
+        ltp = pdh * rng.uniform(0.95, 1.02)
+        csv_data[symbol] = {'pdh': pdh, 'gap': rng.uniform(-5, 10), 'newsWeight': rng.choice([0.0, 1.0, 2.0]),
+                            'chartStrategy': rng.choice(['Morning', 'Mid-day', 'Afternoon', 'Morning, Mid-day'])}
+        ltp_data[symbol] = {'ltp': ltp, 'chp': rng.uniform(-5, 5), 'vol_traded_today': rng.randint(10_000, 5_000_000),
+                            'high_price': ltp * 1.01, 'low_price': ltp * 0.99, 'open_price': ltp * 0.995}
+    return csv_data, ltp_data
+
+
+def bench_system_alerts(symbols=5000):
+    """Cost of one system-alert evaluation cycle over the universe."""
+    print(f"\n📊 System alert cycle ({symbols} symbols)")
+    csv_data, ltp_data = make_universe(symbols)
+
+    def legacy_cycle():
+        crossed = set()
+        for symbol, data in ltp_data.items():
+            pdh = csv_data.get(symbol, {}).get('pdh', 0.0)
+            if pdh and symbol not in crossed and data['ltp'] > pdh:
+                crossed.add(symbol)
+
+    legacy_time, _ = timed(legacy_cycle)
+    report("per-symbol python loop", legacy_time)
+
+    engine = SystemAlertEngine()
+    engine.sync_universe(csv_data)
+    rng = random.Random(11)
+    symbol_names = list(ltp_data)
+
+    def vector_cycle(ticks, changed=None):
+        engine.fired = {name: mask & False for name, mask in engine.fired.items()}
+        engine.arrays.load_quotes(ticks, changed)
+        return engine.evaluate()
+
+    full_time, _ = timed(vector_cycle, ltp_data)  # changed=None: every tick is loaded
+    report("load all quotes + evaluate", full_time, f"({legacy_time / full_time:.1f}x vs loop)")
+
+    # A steady-state cycle: the websocket replaced the ticks of a fraction of the symbols
+    for changed_share in (0.1, 0.5):
+        def next_ticks():
+            changed = set(rng.sample(symbol_names, int(len(symbol_names) * changed_share)))
+            for symbol in changed:
+                ltp_data[symbol] = {**ltp_data[symbol], 'ltp': ltp_data[symbol]['ltp'] * rng.uniform(0.999, 1.001)}
+            return changed
+
+        times = []
+        for _ in range(20):
+            changed = next_ticks()
+            start = time.perf_counter()
+            results = vector_cycle(ltp_data, changed)
+            times.append(time.perf_counter() - start)
+        cycle_time = sorted(times)[len(times) // 2]
+        fired = sum(len(rows) for _, rows in results)
+        report(f"load changed quotes + evaluate ({changed_share:.0%})", cycle_time,
+               f"(median, {fired} fired, {legacy_time / cycle_time:.1f}x vs loop)")
+
+
+def bench_alert_rules(symbols=5000, rules=1000):
+    """Batch evaluation of rule alerts with shared subexpressions."""
+    print(f"\n📊 Rule alerts ({rules} rules over {symbols} symbols)")
+    csv_data, ltp_data = make_universe(symbols)
+    engine = SystemAlertEngine()
+    engine.sync_universe(csv_data)
+    engine.arrays.load_quotes(ltp_data)
+
+    rng = random.Random(3)
+    book = RuleBook()
+    templates = [
+        "ltp > pdh and gap between {a} and {b}",
+        "ltp > pdh * 1.0{a} and change > {b}",
+        "gap between {a} and {b} and newsweight >= 1",
+        "(change > {a} or gap > {b}) and ltp > pdh",
+    ]
+    symbol_names = engine.arrays.symbols
+    for alert_id in range(1, rules + 1):
+        condition = rng.choice(templates).format(a=rng.randint(0, 3), b=rng.randint(4, 9))
+        book.add({'id': alert_id, 'symbol': rng.choice(symbol_names), 'operator': 'rule',
+                  'value': None, 'condition': condition, 'triggered': False})
+
+    plan, _ = compile_plan(book._trees.values())
+    print(f"   {rules} rules compiled into {len(plan)} plan steps")
+    eval_time, fired = timed(book.evaluate, engine.arrays, repeat=1)
+    report("batch evaluate (first snapshot)", eval_time, f"({len(fired)} fired)")
+
+
+def bench_volume_spikes(symbols=5000, minutes=30):
+    """Per-minute cost of checking every symbol's closed candle for a volume spike."""
+    print(f"\n📊 Volume spike check ({symbols} symbols closing together, {minutes} minutes)")
+    from collections import deque
+    rng = random.Random(5)
+    symbol_names = [f"NSE:SYM{i:05d}-EQ" for i in range(symbols)]
+    minute_volumes = [[rng.randint(1_000, 50_000) for _ in symbol_names] for _ in range(minutes)]
+
+    def legacy_run():
+        history = {}
+        for volumes in minute_volumes:
+            for symbol, volume in zip(symbol_names, volumes):
+                history.setdefault(symbol, deque(maxlen=10)).append(volume)
+                if len(history[symbol]) == 10:
+                    previous = list(history[symbol])[:-1]
+                    avg = sum(previous) / len(previous)
+                    _ = avg > 0 and volume > avg * 2.5
+
+    legacy_time, _ = timed(legacy_run, repeat=1)
+    report("deque copy + sum, per minute", legacy_time / minutes)
+
+    def vector_run(rules):
+        detector = VolumeSpikeDetector(rules)
+        for volumes in minute_volumes:
+            detector.evaluate(symbol_names, volumes)
+
+    vector_time, _ = timed(vector_run, [{'lookback': 9, 'multiplier': 2.5}], repeat=1)
+    report("ring buffer, 1 rule, per minute", vector_time / minutes, f"({legacy_time / vector_time:.1f}x faster)")
+    multi_rules = [{'lookback': 9, 'multiplier': 2.5}, {'lookback': 20, 'zscore': 3.0}, {'lookback': 5, 'zscore': 2.0, 'multiplier': 2.0}]
+    multi_time, _ = timed(vector_run, multi_rules, repeat=1)
+    report("ring buffer, 3 rules, per minute", multi_time / minutes)
+
+
+def group_by_strategy(rows, csv_data):
+    groups = {}
+    for symbol, row in rows.items():
+        for strategy in csv_data[symbol]['chartStrategy'].split(','):
+            groups.setdefault(strategy.strip(), {})[symbol] = row
+    return groups
+
+
+def bench_wire_format(symbols=2000, changed_share=0.25):
+    """Encode time and bytes on the wire: JSON vs columnar MessagePack."""
+    print(f"\n📊 Wire format ({symbols} symbols)")
+    csv_data, ltp_data = make_universe(symbols)
+    rng = random.Random(5)
+
+    full_rows = {}
+    for symbol, tick in ltp_data.items():
+        full_rows[symbol] = {'symbol': symbol, 'ltp': round(tick['ltp'], 2), 'change': round(tick['chp'], 2),
+                             'volume': tick['vol_traded_today'], 'high': round(tick['high_price'], 2),
+                             'low': round(tick['low_price'], 2), 'open': round(tick['open_price'], 2),
+                             'rvol': round(rng.uniform(0, 5), 2), **csv_data[symbol]}
+    delta_rows = {symbol: {'ltp': row['ltp'] * 1.001, 'volume': row['volume'] + 100}
+                  for symbol, row in full_rows.items() if rng.random() < changed_share}
+
+    payloads = {
+        'initial_data': group_by_strategy(full_rows, csv_data),
+        f"data_update ({len(delta_rows)} changed)": group_by_strategy(delta_rows, csv_data),
+    }
+    for name, groups in payloads.items():
+        json_time, _ = timed(lambda: json.dumps(groups, separators=(',', ':')))
+        report(f"{name}: JSON", json_time, f"{json_size(groups) / 1024:>8.1f} KB")
+        if not msgpack_available:
+            print("   msgpack not installed; skipping binary encoding")
+            continue
+        keys = KeyDictionary()
+        packed_time, packed = timed(encode_groups, groups, 'msgpack', keys)
+        report(f"{name}: msgpack columnar", packed_time,
+               f"{len(packed) / 1024:>8.1f} KB ({json_size(groups) / len(packed):.1f}x smaller)")
+
+
+BENCHMARKS = {
+    'universe_load': bench_universe_load,
+    'alert_index': bench_alert_index,
+    'system_alerts': bench_system_alerts,
+    'alert_rules': bench_alert_rules,
+    'volume_spikes': bench_volume_spikes,
+    'wire_format': bench_wire_format,
+}
+
+
+if __name__ == '__main__':
+    selected = sys.argv[1:] or list(BENCHMARKS.keys())
+    for name in selected:
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
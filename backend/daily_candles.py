@@ -0,0 +1,124 @@
+"""
+Daily candle rollup (candles_1day) maintained alongside candles_1min.
+
+Each closed 1-minute candle is merged into the symbol's running daily candle
+in memory, and the daily candles that changed are upserted together once per
+cycle. Multi-day questions (previous-day levels, average daily volume, gaps
+against the prior close) then read one row per symbol per day instead of
+every minute row. backfill_daily_candles() rebuilds days from minute data,
+for the one-time initial backfill and after historical imports.
+"""
+
+import threading
+
+
+def trading_day(timestamp):
+    """The local trading date of a candle timestamp (candles are stamped in UTC)."""
+    return timestamp.astimezone().date() if timestamp.tzinfo else timestamp.date()
+
+
+class DailyCandleRollup:
+    """Today's running daily candle per symbol, written through to candles_1day."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.candles = {}    # {symbol: {'day', 'open', 'high', 'low', 'close', 'volume'}}
+        self._dirty = set()
+
+    def get(self, symbol):
+        return self.candles.get(symbol)
+
+    def load_day(self, cur, day):
+        """Seeds the cache with the stored daily candles of `day` (e.g. after a restart)."""
+        cur.execute("""
+            SELECT symbol, open, high, low, close, volume FROM candles_1day WHERE day = %s;
+        """, (day,))
+        with self._lock:
+            for symbol, o, h, l, c, v in cur.fetchall():
+                self.candles[symbol] = {
+                    'day': day, 'open': float(o), 'high': float(h),
+                    'low': float(l), 'close': float(c), 'volume': int(v)
+                }
+        return len(self.candles)
+
+    def update(self, symbol, minute_candle):
+        """Merges a closed 1-minute candle into the symbol's daily candle."""
+        day = trading_day(minute_candle['timestamp'])
+        with self._lock:
+            candle = self.candles.get(symbol)
+            if candle is None or candle['day'] != day:
+                self.candles[symbol] = {
+                    'day': day,
+                    'open': minute_candle['open'],
+                    'high': minute_candle['high'],
+                    'low': minute_candle['low'],
+                    'close': minute_candle['close'],
+                    'volume': minute_candle['volume'],
+                }
+            else:
+                candle['high'] = max(candle['high'], minute_candle['high'])
+                candle['low'] = min(candle['low'], minute_candle['low'])
+                candle['close'] = minute_candle['close']
+                candle['volume'] += minute_candle['volume']
+            self._dirty.add(symbol)
+
+    def flush(self, cur):
+        """Upserts every daily candle changed since the last flush in one batch; returns the count."""
+        with self._lock:
+            rows = []
+            for symbol in self._dirty:
+                c = self.candles[symbol]
+                rows.append((symbol, c['day'], c['open'], c['high'], c['low'], c['close'], c['volume']))
+            self._dirty = set()
+        if rows:
+            cur.executemany("""
+                INSERT INTO candles_1day (symbol, day, open, high, low, close, volume)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (symbol, day) DO UPDATE SET
+                    open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+                    close = EXCLUDED.close, volume = EXCLUDED.volume;
+            """, rows)
+        return len(rows)
+
+
+def backfill_daily_candles(cur, symbols=None, start_day=None):
+    """
+    Rebuilds candles_1day from candles_1min, optionally only for some symbols
+    and/or from `start_day` on. Returns the number of daily candles written.
+    """
+    filters, params = [], []
+    if symbols is not None:
+        filters.append("symbol = ANY(%s)")
+        params.append(list(symbols))
+    if start_day is not None:
+        filters.append("timestamp >= %s")
+        params.append(start_day)
+    where = f"WHERE {' AND '.join(filters)}" if filters else ""
+    cur.execute(f"""
+        INSERT INTO candles_1day (symbol, day, open, high, low, close, volume)
+        SELECT
+            symbol,
+            timestamp::date AS day,
+            (array_agg(open ORDER BY timestamp ASC))[1],
+            MAX(high),
+            MIN(low),
+            (array_agg(close ORDER BY timestamp DESC))[1],
+            SUM(volume)
+        FROM candles_1min
+        {where}
+        GROUP BY symbol, day
+        ON CONFLICT (symbol, day) DO UPDATE SET
+            open = EXCLUDED.open, high = EXCLUDED.high, low = EXCLUDED.low,
+            close = EXCLUDED.close, volume = EXCLUDED.volume;
+    """, params)
+    return cur.rowcount
+
+
+def catch_up_daily_candles(cur):
+    """
+    Backfills everything on the first run (empty table), otherwise re-rolls
+    from the last stored day so downtime and imports are picked up.
+    """
+    cur.execute("SELECT MAX(day) FROM candles_1day;")
+    last_day = cur.fetchone()[0]
+    return backfill_daily_candles(cur, start_day=last_day)
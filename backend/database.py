@@ -58,4 +58,68 @@ def create_tables():
                     UNIQUE(symbol, timestamp)
                 );
             """)
-    print("✅ Table 'candles_1min' is ready.") 
\ No newline at end of file
+            # Daily rollup of candles_1min, maintained by the candle pipeline (daily_candles.py)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS candles_1day (
+                    symbol TEXT NOT NULL,
+                    day DATE NOT NULL,
+                    open NUMERIC NOT NULL,
+                    high NUMERIC NOT NULL,
+                    low NUMERIC NOT NULL,
+                    close NUMERIC NOT NULL,
+                    volume BIGINT NOT NULL,
+                    PRIMARY KEY (symbol, day)
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS user_alerts (
+                    id BIGINT PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    operator TEXT NOT NULL,
+                    value NUMERIC NOT NULL,
+                    triggered BOOLEAN NOT NULL DEFAULT FALSE,
+                    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    triggered_at TIMESTAMPTZ
+                );
+            """)
+            # Rule alerts (alert_rules.py) store an expression instead of operator/value
+            cur.execute("""
+                ALTER TABLE user_alerts ADD COLUMN IF NOT EXISTS condition TEXT;
+                ALTER TABLE user_alerts ALTER COLUMN value DROP NOT NULL;
+                ALTER TABLE user_alerts ALTER COLUMN symbol DROP NOT NULL;
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS alert_counters (
+                    name TEXT PRIMARY KEY,
+                    value BIGINT NOT NULL
+                );
+            """)
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS system_alert_history (
+                    alert_id TEXT PRIMARY KEY,
+                    symbol TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    created_at TIMESTAMP NOT NULL,
+                    payload JSONB NOT NULL
+                );
+            """)
+            cur.execute("""
+                CREATE INDEX IF NOT EXISTS idx_system_alert_history_created_at
+                ON system_alert_history (created_at DESC);
+            """)
+            # Previous day/week/month levels per symbol, keyed by the trading date they apply to
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS reference_levels (
+                    symbol TEXT NOT NULL,
+                    as_of DATE NOT NULL,
+                    pdh NUMERIC, pdl NUMERIC, pdc NUMERIC,
+                    pwh NUMERIC, pwl NUMERIC, pwc NUMERIC,
+                    pmh NUMERIC, pml NUMERIC, pmc NUMERIC,
+                    computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                    PRIMARY KEY (symbol, as_of)
+                );
+            """)
+    print("✅ Tables 'candles_1min' and 'candles_1day' are ready.")
+    print("✅ Alert tables 'user_alerts', 'alert_counters' and 'system_alert_history' are ready.")
+    print("✅ Table 'reference_levels' is ready.") 
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Sequence numbers and a bounded history for the data_update stream.
+
+Every broadcast cycle that produced deltas is appended with the next sequence
+number, which clients remember. A client that reconnects sends its last
+sequence; if the ring still holds everything after it, the missed deltas are
+merged (latest value per field wins) into one catch-up update, otherwise it
+gets a full snapshot. Initial snapshots are versioned with the same numbers,
+so a snapshot at version N is followed by deltas N+1, N+2, ...
+
+Sequence numbers only mean something within one epoch: a random id drawn when
+the process starts and again on every reset(). Clients send the epoch back with
+their last sequence, and a different epoch (a restarted server, a reloaded
+universe) always gets a full snapshot.
+"""
+
+import secrets
+import threading
+from collections import deque
+
+
+class DeltaLog:
+    """Ring of the last `capacity` broadcast cycles: (seq, {strategy: {symbol: fields}})."""
+
+    def __init__(self, capacity=120):
+        self._lock = threading.Lock()
+        self.capacity = capacity
+        self.seq = 0
+        self.epoch = secrets.token_hex(8)
+        self._entries = deque(maxlen=capacity)
+
+    def append(self, groups):
+        """Records one cycle's grouped deltas; returns its sequence number."""
+        with self._lock:
+            self.seq += 1
+            self._entries.append((self.seq, groups))
+            return self.seq
+
+    def reset(self):
+        """
+        Starts a new epoch with an empty ring (e.g. after a universe reload), so every
+        reconnecting client falls back to a full snapshot. Returns the new seq.
+        """
+        with self._lock:
+            self.seq += 1
+            self.epoch = secrets.token_hex(8)
+            self._entries.clear()
+            return self.seq
+
+    def since(self, seq, strategies=None, epoch=None):
+        """
+        Merges every delta after `seq` of `epoch` into one {strategy: {symbol: fields}}
+        payload, limited to `strategies` (None = all). Returns (current_seq, groups), or
+        (current_seq, None) when `epoch` is not the current one or the ring no longer
+        reaches back to `seq`.
+        """
+        with self._lock:
+            current = self.seq
+            if epoch != self.epoch:
+                return current, None
+            if seq == current:
+                return current, {}
+            if seq > current or not self._entries or self._entries[0][0] > seq + 1:
+                return current, None
+            merged = {}
+            for entry_seq, groups in self._entries:
+                if entry_seq <= seq:
+                    continue
+                for strategy, group in groups.items():
+                    if strategies is not None and strategy not in strategies:
+                        continue
+                    target = merged.setdefault(strategy, {})
+                    for symbol, fields in group.items():
+                        row = target.get(symbol)
+                        if row is None:
+                            target[symbol] = dict(fields)
+                        else:
+                            row.update(fields)
+            return current, merged
@@ -0,0 +1,90 @@
+"""
+Field-level change detection for the live data broadcast.
+
+The last values sent for each market field are kept as column arrays
+aligned with UniverseArrays. Each cycle every field is compared in one array
+operation, so only rows whose market data actually moved are turned into
+dicts, and each of those carries just the fields that changed. Bookkeeping
+fields such as 'last_update' are never compared.
+"""
+
+import numpy as np
+
+# Market fields broadcast to clients; everything else is static CSV data sent with initial_data
+MARKET_FIELDS = ['ltp', 'change', 'volume', 'high', 'low', 'open', 'rvol']
+
+
+def _json_value(field, value):
+    if np.isnan(value):
+        return None
+    if field == 'volume':
+        return int(value)
+    if field == 'rvol':
+        return round(float(value), 2)
+    return float(value)
+
+
+class DeltaTracker:
+    """Remembers what was last sent per symbol and yields only what changed since."""
+
+    def __init__(self, fields=MARKET_FIELDS):
+        self.fields = list(fields)
+        self.symbols = []
+        self.index = {}
+        self.last = {field: np.zeros(0) for field in self.fields}
+        self.sent = np.zeros(0, dtype=bool)  # Rows sent at least once
+
+    def _align(self, arrays):
+        """Re-keys the last-sent state when the universe arrays were rebuilt."""
+        if arrays.symbols is self.symbols:
+            return
+        n = len(arrays)
+        last = {field: np.full(n, np.nan) for field in self.fields}
+        sent = np.zeros(n, dtype=bool)
+        kept_new = [i for i, s in enumerate(arrays.symbols) if s in self.index]
+        kept_old = [self.index[arrays.symbols[i]] for i in kept_new]
+        if kept_new:
+            for field in self.fields:
+                last[field][kept_new] = self.last[field][kept_old]
+            sent[kept_new] = self.sent[kept_old]
+        self.symbols, self.index = arrays.symbols, arrays.index
+        self.last, self.sent = last, sent
+
+    def diff(self, arrays):
+        """
+        Compares the current arrays with what was last sent and records them as sent.
+
+        Returns ({symbol: {field: value}}, new_symbols): the changed fields of every
+        quoted symbol whose market data moved. Symbols sent for the first time
+        (new_symbols) get all market fields.
+        """
+        self._align(arrays)
+        changed_by_field = {}
+        any_changed = np.zeros(len(arrays), dtype=bool)
+        for field in self.fields:
+            current, last = arrays[field], self.last[field]
+            changed = (current != last) & ~(np.isnan(current) & np.isnan(last))
+            changed_by_field[field] = changed
+            any_changed |= changed
+        first_time = arrays.has_quote & ~self.sent
+        rows = np.flatnonzero((any_changed & arrays.has_quote) | first_time)
+
+        deltas = {}
+        new_symbols = set()
+        for i in rows:
+            if first_time[i]:
+                new_symbols.add(self.symbols[i])
+            fields = self.fields if first_time[i] else [f for f in self.fields if changed_by_field[f][i]]
+            deltas[self.symbols[i]] = {field: _json_value(field, arrays[field][i]) for field in fields}
+
+        for field in self.fields:
+            self.last[field][rows] = arrays[field][rows]
+        self.sent[rows] = True
+        return deltas, new_symbols
+
+    def last_sent(self, symbol):
+        """The market fields as clients currently have them, or None if never sent."""
+        i = self.index.get(symbol)
+        if i is None or not self.sent[i]:
+            return None
+        return {field: _json_value(field, self.last[field][i]) for field in self.fields}
@@ -0,0 +1,257 @@
+"""
+Local message bus between the ingest process and the Socket.IO fan-out workers.
+
+The ingest process (Fyers connection, evaluation, database, all state) listens
+on a local socket; each web worker process connects to it. Workers hold the
+client connections and nothing else:
+
+    worker -> ingest   ('connect', sid) / ('disconnect', sid) / ('event', sid, event, args)
+                       ('request', request_id, name, args) / ('backlog', {sid: queued packets})
+    ingest -> worker   ('emit', event, data, to) / ('enter_room', sid, room) / ('leave_room', sid, room)
+                       ('reply', request_id, result)
+
+Requests serve the workers' HTTP routes that read ingest state (/api/latency):
+the worker asks by name and the ingest process answers with a plain value.
+Workers also report each client's send backlog every second, which is what
+the v2 slow-client check reads in this topology (BusHub.send_backlog).
+
+Room broadcasts (data_update, alerts, ...) are pickled once and the same bytes
+are written to every worker, which emits them to its own members of the room,
+so the per-client send work is spread over the worker processes. Replies to a
+single client go only to the worker holding it. No external broker is needed.
+
+Messages are pickled, so the bus is authenticated with a random key that
+fanout_server.py generates at startup and hands to its workers in the
+FANOUT_AUTHKEY environment variable. There is no default key: without one,
+neither side starts.
+"""
+
+import os
+import pickle
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client
+
+BUS_ADDRESS = ('127.0.0.1', 6100) # Local only
+BUS_AUTHKEY_ENV = 'FANOUT_AUTHKEY'
+HANDLER_WORKERS = 32 # Threads running forwarded event handlers (DB access, snapshot builds)
+
+
+def bus_authkey():
+    """The bus key from the environment; raises RuntimeError when it is not set."""
+    key = os.environ.get(BUS_AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{BUS_AUTHKEY_ENV} is not set. Start the workers through fanout_server.py.")
+    return key.encode('utf-8')
+
+
+def connect_to_bus(address=BUS_ADDRESS, authkey=None):
+    return Client(address, authkey=authkey or bus_authkey())
+
+
+class WorkerLink:
+    """One connected worker; sends are serialized since several threads emit."""
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.sids = set()
+        self.backlogs = {} # {sid: packets queued on the worker}, as last reported
+        self._lock = threading.Lock()
+
+    def send_bytes(self, blob):
+        with self._lock:
+            self.conn.send_bytes(blob)
+
+    def send(self, message):
+        self.send_bytes(pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class BusHub:
+    """
+    Ingest side of the bus. Stands in for the Flask-SocketIO object and its
+    request-context helpers inside the v2 module (see bind_server_module), and
+    runs the v2 handlers for events forwarded by the workers.
+
+    Handlers run on a thread pool so one slow handler (a database call, a
+    snapshot build) does not hold up the other clients of its worker; the
+    events of one client still run one after another, in the order received.
+    """
+
+    def __init__(self, handlers, requests=None, address=BUS_ADDRESS, authkey=None):
+        self.handlers = handlers # {event: v2 handler}
+        self.requests = dict(requests or {}) # {request name: function(*args) -> picklable result}
+        self.listener = Listener(address, authkey=authkey or bus_authkey())
+        self._lock = threading.Lock()
+        self.workers = []
+        self.sessions = {} # {sid: WorkerLink}
+        self._session = threading.local()
+        self.executor = ThreadPoolExecutor(max_workers=HANDLER_WORKERS, thread_name_prefix='bus-handler')
+        self._tasks_lock = threading.Lock()
+        self._session_tasks = {} # {sid: deque of handler calls not yet run}
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        print(f"✅ Fan-out bus listening on {self.listener.address}")
+
+    def _accept_loop(self):
+        while True:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                print(f"❌ Fan-out bus: rejected worker connection: {e}")
+                continue
+            with self._lock:
+                worker = WorkerLink(conn, f"worker-{len(self.workers) + 1}")
+                self.workers.append(worker)
+            print(f"🔗 Fan-out {worker.name} connected.")
+            threading.Thread(target=self._worker_loop, args=(worker,), daemon=True).start()
+
+    def _worker_loop(self, worker):
+        """Reads the worker's forwarded events and queues each on its client's handler queue."""
+        try:
+            while True:
+                message = worker.conn.recv()
+                kind, sid = message[0], message[1]
+                if kind == 'connect':
+                    # Registered right away, so replies from any handler can find the client's worker
+                    with self._lock:
+                        self.sessions[sid] = worker
+                        worker.sids.add(sid)
+                    self._dispatch(sid, self._run_handler, sid, 'connect', ())
+                elif kind == 'disconnect':
+                    self._dispatch(sid, self._disconnect, worker, sid)
+                elif kind == 'event':
+                    self._dispatch(sid, self._run_handler, sid, message[2], message[3])
+                elif kind == 'request':
+                    self.executor.submit(self._answer, worker, message[1], message[2], message[3])
+                elif kind == 'backlog':
+                    worker.backlogs = message[1]
+        except (EOFError, OSError):
+            pass
+        # The worker went away: its clients are gone with it
+        print(f"⚠️  Fan-out {worker.name} disconnected ({len(worker.sids)} clients).")
+        with self._lock:
+            self.workers.remove(worker)
+            sids = list(worker.sids)
+        for sid in sids:
+            self._dispatch(sid, self._disconnect, worker, sid)
+
+    def _dispatch(self, sid, function, *args):
+        """Runs function(*args) on the pool after every call queued earlier for the same client."""
+        with self._tasks_lock:
+            tasks = self._session_tasks.get(sid)
+            if tasks is not None:
+                tasks.append((function, args))
+                return
+            self._session_tasks[sid] = deque([(function, args)])
+        self.executor.submit(self._drain, sid)
+
+    def _drain(self, sid):
+        while True:
+            with self._tasks_lock:
+                tasks = self._session_tasks[sid]
+                if not tasks:
+                    del self._session_tasks[sid]
+                    return
+                function, args = tasks.popleft()
+            try:
+                function(*args)
+            except Exception as e:
+                print(f"Error handling a forwarded event for {sid}: {e}")
+
+    def _disconnect(self, worker, sid):
+        if sid not in worker.sids:
+            return # Already handled
+        self._run_handler(sid, 'disconnect', ())
+        self._forget(worker, sid)
+
+    def _forget(self, worker, sid):
+        with self._lock:
+            worker.sids.discard(sid)
+            if self.sessions.get(sid) is worker:
+                del self.sessions[sid]
+
+    def _answer(self, worker, request_id, name, args):
+        result = None
+        function = self.requests.get(name)
+        if function is None:
+            print(f"Fan-out {worker.name} asked for an unknown request '{name}'.")
+        else:
+            try:
+                result = function(*args)
+            except Exception as e:
+                print(f"Error answering request '{name}' from fan-out {worker.name}: {e}")
+        try:
+            worker.send(('reply', request_id, result))
+        except (OSError, ValueError) as e:
+            print(f"Error replying to fan-out {worker.name}: {e}")
+
+    def _run_handler(self, sid, event, args):
+        handler = self.handlers.get(event)
+        if handler is None:
+            return
+        self._session.sid = sid
+        try:
+            handler(*args)
+        except Exception as e:
+            print(f"Error in '{event}' handler for {sid}: {e}")
+        finally:
+            self._session.sid = None
+
+    # --- Flask-SocketIO server object (socketio.emit from any thread) ---
+    def emit(self, event, data=None, to=None, room=None, **kwargs):
+        target = to or room
+        worker = self.sessions.get(target) if target else None
+        if worker is not None:
+            # A single client: only its worker needs it
+            worker.send(('emit', event, data, target))
+            return
+        blob = pickle.dumps(('emit', event, data, target), protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            workers = list(self.workers)
+        for worker in workers:
+            try:
+                worker.send_bytes(blob)
+            except (OSError, ValueError) as e:
+                print(f"Error sending '{event}' to fan-out {worker.name}: {e}")
+
+    def send_backlog(self, sid):
+        """Packets queued for a client on its worker as last reported, or None when unknown."""
+        worker = self.sessions.get(sid)
+        return worker.backlogs.get(sid) if worker is not None else None
+
+    # --- Request-context helpers used inside event handlers ---
+    @property
+    def sid(self):
+        return self._session.sid
+
+    def _send_to_session(self, sid, message):
+        worker = self.sessions.get(sid)
+        if worker is not None:
+            worker.send(message)
+
+    def handler_emit(self, event, data=None, to=None, room=None, **kwargs):
+        target = to or room
+        if target:
+            self.emit(event, data, to=target)
+        else:
+            self._send_to_session(self.sid, ('emit', event, data, self.sid))
+
+    def join_room(self, room, sid=None, **kwargs):
+        sid = sid or self.sid
+        self._send_to_session(sid, ('enter_room', sid, room))
+
+    def leave_room(self, room, sid=None, **kwargs):
+        sid = sid or self.sid
+        self._send_to_session(sid, ('leave_room', sid, room))
+
+    def bind_server_module(self, server):
+        """Points the v2 module's Socket.IO globals at the bus (request.sid, emit, rooms, send backlogs)."""
+        server.socketio = self
+        server.client_send_backlog = self.send_backlog
+        server.request = self
+        server.emit = self.handler_emit
+        server.join_room = self.join_room
+        server.leave_room = self.leave_room
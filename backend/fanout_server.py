@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Multi-process topology: one ingest process, N Socket.IO fan-out workers.
+
+    python fanout_server.py --workers 4
+
+This process is the ingest/analytics side: the single Fyers connection,
+evaluation, database and all state of optimized_flask_server_v2, with its
+Socket.IO calls redirected onto the local bus (fanout_bus.py). It then starts
+N uvicorn worker processes (fanout_worker.py) on one shared port; those hold
+the client websockets, so per-client send work scales across cores while the
+market data is ingested and evaluated once.
+"""
+
+import os
+import sys
+import secrets
+import argparse
+from pathlib import Path
+
+import uvicorn
+
+# --- Add backend directory to path to import local modules ---
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+import optimized_flask_server_v2 as server
+from fanout_bus import BusHub, BUS_AUTHKEY_ENV
+
+HOST = '0.0.0.0'
+PORT = 5000
+DEFAULT_WORKERS = max(1, (os.cpu_count() or 2) - 1) # Leave a core for ingest
+
+
+def latency_stats(reset=False):
+    """Answers a worker's /api/latency: percentiles per stage, optionally starting a new window."""
+    stats = server.latency_tracker.summary()
+    if reset:
+        server.latency_tracker.reset()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest process with multi-process Socket.IO fan-out")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--csv', default=os.environ.get('UNIVERSE_CSV'), help="Universe CSV (default: today's file)")
+    args = parser.parse_args()
+
+    # A fresh bus key per run; the uvicorn workers inherit it through the environment
+    os.environ[BUS_AUTHKEY_ENV] = secrets.token_hex(32)
+    hub = BusHub(server.EVENT_HANDLERS, requests={'latency': latency_stats})
+    hub.bind_server_module(server)
+    hub.start()
+
+    if args.csv:
+        server.TARGET_CSV_FILE = args.csv
+    else:
+        from run_optimized_dashboard_v2 import get_dynamic_csv_path
+        server.TARGET_CSV_FILE = get_dynamic_csv_path()
+
+    print("Starting ingest process...")
+    server.start_background_services()
+
+    # The workers only import fanout_worker; everything stateful stays in this process
+    print(f"Starting {args.workers} fan-out workers on http://{HOST}:{args.port}")
+    uvicorn.run('fanout_worker:asgi_app', host=HOST, port=args.port, workers=args.workers,
+                app_dir=str(SCRIPT_DIR), log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Stateless Socket.IO fan-out worker (ASGI), fed by the ingest process over the
+local bus in fanout_bus.py. Started N times by fanout_server.py.
+
+A worker holds client connections and room membership only. Client events go
+to the ingest process unchanged; emits and room changes come back and are
+applied on the event loop in the order they were sent. Outgoing messages are
+written to the bus by a sender thread, so a full socket buffer never blocks
+the event loop. If the bus drops, the worker disconnects its clients (they
+reconnect and resync) and reconnects.
+
+Workers also serve the static dashboard build and /api/latency, which they
+request from the ingest process over the bus, and report each client's send
+backlog every second so the ingest side can slow down lagging clients.
+"""
+
+import sys
+import json
+import queue
+import asyncio
+import itertools
+import threading
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import socketio
+
+# --- Add backend directory to path to import local modules ---
+SCRIPT_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(SCRIPT_DIR))
+
+from fanout_bus import connect_to_bus, bus_authkey
+
+BUS_RETRY_SECONDS = 1
+REQUEST_TIMEOUT = 5 # Seconds to wait for the ingest process to answer a request
+BACKLOG_REPORT_SECONDS = 1
+TRANSPORTS = ['websocket'] # Workers share one port; polling would need sticky sessions
+STATIC_FOLDER = (SCRIPT_DIR / '../frontend/trading-dashboard/build').resolve()
+
+sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*', transports=TRANSPORTS)
+
+
+class IngestLink:
+    """The worker's bus connection: forwards client events, applies ingest commands in order."""
+
+    def __init__(self, sio):
+        self.sio = sio
+        self.conn = None
+        self.outbox = None # Messages for the ingest process, written by the sender thread
+        self.loop = None
+        self.queue = None
+        self.sids = set() # Clients connected to this worker
+        self.pending = {} # {request_id: future} awaiting a reply
+        self._request_ids = itertools.count(1)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        while True:
+            try:
+                self.conn = await self.loop.run_in_executor(None, connect_to_bus)
+            except (OSError, EOFError) as e:
+                print(f"⚠️  Fan-out worker: ingest bus unavailable ({e}), retrying...")
+                await asyncio.sleep(BUS_RETRY_SECONDS)
+                continue
+            print("✅ Fan-out worker connected to the ingest bus.")
+            self.outbox = queue.Queue()
+            threading.Thread(target=self._receive_loop, args=(self.conn,), daemon=True).start()
+            threading.Thread(target=self._send_loop, args=(self.conn, self.outbox), daemon=True).start()
+            reporter = self.loop.create_task(self._report_loop())
+            await self._apply_loop()
+            reporter.cancel()
+            # Bus lost: clients' state on the ingest side is gone, let them reconnect
+            self.conn = None
+            self.outbox.put(None)
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_result(None)
+            self.pending.clear()
+            for sid in list(self.sids):
+                await self.sio.disconnect(sid)
+
+    def _receive_loop(self, conn):
+        try:
+            while True:
+                message = conn.recv()
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+        except (EOFError, OSError):
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def _apply_loop(self):
+        while True:
+            message = await self.queue.get()
+            if message is None:
+                print("❌ Fan-out worker lost the ingest bus.")
+                return
+            try:
+                if message[0] == 'emit':
+                    _, event, data, to = message
+                    await self.sio.emit(event, data, to=to)
+                elif message[0] == 'enter_room':
+                    await maybe_await(self.sio.enter_room(message[1], message[2]))
+                elif message[0] == 'leave_room':
+                    await maybe_await(self.sio.leave_room(message[1], message[2]))
+                elif message[0] == 'reply':
+                    future = self.pending.pop(message[1], None)
+                    if future is not None and not future.done():
+                        future.set_result(message[2])
+            except Exception as e:
+                print(f"Error applying bus message '{message[0]}': {e}")
+
+    async def _report_loop(self):
+        """Reports the packets queued per client, for the ingest side's slow-client check."""
+        while True:
+            await asyncio.sleep(BACKLOG_REPORT_SECONDS)
+            if self.sids:
+                self.forward(('backlog', self.send_backlogs()))
+
+    def send_backlogs(self):
+        backlogs = {}
+        for sid in self.sids:
+            try:
+                socket = self.sio.eio.sockets.get(self.sio.manager.eio_sid_from_sid(sid, '/'))
+            except Exception:
+                continue
+            if socket is not None:
+                backlogs[sid] = socket.queue.qsize()
+        return backlogs
+
+    def _send_loop(self, conn, outbox):
+        while True:
+            message = outbox.get()
+            if message is None:
+                return
+            try:
+                conn.send(message)
+            except (OSError, ValueError) as e:
+                print(f"Error forwarding '{message[0]}' to the ingest bus: {e}")
+                return # The receive loop notices the dead bus and reconnects
+
+    def forward(self, message):
+        """Queues a message for the ingest process; False while the bus is down."""
+        if self.conn is None:
+            return False
+        self.outbox.put(message)
+        return True
+
+    async def request(self, name, *args):
+        """Asks the ingest process for a value; None when the bus is down or it does not answer in time."""
+        request_id = next(self._request_ids)
+        future = self.loop.create_future()
+        self.pending[request_id] = future
+        if not self.forward(('request', request_id, name, args)):
+            self.pending.pop(request_id, None)
+            return None
+        try:
+            return await asyncio.wait_for(future, REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.pending.pop(request_id, None)
+            return None
+
+
+async def maybe_await(result):
+    if asyncio.iscoroutine(result):
+        await result
+
+
+link = IngestLink(sio)
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    # Refuse clients while the ingest process is unreachable; they retry
+    if not link.forward(('connect', sid)):
+        return False
+    link.sids.add(sid)
+
+
+@sio.event
+async def disconnect(sid, *args):
+    link.sids.discard(sid)
+    link.forward(('disconnect', sid))
+
+
+@sio.on('*')
+async def forward_event(event, sid, *args):
+    link.forward(('event', sid, event, args[:1]))
+
+
+# --- HTTP routes next to Socket.IO ---
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode('utf-8')
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def latency_stats(scope, send):
+    """Tick-to-alert latency percentiles per pipeline stage, from the ingest process. ?reset=1 starts a new window."""
+    reset = parse_qs(scope.get('query_string', b'').decode()).get('reset') == ['1']
+    stats = await link.request('latency', reset)
+    if stats is None:
+        await send_json(send, {'error': 'ingest process unavailable'}, status=503)
+    else:
+        await send_json(send, stats)
+
+
+socketio_app = socketio.ASGIApp(
+    sio,
+    static_files={'/': f'{STATIC_FOLDER}/'} if STATIC_FOLDER.is_dir() else None # Trailing slash: '/' serves index.html
+)
+
+
+async def asgi_app(scope, receive, send):
+    """Lifespan and /api routes; everything else goes to Socket.IO (and the static build)."""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    bus_authkey()
+                except RuntimeError as e:
+                    print(f"❌ Fan-out worker cannot start: {e}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                asyncio.get_running_loop().create_task(link.run())
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    elif scope['type'] == 'http' and scope['path'] == '/api/latency':
+        await latency_stats(scope, send)
+    else:
+        await socketio_app(scope, receive, send)
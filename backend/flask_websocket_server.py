@@ -5,6 +5,7 @@ import time
 import json
 import pandas as pd
 from fyers_ws_singleton import start_websocket, get_ltp_data
+from universe_loader import load_universe_csv
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
@@ -19,24 +20,8 @@ def load_csv_data():
     """Load static data from CSV file"""
     global csv_data
     try:
-        df = pd.read_csv("consolidated_stock_view_2025-05-23_V2.csv")
-        df.iloc[:, 0] = df.iloc[:, 0].astype(str)
-        
-        for idx, row in df.iterrows():
-            symbol = row.iloc[0]
-            # Convert symbol to Fyers format
-            wsym = symbol
-            if not wsym.startswith("NSE:"):
-                wsym = f"NSE:{wsym}" if not wsym.endswith("-EQ") else f"NSE:{wsym}"
-            if not wsym.endswith("-EQ"):
-                wsym = f"{wsym}-EQ"
-            
-            # Store all CSV columns as static data
-            static_data = row.iloc[1:].to_dict()
-            # Remove unwanted columns
-            static_data.pop('Announcement Links', None)
-            static_data.pop('Announcement Text', None)
-            csv_data[wsym] = static_data
+        # Keep the original CSV column names as static data
+        csv_data = load_universe_csv("consolidated_stock_view_2025-05-23_V2.csv", map_columns=False)
             
         print(f"Loaded {len(csv_data)} symbols from CSV")
         return list(csv_data.keys())
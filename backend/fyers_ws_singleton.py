@@ -5,6 +5,7 @@ from fyers_apiv3.FyersWebsocket import data_ws
 ltp_lock = threading.Lock()
 global_ltp = {}
 global_invalid = set()
+changed_symbols = set()  # Symbols ticked since the last take_changed_symbols()
 
 class FyersWebSocketSingleton:
     _instance = None
@@ -13,9 +14,11 @@ class FyersWebSocketSingleton:
     def __init__(self, access_token, symbols):
         self.access_token = access_token
         self.symbols = symbols
+        self.subscribed = set(symbols)  # Ticks for other symbols are late ones after an unsubscribe
         self.ws_thread = None
         self.fyers = None
         self.started = False
+        self.symbols_lock = threading.Lock()
 
     @classmethod
     def get_instance(cls, access_token, symbols):
@@ -27,8 +30,12 @@ class FyersWebSocketSingleton:
     def onmessage(self, message):
         # print(f"[DEBUG] onmessage called: {message}") # Commented out to reduce console noise
         if isinstance(message, dict) and "symbol" in message:
+            message['ingest_ts'] = time.time()  # Start of the tick-to-alert trace
             with ltp_lock:
+                if message['symbol'] not in self.subscribed:
+                    return
                 global_ltp[message['symbol']] = message  # Store full dict
+                changed_symbols.add(message['symbol'])
 
     def onerror(self, message):
         print("Error:", message)
@@ -43,7 +50,9 @@ class FyersWebSocketSingleton:
         print("[DEBUG] WebSocket connection opened and subscribing...")
         data_type = "SymbolUpdate"
         if self.fyers is not None:
-            self.fyers.subscribe(symbols=self.symbols, data_type=data_type)
+            with self.symbols_lock:
+                symbols = list(self.symbols)
+            self.fyers.subscribe(symbols=symbols, data_type=data_type)
             self.fyers.keep_running()
         else:
             print("[ERROR] fyers is None in onopen!")
@@ -65,6 +74,31 @@ class FyersWebSocketSingleton:
         while True:
             time.sleep(1)
 
+    def update_subscriptions(self, added, removed):
+        """Subscribes/unsubscribes only the changed symbols on the live socket."""
+        data_type = "SymbolUpdate"
+        with self.symbols_lock:
+            removed_set = set(removed)
+            current = set(self.symbols)
+            added = [s for s in added if s not in current]
+            self.symbols = [s for s in self.symbols if s not in removed_set] + added
+
+            # Drop quotes for symbols that left the universe; from here on their ticks are ignored
+            with ltp_lock:
+                self.subscribed = set(self.symbols)
+                for symbol in removed:
+                    global_ltp.pop(symbol, None)
+                    global_invalid.discard(symbol)
+                    changed_symbols.discard(symbol)
+
+        # Before the first connect, onopen subscribes the updated list
+        if self.fyers is None:
+            return
+        if removed:
+            self.fyers.unsubscribe(symbols=list(removed), data_type=data_type)
+        if added:
+            self.fyers.subscribe(symbols=added, data_type=data_type)
+
     def start(self):
         if not self.started:
             print("[DEBUG] Starting WebSocket thread (singleton)...")
@@ -82,8 +116,19 @@ def start_websocket(access_token, symbols):
         _singleton.start()
     return _singleton
 
+def update_subscriptions(added, removed):
+    if _singleton is not None:
+        _singleton.update_subscriptions(added, removed)
+
 def get_ltp_data():
     with ltp_lock:
         ltp_copy = dict(global_ltp)
         invalid_copy = set(global_invalid)
-    return ltp_copy, invalid_copy 
\ No newline at end of file
+    return ltp_copy, invalid_copy
+
+def take_changed_symbols():
+    """Returns the symbols that ticked since the last call and starts a new set."""
+    global changed_symbols
+    with ltp_lock:
+        changed, changed_symbols = changed_symbols, set()
+    return changed
@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 from streamlit_autorefresh import st_autorefresh
 from fyers_ws_singleton import start_websocket, get_ltp_data
+from universe_loader import load_universe_snapshot
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 
 st.set_page_config(
@@ -11,35 +12,20 @@ st.set_page_config(
 )
 
 # --- Read all symbols and static columns from CSV once ---
-csv_df = pd.read_csv("consolidated_stock_view_2025-05-23_V2.csv")
-# Ensure symbol column is always string
-csv_df.iloc[:, 0] = csv_df.iloc[:, 0].astype(str)
+# (served from the binary snapshot cache unless the CSV changed)
+universe = load_universe_snapshot("consolidated_stock_view_2025-05-23_V2.csv", map_columns=False)
 
 # Remove unwanted columns and prepare for reordering
-cols = list(csv_df.columns)
+cols = list(universe['columns'])
 # Remove 'Announcement Links' and 'Announcement Text'
 cols = [c for c in cols if c not in ['Announcement Links', 'Announcement Text']]
 # Move 'Announcement Description' to the end
 if 'Announcement Description' in cols:
     cols = [c for c in cols if c != 'Announcement Description'] + ['Announcement Description']
 
-# Build symbol list in Fyers format
-symbols = []
-symbol_to_static = {}
-for idx, row in csv_df.iterrows():
-    sym = row.iloc[0]
-    wsym = sym
-    if not wsym.startswith("NSE:"):
-        wsym = f"NSE:{wsym}" if not wsym.endswith("-EQ") else f"NSE:{wsym}"
-    if not wsym.endswith("-EQ"):
-        wsym = f"{wsym}-EQ" if not wsym.endswith("-EQ") else wsym
-    symbols.append(wsym)
-    # Store static columns (as dict, excluding symbol col)
-    static_dict = row.iloc[1:].to_dict()
-    # Remove unwanted columns
-    static_dict.pop('Announcement Links', None)
-    static_dict.pop('Announcement Text', None)
-    symbol_to_static[wsym] = static_dict
+# Build symbol list in Fyers format, with static columns (excluding symbol col) per symbol
+symbol_to_static = universe['csv_data']
+symbols = universe['symbols']
 
 # Read access token from file
 with open("fyers_token.txt", "r") as f:
@@ -2,13 +2,15 @@ import os
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
-import pandas as pd
 from fyers_apiv3 import fyersModel
 
 # --- Add backend directory to path to import database module ---
 SCRIPT_DIR = Path(__file__).resolve().parent
 sys.path.insert(0, str(SCRIPT_DIR))
 
+from universe_loader import DEFAULT_DATA_DIR, find_universe_csv, load_universe_snapshot
+from daily_candles import backfill_daily_candles
+
 try:
     from database import pool
 except ImportError as e:
@@ -19,37 +21,22 @@ except ImportError as e:
 def get_symbols_from_latest_csv():
     """
     Finds the latest daily CSV and returns a list of symbols.
-    This logic is adapted from the run_optimized_dashboard_v2.py script.
+    Uses the same file lookup and cached universe snapshot as the dashboard server.
     """
-    data_dir = Path("C:/Users/shash/Desktop/stock_selection_live/daily_consolidated_views")
+    data_dir = DEFAULT_DATA_DIR
     if not data_dir.is_dir():
         print(f"❌ Error: Data directory '{data_dir}' not found.")
         return []
 
     try:
-        candidate_files = list(data_dir.glob("consolidated_stock_view_*-*_V2.csv"))
-        if not candidate_files:
+        latest_file = find_universe_csv(data_dir, datetime.now().date())
+        if latest_file is None:
             print(f"❌ Error: No 'consolidated_stock_view_*.csv' files found in {data_dir}.")
             return []
 
-        latest_file = max(candidate_files, key=lambda f: f.stat().st_mtime)
         print(f"✅ Using latest CSV file for symbols: {latest_file.name}")
-        df = pd.read_csv(latest_file)
-        
-        # Assume first column is the symbol
-        symbols = df.iloc[:, 0].astype(str).tolist()
-        
-        # Format symbols for Fyers API (e.g., 'RELIANCE' -> 'NSE:RELIANCE-EQ')
-        formatted_symbols = []
-        for symbol in symbols:
-            wsym = symbol
-            if not wsym.startswith("NSE:"):
-                wsym = f"NSE:{wsym}"
-            if not wsym.endswith("-EQ"):
-                wsym = f"{wsym}-EQ"
-            formatted_symbols.append(wsym)
-            
-        return formatted_symbols
+        # Symbols are already in Fyers format (e.g., 'RELIANCE' -> 'NSE:RELIANCE-EQ')
+        return load_universe_snapshot(latest_file)['symbols']
     except Exception as e:
         print(f"❌ Error reading symbols from CSV: {e}")
         return []
@@ -135,6 +122,9 @@ def import_historical_data():
                         cur.executemany(query, all_candles_for_chunk)
                         print(f"   ✅ Successfully inserted {cur.rowcount} new candles into the database.")
                         total_candles_inserted += cur.rowcount
+                        # Keep the daily rollup in step with the imported minutes
+                        backfill_daily_candles(cur, symbols=chunk, start_day=(today - timedelta(days=7)).date())
+                        print(f"   ✅ Rolled up {cur.rowcount} daily candles.")
             except Exception as e:
                 print(f"   ❌ Database Error for chunk: {e}")
         else:
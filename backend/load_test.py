@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Concurrent-client load test for the dashboard server.
+
+Opens N websocket Socket.IO clients from one asyncio process, has each request
+its initial snapshot like the dashboard does, then listens to data_update for
+a while. Start the server first (python asgi_server.py), then:
+
+    python load_test.py --clients 2000 --duration 60
+
+Reports connect and initial_data latency, update throughput and how long one
+broadcast takes to reach every client (fan-out spread per sequence number).
+"""
+
+import sys
+import time
+import asyncio
+import argparse
+import resource
+
+import socketio
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def report(name, values_seconds):
+    print(f"   {name:<28} p50 {percentile(values_seconds, 50) * 1000:>9.1f} ms   "
+          f"p99 {percentile(values_seconds, 99) * 1000:>9.1f} ms   max {max(values_seconds or [0]) * 1000:>9.1f} ms")
+
+
+def raise_file_limit(clients):
+    """Each client holds a socket; lift the soft open-file limit as far as allowed."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = min(hard, max(soft, clients * 2 + 256))
+    if wanted > soft:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+    return wanted
+
+
+class LoadStats:
+    def __init__(self):
+        self.connect_times = []
+        self.initial_data_times = []
+        self.failed = 0
+        self.disconnects = 0 # Before the test ended
+        self.updates = 0
+        self.seq_seen = {}  # {seq: [first_received, last_received, clients]}
+
+
+async def run_client(index, url, stats, gzip, stop):
+    client = socketio.AsyncClient(reconnection=False)
+    initial_data = asyncio.Event()
+    requested_at = None
+
+    @client.on('initial_data')
+    async def on_initial_data(snapshot):
+        stats.initial_data_times.append(time.perf_counter() - requested_at)
+        initial_data.set()
+
+    @client.on('data_update')
+    async def on_data_update(update):
+        now = time.perf_counter()
+        stats.updates += 1
+        seen = stats.seq_seen.get(update.get('seq'))
+        if seen is None:
+            stats.seq_seen[update.get('seq')] = [now, now, 1]
+        else:
+            seen[1] = now
+            seen[2] += 1
+
+    @client.on('disconnect')
+    async def on_disconnect(*args):
+        if not stop.is_set():
+            stats.disconnects += 1
+
+    start = time.perf_counter()
+    try:
+        await client.connect(url, transports=['websocket'])
+    except Exception as e:
+        stats.failed += 1
+        if stats.failed <= 5:
+            print(f"❌ Client {index} failed to connect: {e}")
+        return
+    stats.connect_times.append(time.perf_counter() - start)
+
+    requested_at = time.perf_counter()
+    await client.emit('request_initial_data', {'compression': 'gzip' if gzip else None})
+    try:
+        await asyncio.wait_for(initial_data.wait(), timeout=60)
+    except asyncio.TimeoutError:
+        print(f"⚠️  Client {index} got no initial_data within 60 s")
+    await stop.wait()
+    await client.disconnect()
+
+
+async def run_load_test(url, clients, duration, ramp, gzip):
+    stats = LoadStats()
+    stop = asyncio.Event()
+    tasks = []
+
+    print(f"🔌 Connecting {clients} clients to {url} ({ramp}/s)...")
+    ramp_start = time.perf_counter()
+    for i in range(clients):
+        tasks.append(asyncio.create_task(run_client(i, url, stats, gzip, stop)))
+        if (i + 1) % ramp == 0:
+            await asyncio.sleep(1)
+    # Every client has requested its snapshot before the measurement window starts
+    while len(stats.initial_data_times) + stats.failed < clients and time.perf_counter() - ramp_start < clients / ramp + 60:
+        await asyncio.sleep(0.5)
+    connected = len(stats.connect_times)
+    print(f"✅ {connected} connected, {stats.failed} failed, "
+          f"{len(stats.initial_data_times)} snapshots in {time.perf_counter() - ramp_start:.1f} s")
+
+    stats.updates = 0
+    stats.seq_seen = {}
+    print(f"⏱️  Measuring data_update delivery for {duration} s...")
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print("\n📊 Results")
+    report("connect", stats.connect_times)
+    report("initial_data", stats.initial_data_times)
+    # Ignore a sequence number straddling the window edge
+    complete = [s for s in stats.seq_seen.values() if s[2] >= connected * 0.99]
+    report("broadcast fan-out spread", [s[1] - s[0] for s in complete])
+    print(f"   {'data_update messages':<28} {stats.updates} ({stats.updates / duration:.0f}/s, "
+          f"{len(stats.seq_seen)} broadcasts, {len(complete)} reached ≥99% of clients)")
+    print(f"   {'unexpected disconnects':<28} {stats.disconnects}")
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Concurrent Socket.IO client load test")
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=2000)
+    parser.add_argument('--duration', type=int, default=60, help="Seconds of data_update measurement")
+    parser.add_argument('--ramp', type=int, default=200, help="New connections per second")
+    parser.add_argument('--gzip', action='store_true', help="Request gzipped snapshots")
+    args = parser.parse_args()
+
+    limit = raise_file_limit(args.clients)
+    if limit < args.clients + 64:
+        print(f"⚠️  Open file limit is {limit}; raise it (ulimit -n) for {args.clients} clients.")
+    try:
+        asyncio.run(run_load_test(args.url, args.clients, args.duration, args.ramp, args.gzip))
+    except KeyboardInterrupt:
+        sys.exit(1)
@@ -1,5 +1,5 @@
-from flask import Flask, render_template_string, send_from_directory, request
-from flask_socketio import SocketIO, emit
+from flask import Flask, render_template_string, send_from_directory, request, jsonify
+from flask_socketio import SocketIO, emit, join_room, leave_room
 import threading
 import time
 import json
@@ -8,7 +8,6 @@ import os
 import random
 from pathlib import Path
 from datetime import datetime, timezone, timedelta
-from collections import deque
 
 # Get the directory where the script is located
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -19,7 +18,7 @@ TARGET_CSV_FILE = None
 # Try to import your existing Fyers WebSocket singleton
 fyers_available = False
 try:
-    from fyers_ws_singleton import start_websocket, get_ltp_data
+    from fyers_ws_singleton import start_websocket, get_ltp_data, update_subscriptions, take_changed_symbols
     fyers_available = True
     print("✅ Fyers WebSocket imported successfully")
 except ImportError:
@@ -29,6 +28,12 @@ except ImportError:
     def start_websocket(token, symbols):
         print("Mock: WebSocket started")
         return True
+
+    def update_subscriptions(added, removed):
+        print(f"Mock: subscribed {len(added)}, unsubscribed {len(removed)} symbols")
+
+    def take_changed_symbols():
+        return None  # Mock ticks are all new each call
         
     def get_ltp_data():
         """Mock function that returns sample trading data"""
@@ -43,7 +48,8 @@ except ImportError:
                 'vol_traded_today': random.randint(100000, 5000000),
                 'high_price': round(base_price * 1.05, 2),
                 'low_price': round(base_price * 0.95, 2),
-                'open_price': round(base_price / (1 + change_pct/100), 2)
+                'open_price': round(base_price / (1 + change_pct/100), 2),
+                'ingest_ts': time.time()
             }
         return mock_data, set()
 
@@ -51,9 +57,31 @@ except ImportError:
 from database import pool, create_tables
 # --------------------------
 
+from universe_loader import load_universe_snapshot, diff_universe, StrategyIndex
+from alert_index import AlertIndex
+from alert_rules import RuleBook
+from alert_store import AlertStore
+from alert_history import AlertHistory
+from alert_dispatch import AlertDispatcher
+from alert_subscriptions import AlertSubscriptions, setting_room
+from latency import LatencyTracker
+from delta_tracker import DeltaTracker, MARKET_FIELDS
+from wire_format import KeyDictionary, encode_groups, json_bytes, msgpack_available, ENCODINGS
+from snapshot_cache import SnapshotCache, COMPRESSIONS
+from delta_log import DeltaLog
+from update_coalescer import UpdateCoalescer, snap_interval, slower_interval
+from viewports import ViewportRegistry, ViewportError, viewport_room
+from stream_subscriptions import StreamSubscriptions, stream_room
+from reference_levels import ensure_reference_levels, compute_reference_levels
+from daily_candles import DailyCandleRollup, catch_up_daily_candles
+from system_alerts import SystemAlertEngine, LevelCrossRule, system_alert_id
+from range_scanner import RangeScan, LEVEL_COMPARISONS
+from volume_spikes import VolumeSpikeDetector
+
 # --- Candle Aggregation ---
 live_candles = {} # Holds the current 1-min candle data for each symbol
 # Example: {'NSE:RELIANCE-EQ': {'timestamp': ..., 'open': ..., 'high': ..., 'low': ..., 'close': ..., 'volume': ...}}
+daily_rollup = DailyCandleRollup() # Today's daily candle per symbol, written through to candles_1day
 # --------------------------
 
 app = Flask(__name__, static_folder='../frontend/trading-dashboard/build', static_url_path='/')
@@ -63,35 +91,102 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
 # Global variables
 symbols_data = {}
 csv_data = {}
+strategy_index = StrategyIndex() # Strategy membership of csv_data, rebuilt whenever it is (re)loaded
+# Quoted symbols csv_data does not list are still streamed, under 'Uncategorized' (see stream_universe)
+unlisted_symbols = set()
+# Symbols a reload removed: a quote copied before the reload must not bring them back as unlisted
+retired_symbols = set()
+stream_universe_state = (None, {}, {}) # (source (csv_data, strategy_index), universe, members), swapped as one
 websocket_started = False
 connected_clients = set()
-active_alerts = [] # To store active alerts
+alert_index = AlertIndex() # User alerts, indexed by symbol and threshold
+rule_book = RuleBook() # User alerts defined by rule expressions (e.g. "ltp > pdh and rvol > 3")
 alert_id_counter = 0 # Simple counter for unique alert IDs
-
-# In-memory set to track stocks that have already triggered a PDH cross alert today
-pdh_crossed_stocks = set()
-
-# System alert history storage
-system_alert_history = []
-
-# Set to track stocks that have already triggered a 5-min positive candle alert today
-positive_5min_alerted_stocks = set()
-
-# Dictionary to store recent volume history for spike detection
-# {'NSE:RELIANCE-EQ': deque([vol1, vol2, ...], maxlen=10)}
-volume_history = {}
+alert_store = AlertStore() # Batched write-through of alerts to PostgreSQL
+
+# Vectorized PDH cross / level-cross rules; tracks which stocks already fired today
+system_alert_engine = SystemAlertEngine()
+
+# System alert history: bounded ring buffer indexed by symbol and type.
+# Set SYSTEM_ALERT_ARCHIVE to a file path to append evicted alerts there as JSON lines.
+SYSTEM_ALERT_HISTORY_SIZE = 2000
+SYSTEM_ALERT_ARCHIVE = None
+system_alert_history = AlertHistory(SYSTEM_ALERT_HISTORY_SIZE, SYSTEM_ALERT_ARCHIVE)
+
+# Alerts fired during a cycle are sent as one batched event per kind at the end of the cycle.
+# Cooldowns (seconds) rate-limit system alerts per (symbol, type) pair; SYMBOL_ALERT_COOLDOWN
+# additionally limits how often any system alert can fire for the same symbol (0 = off).
+SYSTEM_ALERT_COOLDOWNS = {
+    'Volume Spike': 300,
+}
+DEFAULT_ALERT_COOLDOWN = 0
+SYMBOL_ALERT_COOLDOWN = 0
+alert_dispatcher = AlertDispatcher(SYSTEM_ALERT_COOLDOWNS, DEFAULT_ALERT_COOLDOWN, SYMBOL_ALERT_COOLDOWN)
+
+# Last market values sent per symbol; data_update carries only fields that changed
+delta_tracker = DeltaTracker(MARKET_FIELDS)
+
+# Payload encoding ('json' by default, 'msgpack' on request; see wire_format.py) and followed
+# strategies per session. Sessions sit in one room per (encoding, strategy) they follow, so each
+# group is encoded once per room instead of once per client.
+stream_subscriptions = StreamSubscriptions()
+WIRE_KEYS_ROOM = 'wire_keys:msgpack' # Every msgpack session, for key dictionary additions
+key_dictionary = KeyDictionary(['symbol'] + MARKET_FIELDS)
+
+# Sequence-numbered data_update history: reconnecting clients catch up from here (~2 min at 1 cycle/s).
+# broadcast_lock orders catch-up replies and snapshots against live broadcasts, so a client never
+# receives older data after newer data.
+DELTA_LOG_SIZE = 120
+delta_log = DeltaLog(DELTA_LOG_SIZE)
+broadcast_lock = threading.Lock()
+
+# Sessions choose an update interval (set_update_interval); deltas are merged per interval tier and
+# flushed when due. A session with more than SLOW_CLIENT_BACKLOG packets queued for sending is moved
+# to the next slower interval, and back to its own once its queue has drained.
+update_coalescer = UpdateCoalescer()
+SLOW_CLIENT_BACKLOG = 20
+SLOW_CLIENT_CHECK_SECONDS = 5
+last_slow_client_check = 0
+
+# Server-side sorted/filtered row windows (subscribe_viewport); sessions with the same spec share a view
+viewports = ViewportRegistry(MARKET_FIELDS)
+
+# Tick-to-alert latency per stage (ingest -> evaluate -> emit), served at /api/latency
+latency_tracker = LatencyTracker()
+
+# Opening range / time-window scans, each run once a day with one grouped query.
+# The window is [start, start + minutes); by default a scan runs when the window closes.
+# Level scans ('breakout_high' / 'breakdown_low') load the window high/low as a level
+# that live prices are checked against every cycle, e.g.
+#   RangeScan('orb_15', 'orb_breakout', 'ORB Breakout', start='09:15', minutes=15, comparison='breakout_high')
+RANGE_SCANS = [
+    RangeScan('positive_5min', 'positive_5min_open', 'Positive 5-Min Open',
+              start='09:15', minutes=5, comparison='close_above_open'),
+]
+
+# Ring-buffer volume spike detector over closed 1-min candles.
+# Each rule: {'lookback': N, 'multiplier': x} and/or {'lookback': N, 'zscore': z}
+VOLUME_SPIKE_RULES = [
+    {'lookback': 9, 'multiplier': 2.5},
+]
+volume_spike_detector = VolumeSpikeDetector(VOLUME_SPIKE_RULES)
 
 # Dictionary to store average intraday volume profiles
 # {'NSE:RELIANCE-EQ': {'09:15': 15000, '09:16': 25000, ...}}
 avg_volume_profiles = {}
 
 # --- Client Alert Settings ---
-# Stores the current alert settings from the client. Defaults to all on.
+# Default alert settings for a new session. Defaults to all on.
 client_alert_settings = {
     'pdh_cross': True,
+    'pdl_break': True,
     'positive_5min_open': True,
     'volume_spike': True,
 }
+for scan in RANGE_SCANS:
+    client_alert_settings.setdefault(scan.setting, True)
+# Per-session settings and watchlists; alerts are routed to the rooms sessions subscribed to
+alert_subscriptions = AlertSubscriptions(client_alert_settings)
 # -----------------------------
 
 # --- Formatting Helper ---
@@ -124,11 +219,31 @@ def save_candle_to_db(symbol, candle_data):
                 ))
     except Exception as e:
         print(f"Error saving candle for {symbol}: {e}")
+
+def save_daily_candles():
+    """Upserts the daily candles changed by this cycle's closed minutes in one batch."""
+    try:
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                daily_rollup.flush(cur)
+    except Exception as e:
+        print(f"Error saving daily candles: {e}")
+
+def prepare_daily_candles():
+    """Brings candles_1day up to date with candles_1min and seeds today's running daily candles."""
+    try:
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                rolled_up = catch_up_daily_candles(cur)
+                loaded = daily_rollup.load_day(cur, datetime.now().date())
+        print(f"✅ Daily candles ready ({rolled_up} rolled up from minute data, {loaded} running today).")
+    except Exception as e:
+        print(f"❌ Error preparing daily candles: {e}")
 # -----------------------------
 
 def load_csv_data():
     """Load static data from CSV file with proper error handling"""
-    global csv_data, TARGET_CSV_FILE # Ensure TARGET_CSV_FILE is accessible
+    global csv_data, strategy_index, TARGET_CSV_FILE # Ensure TARGET_CSV_FILE is accessible
     try:
         # Use the dynamically set path
         csv_path = TARGET_CSV_FILE 
@@ -141,77 +256,13 @@ def load_csv_data():
             else:
                 print("ℹ️  Fyers is available, but CSV data is missing. Proceeding without static CSV data.")
                 csv_data = {} # Ensure csv_data is empty if no file and no mock
+                strategy_index = StrategyIndex()
             return list(csv_data.keys()) # Return keys from (potentially mock or empty) csv_data
             
         print(f"ℹ️  Loading data from CSV: {csv_path}")
-        df = pd.read_csv(csv_path)
-        df.iloc[:, 0] = df.iloc[:, 0].astype(str)
-        
-        # Map CSV columns to dashboard fields
-        column_mapping = {
-            'Announcement Weight': 'newsWeight',
-            'chart-ink strategy': 'chartStrategy',
-            'Announcement Description': 'description',
-            'Nse_pre market': 'premarket',
-            'Open in Prev Range Top 20%': 'sopen',
-            'Gap %': 'gap',
-            'PDC strong close': 'spdc',
-            'Prev_High': 'pdh'
-        }
-        
-        for idx, row in df.iterrows():
-            symbol = row.iloc[0]
-            # Convert symbol to Fyers format
-            wsym = symbol
-            if not wsym.startswith("NSE:"):
-                wsym = f"NSE:{wsym}" if not wsym.endswith("-EQ") else f"NSE:{wsym}"
-            if not wsym.endswith("-EQ"):
-                wsym = f"{wsym}-EQ"
-            
-            # Process static data
-            static_data = {}
-            for col_idx, col_name in enumerate(df.columns[1:], 1):
-                if col_name in ['Announcement Links', 'Announcement Text']:
-                    continue
-                    
-                value = row.iloc[col_idx]
-                if pd.isna(value):
-                    value = None
-                elif col_name == 'chart-ink strategy':
-                    # Keep the original text as-is, don't extract numbers
-                    static_data['chartStrategy'] = str(value) if value and str(value) != 'nan' else ''
-                elif col_name.strip().lower() == 'announcement weight':
-                    # Keep announcement weight as numeric value, map to newsWeight
-                    try:
-                        # More robust parsing to handle non-numeric strings like '-'
-                        if value is None or (isinstance(value, str) and value.strip() in ['-', '']):
-                            static_data['newsWeight'] = 0.0
-                        else:
-                            static_data['newsWeight'] = float(value)
-                    except (ValueError, TypeError):
-                        static_data['newsWeight'] = 0.0
-                elif col_name == 'Gap %':
-                    try:
-                        if isinstance(value, str):
-                            value = value.replace('%', '')
-                        static_data['gap'] = float(value) if value else 0
-                    except:
-                        static_data['gap'] = 0
-                elif col_name == 'Prev_High': # Corrected PDH processing to use underscore
-                    try:
-                        static_data['pdh'] = float(value) if value else 0.0
-                    except:
-                        static_data['pdh'] = 0.0
-                elif col_name in ['Nse_pre market', 'Open in Prev Range Top 20%', 'PDC strong close']:
-                    static_data[column_mapping[col_name]] = 'yes' if str(value).lower() in ['yes', 'true', '1'] else 'no'
-                else:
-                    mapped_key = column_mapping.get(col_name, col_name.lower().replace(' ', '_'))
-                    static_data[mapped_key] = value
-            
-            # Set announcement based on description
-            static_data['announcement'] = 'yes' if static_data.get('description') and static_data['description'] != '-' else 'no'
-            
-            csv_data[wsym] = static_data
+        snapshot = load_universe_snapshot(csv_path)
+        csv_data = snapshot['csv_data']
+        strategy_index = StrategyIndex(snapshot['strategies'])
             
         print(f"Loaded {len(csv_data)} symbols from CSV")
         # Sample logging for PDH values after CSV load
@@ -226,8 +277,93 @@ def load_csv_data():
             create_mock_data()
         else:
             csv_data = {}
+            strategy_index = StrategyIndex()
         return list(csv_data.keys())
 
+# --- Universe Hot-Reload ---
+def reload_universe_csv():
+    """Re-reads TARGET_CSV_FILE and applies only the differences to csv_data, the live socket and clients."""
+    global csv_data, strategy_index
+    snapshot = load_universe_snapshot(TARGET_CSV_FILE)
+    new_csv_data = snapshot['csv_data']
+    added, removed, changed = diff_universe(csv_data, new_csv_data)
+    if not (added or removed or changed):
+        print("ℹ️  Universe CSV changed on disk but its content is the same. Nothing to reload.")
+        return
+
+    # Removed symbols lose their quotes (and late ticks are ignored) before they leave csv_data,
+    # so the stream never sees them quoted but unlisted
+    if websocket_started and (added or removed):
+        update_subscriptions(list(added.keys()), removed)
+    retired_symbols.update(removed)
+    retired_symbols.difference_update(added)
+    unlisted_symbols.difference_update(removed)
+
+    # Swap the reference so readers iterating the old dict are never disturbed
+    old_index = strategy_index
+    csv_data = new_csv_data
+    strategy_index = StrategyIndex(snapshot['strategies'])
+    for symbol in removed:
+        live_candles.pop(symbol, None)
+
+    with broadcast_lock:
+        # Tiers flush what they hold first, so the universe_update lands after every older delta
+        targets = stream_subscriptions.targets()
+        emit_grouped('data_update', update_coalescer.take_due(time.time(), {i for _, i in targets}, force=True), targets)
+        # Removed rows cannot be replayed from the delta log: reconnecting clients get a snapshot
+        seq = delta_log.reset()
+        snapshot_cache.invalidate(seq)
+        upserts, dropped = universe_groups(old_index, strategy_index, added, removed, changed)
+        emit_universe_update(upserts, dropped, seq, targets)
+    print(f"🔄 Universe reloaded: +{len(added)} added, -{len(removed)} removed, {len(changed)} changed.")
+
+def universe_groups(old_index, new_index, added, removed, changed):
+    """
+    A reload diff as strategy groups: ({strategy: {symbol: row}} to merge, {strategy: [symbol]} to drop).
+    Rows entering a group (added, or moved there by a new chartStrategy) are full rows; rows
+    staying in their groups carry only the changed static fields.
+    """
+    def strategies_of(index, symbol):
+        if symbol in index.by_symbol:
+            return index.by_symbol[symbol]
+        return ('Uncategorized',) if symbol in unlisted_symbols else ()
+
+    upserts, dropped = {}, {}
+    for symbol in list(added) + list(removed) + list(changed):
+        before = strategies_of(old_index, symbol)
+        after = () if symbol in removed else new_index.strategies_of(symbol)
+        for strategy in before:
+            if strategy not in after:
+                dropped.setdefault(strategy, []).append(symbol)
+        for strategy in after:
+            if strategy in before and symbol in changed:
+                upserts.setdefault(strategy, {})[symbol] = changed[symbol]
+            elif strategy not in before:
+                upserts.setdefault(strategy, {})[symbol] = snapshot_row(symbol)
+    return upserts, dropped
+
+def universe_watcher_thread(poll_interval=5):
+    """Polls TARGET_CSV_FILE and hot-reloads it once a change has settled."""
+    loaded_key = None
+    pending_key = None
+    while True:
+        try:
+            if TARGET_CSV_FILE and os.path.exists(TARGET_CSV_FILE):
+                stat = os.stat(TARGET_CSV_FILE)
+                key = (stat.st_mtime_ns, stat.st_size)
+                if loaded_key is None:
+                    loaded_key = key
+                elif key != loaded_key:
+                    # Wait for one unchanged poll so a half-written file is never read
+                    if key == pending_key:
+                        reload_universe_csv()
+                        loaded_key = key
+                    pending_key = key
+        except Exception as e:
+            print(f"Error reloading universe CSV: {e}")
+        time.sleep(poll_interval)
+# --------------------------
+
 def start_fyers_websocket():
     """Start Fyers WebSocket connection with error handling"""
     global websocket_started
@@ -260,78 +396,297 @@ def start_fyers_websocket():
     return True
 
 # --- System Alert Logic ---
-def check_for_pdh_cross(symbol, ltp, pdh):
-    """Check if the ltp has crossed the Previous Day High and trigger an alert."""
-    # Only trigger if the alert type is enabled by the client
-    if not client_alert_settings.get('pdh_cross', True):
+def emit_system_alert(alert, setting, scan_started=None):
+    """
+    Records a system alert in memory and the database and queues it for the next batched broadcast.
+    Alerts of a scheduled scan pass `scan_started`, the time their latency trace starts from.
+    """
+    if not alert_dispatcher.allow(alert):
+        return # Still cooling down for this symbol / type
+    system_alert_history.add(alert)
+    alert_store.save_system_alert(dict(alert)) # The writer thread serializes its own copy
+    alert_dispatcher.add_system_alert(alert, setting, scan_started)
+    print(f"🔔 SYSTEM ALERT: {alert['symbol']} - {alert['message']}")
+
+def flush_alert_events():
+    """Broadcasts everything fired this cycle: one event per kind, plus a delta of changed user alerts."""
+    system_alerts, triggered, changed_alerts = alert_dispatcher.take()
+    emit_time = time.time()
+    for _, _, trace in system_alerts:
+        trace['emit'] = emit_time
+        latency_tracker.record_trace(trace)
+    for _, trace in triggered:
+        trace['emit'] = emit_time
+        latency_tracker.record_trace(trace)
+
+    # Sessions without a watchlist listen on the setting's room, others on per-symbol rooms.
+    # Clients get a copy of each alert with its trace; the stored alert stays as it is.
+    alerts_by_room = {}
+    for alert, setting, trace in system_alerts:
+        payload = {**alert, 'trace': trace}
+        for room in (setting_room(setting), setting_room(setting, alert['symbol'])):
+            alerts_by_room.setdefault(room, []).append(payload)
+    for room, alerts in alerts_by_room.items():
+        socketio.emit('system_alerts_triggered', alerts, to=room)
+    if triggered:
+        socketio.emit('alerts_triggered', [{**event, 'trace': trace} for event, trace in triggered])
+    if changed_alerts:
+        socketio.emit('update_alerts', {'full': False, 'upserts': changed_alerts, 'removed': []})
+
+def evaluate_system_alerts():
+    """Evaluates all level-cross / threshold system rules over the whole universe at once."""
+    # Rules no session is subscribed to are skipped
+    results = system_alert_engine.evaluate(alert_subscriptions.active_settings())
+    for rule, rows in results:
+        for alert in system_alert_engine.build_alerts([(rule, rows)]):
+            emit_system_alert(alert, rule.setting)
+
+def check_for_volume_spikes(closed_candles):
+    """Checks all candles that closed this cycle for volume spikes in one vectorized step."""
+    if not closed_candles:
+        return
+    scan_started = time.time()
+    symbols = list(closed_candles.keys())
+    volumes = [candle['volume'] for candle in closed_candles.values()]
+    # History is always recorded; alerts are only raised if the client enabled them
+    spikes = volume_spike_detector.evaluate(symbols, volumes)
+    if not alert_subscriptions.is_active('volume_spike'):
         return
 
-    if symbol not in pdh_crossed_stocks and pdh and ltp > pdh:
-        pdh_crossed_stocks.add(symbol)
-        message = f"Price crossed PDH ({pdh:.2f})"
+    for symbol, rule, current_volume, avg_volume, zscore in spikes:
+        message = f"Volume spike: {format_volume(current_volume)} vs avg {format_volume(avg_volume)}"
+        if 'zscore' in rule:
+            message += f" (z={zscore:.1f}, {rule['lookback']}m)"
         alert = {
-            "id": f"sys_{symbol}_pdh_{int(time.time())}",
+            "id": system_alert_id(symbol, f"vol{rule['lookback']}"),
             "symbol": symbol,
-            "type": "PDH Crossed",
+            "type": "Volume Spike",
             "message": message,
             "timestamp": datetime.now().isoformat()
         }
-        system_alert_history.insert(0, alert)
-        socketio.emit('system_alert_triggered', alert)
-        print(f"🔔 SYSTEM ALERT: {symbol} - {message}")
+        emit_system_alert(alert, 'volume_spike', scan_started)
 
-def check_for_volume_spike(symbol, candle_data):
-    """Checks for volume spikes and emits an alert if conditions are met."""
-    global system_alert_history
 
-    # Only trigger if the alert type is enabled by the client
-    if not client_alert_settings.get('volume_spike', True):
-        return
-
-    # User-defined parameters for volume spike
-    lookback_period = 10  # minutes
-    threshold_multiplier = 2.5
-
-    # Update history
-    if symbol not in volume_history:
-        volume_history[symbol] = deque(maxlen=lookback_period)
-    volume_history[symbol].append(candle_data['volume'])
+def encode_for(encoding, groups):
+    """Encodes a grouped payload, first announcing any new msgpack key ids to msgpack sessions."""
+    payload = encode_groups(groups, encoding, key_dictionary)
+    if encoding == 'msgpack':
+        new_keys = key_dictionary.take_new_keys()
+        if new_keys:
+            socketio.emit('wire_keys', new_keys, to=WIRE_KEYS_ROOM)
+    return payload
 
-    # Check for spike
-    if len(volume_history[symbol]) == lookback_period:
-        current_volume = volume_history[symbol][-1]
-        # Calculate average of the PREVIOUS volumes (excluding current)
-        previous_volumes = list(volume_history[symbol])[:-1]
-        if not previous_volumes: return
-
-        avg_volume = sum(previous_volumes) / len(previous_volumes)
-        
-        if avg_volume > 0 and current_volume > (avg_volume * threshold_multiplier):
-            message = f"Volume spike: {format_volume(current_volume)} vs avg {format_volume(avg_volume)}"
-            alert = {
-                "id": f"sys_{symbol}_vol_{int(time.time())}",
-                "symbol": symbol,
-                "type": "Volume Spike",
-                "message": message,
-                "timestamp": datetime.now().isoformat()
-            }
-            system_alert_history.insert(0, alert)
-            socketio.emit('system_alert_triggered', alert)
-            print(f"🔔 SYSTEM ALERT: {symbol} - {message}")
+def emit_grouped(event, flushes, targets):
+    """
+    Broadcasts each due interval tier's strategy-grouped payload as {'seq', 'epoch', 'data'}: the whole
+    thing to that tier's sessions following every strategy, and to each strategy selection's room
+    one payload with just the followed groups.
+    """
+    epoch = delta_log.epoch
+    for interval, groups, seq in flushes:
+        for (encoding, target_interval), (follow_all, selections) in targets.items():
+            if target_interval != interval:
+                continue
+            if follow_all:
+                payload = encode_for(encoding, groups)
+                socketio.emit(event, {'seq': seq, 'epoch': epoch, 'data': payload}, to=stream_room(encoding, interval))
+            for selection in selections:
+                followed = {strategy: groups[strategy] for strategy in selection if strategy in groups}
+                if followed:
+                    payload = encode_for(encoding, followed)
+                    socketio.emit(event, {'seq': seq, 'epoch': epoch, 'data': payload},
+                                  to=stream_room(encoding, interval, selection))
+
+def emit_universe_update(upserts, dropped, seq, targets):
+    """
+    Sends a universe reload as {'seq', 'epoch', 'data', 'removed'} to every stream room, each
+    selection room getting only its followed groups: clients merge `data` and drop `removed`.
+    """
+    epoch = delta_log.epoch
+    for (encoding, interval), (follow_all, selections) in targets.items():
+        if follow_all:
+            socketio.emit('universe_update', {'seq': seq, 'epoch': epoch, 'data': encode_for(encoding, upserts),
+                                              'removed': dropped}, to=stream_room(encoding, interval))
+        for selection in selections:
+            followed = {strategy: upserts[strategy] for strategy in selection if strategy in upserts}
+            removed = {strategy: dropped[strategy] for strategy in selection if strategy in dropped}
+            if followed or removed:
+                socketio.emit('universe_update', {'seq': seq, 'epoch': epoch, 'data': encode_for(encoding, followed),
+                                                  'removed': removed}, to=stream_room(encoding, interval, selection))
+
+def session_catch_up(sid, since, epoch=None):
+    """
+    The (event, payload) that brings a session from seq `since` of `epoch` to now: the missed
+    deltas merged into one data_update when the delta log still covers them, otherwise its full
+    snapshot. Call under broadcast_lock.
+    """
+    encoding = stream_subscriptions.encoding(sid)
+    strategies = stream_subscriptions.strategies(sid)
+    stream_subscriptions.mark_synced(sid)
+    if isinstance(since, int):
+        seq, missed = delta_log.since(since, strategies, epoch)
+        if missed is not None:
+            print(f"Resynced client {sid} from seq {since} to {seq} "
+                  f"({sum(len(group) for group in missed.values())} changed rows).")
+            return 'data_update', {'seq': seq, 'epoch': delta_log.epoch, 'data': encode_for(encoding, missed), 'resync': True}
+        if epoch != delta_log.epoch:
+            print(f"Client {sid} resumes from another epoch ({epoch}). Sending a full snapshot.")
+        else:
+            print(f"Client {sid} is too far behind (seq {since}, now {seq}). Sending a full snapshot.")
+
+    compression = stream_subscriptions.compression(sid)
+    version, payload, group_count = snapshot_cache.get(encoding, strategies, compression)
+    print(f"Sent initial data v{version} for {group_count} strategies to client {sid} "
+          f"({len(payload) / 1024:.1f} KB, {encoding}{'+' + compression if compression else ''}).")
+    return 'initial_data', {
+        'version': version,
+        'epoch': delta_log.epoch,
+        'encoding': encoding,
+        'compression': compression,
+        'data': payload
+    }
+
+def move_session_interval(sid, interval, chosen=False):
+    """
+    Moves a session to another update interval tier (as its own choice, or temporarily when
+    `chosen` is False) and sends it what its old tier had not flushed yet. A session that has
+    not been sent a snapshot or resync yet gets nothing: its request_initial_data covers it.
+    Call under broadcast_lock.
+    """
+    old_interval = stream_subscriptions.effective_interval(sid)
+    since = update_coalescer.flushed_seq(old_interval)
+    if chosen:
+        leave, join = stream_subscriptions.set_interval(sid, interval)
+    else:
+        leave, join = stream_subscriptions.set_effective_interval(sid, interval)
+    for room in leave:
+        leave_room(room, sid=sid, namespace='/')
+    for room in join:
+        join_room(room, sid=sid, namespace='/')
+    if interval != old_interval and since != delta_log.seq and stream_subscriptions.is_synced(sid):
+        event, payload = session_catch_up(sid, since, delta_log.epoch)
+        socketio.emit(event, payload, to=sid)
+
+def client_send_backlog(sid):
+    """
+    Packets queued for a session but not yet written to its socket, or None when unknown.
+    In the fan-out topology BusHub replaces this with the backlogs the workers report.
+    """
+    try:
+        server = socketio.server
+        socket = server.eio.sockets.get(server.manager.eio_sid_from_sid(sid, '/'))
+        return socket.queue.qsize() if socket is not None else None
+    except Exception:
+        return None
+
+def adapt_slow_clients():
+    """Moves sessions whose send queue backs up to a slower interval, and back once it has drained."""
+    global last_slow_client_check
+    now = time.time()
+    if now - last_slow_client_check < SLOW_CLIENT_CHECK_SECONDS:
+        return
+    last_slow_client_check = now
+
+    for sid, chosen, effective in stream_subscriptions.intervals():
+        backlog = client_send_backlog(sid)
+        if backlog is None:
+            continue
+        target = None
+        if backlog > SLOW_CLIENT_BACKLOG:
+            target = slower_interval(effective)
+            if target:
+                print(f"🐢 Client {sid} is falling behind ({backlog} packets queued). Updates every {target}s.")
+        elif backlog == 0 and effective != chosen:
+            target = chosen
+            print(f"Client {sid} caught up. Back to updates every {chosen}s.")
+        if target:
+            try:
+                with broadcast_lock, app.app_context():
+                    move_session_interval(sid, target)
+            except KeyError:
+                pass # Disconnected meanwhile
+
+
+def stream_universe(ltp_data):
+    """
+    The streamed universe: csv_data plus every quoted symbol it does not list (with no static
+    fields, grouped under 'Uncategorized'), so quotes still reach clients with a missing or
+    partial CSV. Rebuilt only when csv_data is replaced or a new unlisted symbol shows up.
+    """
+    global stream_universe_state
+    data, index = csv_data, strategy_index
+    new_unlisted = [s for s in ltp_data if s not in data and s not in unlisted_symbols and s not in retired_symbols]
+    unlisted_symbols.update(new_unlisted)
+    source = stream_universe_state[0]
+    if new_unlisted or source is None or source[0] is not data or source[1] is not index:
+        universe = dict(data)
+        unlisted = [s for s in sorted(unlisted_symbols) if s not in universe]
+        for symbol in unlisted:
+            universe[symbol] = {}
+        members = index.members
+        if unlisted:
+            members = dict(members)
+            members['Uncategorized'] = members.get('Uncategorized', []) + unlisted
+        stream_universe_state = ((data, index), universe, members)
+    return stream_universe_state[1]
+
+def stream_members():
+    """{strategy: [symbol, ...]} of the streamed universe (strategy_index.members plus unlisted symbols)."""
+    source, _, members = stream_universe_state
+    if source is None or source[1] is not strategy_index:
+        return strategy_index.members # Not streamed since the last (re)load
+    return members
+
+def snapshot_row(symbol):
+    """A symbol's full row: static CSV fields plus the live fields as last broadcast."""
+    return {
+        'symbol': symbol,
+        'ltp': 0, 'change': 0, 'volume': 0,
+        'high': 0, 'low': 0, 'open': 0,
+        'last_update': 0,
+        **csv_data.get(symbol, {}),
+        # Live fields as last broadcast, so later deltas apply on top of them
+        **(delta_tracker.last_sent(symbol) or {})
+    }
+
+def build_initial_snapshot(strategies=None):
+    """Combines static and live data into {strategy: {symbol: row}} for the given strategies (None = all)."""
+    rows = {}
+    snapshot = {}
+    for strategy, members in stream_members().items():
+        if strategies is not None and strategy not in strategies:
+            continue
+        group = snapshot[strategy] = {}
+        for symbol in members:
+            row = rows.get(symbol)
+            if row is None:
+                row = rows[symbol] = snapshot_row(symbol)
+            group[symbol] = row
+    return snapshot
+
+def serialize_snapshot(encoding, groups):
+    """Snapshot bytes: msgpack columnar payload, or compact JSON text."""
+    payload = encode_for(encoding, groups)
+    return payload if encoding == 'msgpack' else json_bytes(payload)
+
+# Serialized initial_data per (encoding, followed strategies); invalidated once per changed cycle
+snapshot_cache = SnapshotCache(build_initial_snapshot, serialize_snapshot)
 
 
 def data_stream_thread():
     """Background thread to stream data to clients with optimized updates and strategy grouping"""
-    last_emission = {}
     first_data_received = False # Flag for one-time message
     
     while True:
         try:
             if not connected_clients:
+                flush_alert_events() # Don't let scheduled-scan alerts pile up with nobody connected
                 time.sleep(1)
                 continue
                 
+            changed_symbols = take_changed_symbols()  # Before the copy: a tick in between is reloaded next cycle
             ltp_data, invalid_symbols = get_ltp_data()
+            alert_dispatcher.begin_cycle(ltp_data)
             
             # --- One-time check to confirm data stream is live ---
             if ltp_data and not first_data_received:
@@ -342,6 +697,7 @@ def data_stream_thread():
             # --- Candle Aggregation Logic ---
             current_utc_time = datetime.now(timezone.utc)
             current_minute_timestamp = current_utc_time.replace(second=0, microsecond=0)
+            closed_candles = {}
 
             for symbol, data in ltp_data.items():
                 if not isinstance(data, dict): continue
@@ -355,9 +711,8 @@ def data_stream_thread():
                     if symbol in live_candles:
                         old_candle = live_candles[symbol]
                         save_candle_to_db(symbol, old_candle)
-                        # --- Trigger Volume Spike check on candle close ---
-                        check_for_volume_spike(symbol, old_candle)
-                        # --------------------------------------------------
+                        daily_rollup.update(symbol, old_candle)
+                        closed_candles[symbol] = old_candle
 
                     live_candles[symbol] = {
                         'timestamp': current_minute_timestamp,
@@ -379,72 +734,59 @@ def data_stream_thread():
                 if vol >= candle['last_total_volume']:
                     candle['volume'] += (vol - candle['last_total_volume'])
                 candle['last_total_volume'] = vol
+
+            if closed_candles:
+                save_daily_candles()
+
+            # --- Volume Spike check on all candles closed this cycle ---
+            check_for_volume_spikes(closed_candles)
             # --- End Candle Aggregation ---
 
-            processed_data = {}
             current_time = time.time()
-                
+
+            # --- Vectorized System Alert Stage ---
+            system_alert_engine.sync_universe(stream_universe(ltp_data))
+            universe_arrays = system_alert_engine.arrays
+            universe_arrays.load_quotes(ltp_data, changed_symbols)
+            universe_arrays.load_field('candle_volume', {s: c['volume'] for s, c in live_candles.items()})
+            universe_arrays.compute_rvol(datetime.fromtimestamp(current_time).strftime('%H:%M'))
+            evaluate_system_alerts()
+            check_rule_alerts(universe_arrays)
+            # -------------------------------------
+
+            # --- Alert Check ---
             for symbol, data in ltp_data.items():
-                    if isinstance(data, dict):
-                        # Combine live data with static CSV data
-                        combined_data = {
-                            'symbol': symbol,
-                            'ltp': data.get('ltp', 0),
-                        'change': data.get('chp', 0),
-                            'volume': data.get('vol_traded_today', 0),
-                            'high': data.get('high_price', 0),
-                            'low': data.get('low_price', 0),
-                            'open': data.get('open_price', 0),
-                            'last_update': current_time
-                        }
-                        
-                        symbol_static_data = csv_data.get(symbol, {})
-                        combined_data.update(symbol_static_data)
-                        
-                    # --- PDH Crossing Check ---
-                        pdh_value = symbol_static_data.get('pdh', 0.0)
-                    if pdh_value:
-                        check_for_pdh_cross(symbol, combined_data['ltp'], pdh_value)
-                    
-                    # --- RVol Calculation ---
-                    current_dt = datetime.fromtimestamp(current_time)
-                    time_key = current_dt.strftime('%H:%M')
-                    if symbol in avg_volume_profiles and time_key in avg_volume_profiles[symbol]:
-                        avg_vol = avg_volume_profiles[symbol][time_key]
-                        current_candle_vol = live_candles.get(symbol, {}).get('volume', 0)
-                        if avg_vol > 0:
-                            combined_data['rvol'] = round(current_candle_vol / avg_vol, 2)
-
-                    # --- Alert Check ---
-                    check_alerts(symbol, combined_data['ltp'])
-                    
-                    processed_data[symbol] = combined_data
-
-            # Check for changes and emit only if data has changed since last emission
-            changed_data = {}
-            for symbol, data in processed_data.items():
-                last_sent = last_emission.get(symbol)
-                if last_sent != data:
-                    changed_data[symbol] = data
-                    last_emission[symbol] = data
-
-            if changed_data:
-                # Group data by strategy before emitting
-                grouped_updates = {}
-                for symbol, data in changed_data.items():
-                    strategies = data.get('chartStrategy', '').split(',')
-                    strategies = [s.strip() for s in strategies if s.strip()]
-                    if not strategies:
-                        strategies = ['Uncategorized']
-
-                    for strategy in strategies:
-                        if strategy not in grouped_updates:
-                            grouped_updates[strategy] = {}
-                        grouped_updates[strategy][symbol] = data
-
-                if grouped_updates:
-                    socketio.emit('data_update', grouped_updates)
-                    
+                if isinstance(data, dict):
+                    check_alerts(symbol, data.get('ltp', 0))
+
+            latency_tracker.record('evaluate_cycle', time.time() - current_time)
+            flush_alert_events()
+
+            with broadcast_lock:
+                # --- Field-level deltas: only symbols whose market fields changed, only those fields ---
+                # (under the lock: snapshots read the last sent values while this updates them)
+                deltas, new_symbols = delta_tracker.diff(universe_arrays)
+                for symbol in new_symbols:
+                    # First update of a symbol carries its static data too
+                    deltas[symbol] = {'symbol': symbol, **csv_data.get(symbol, {}), **deltas[symbol]}
+
+                # --- Sequence, merge into each update interval tier, flush the tiers that are due ---
+                targets = stream_subscriptions.targets()
+                active_intervals = {interval for _, interval in targets}
+                if deltas:
+                    # Group data by strategy (index lookup) before emitting
+                    grouped_updates = strategy_index.group(deltas)
+                    seq = delta_log.append(grouped_updates)
+                    update_coalescer.add(grouped_updates, seq, active_intervals)
+                    snapshot_cache.invalidate(seq) # Connecting clients get a snapshot that includes this cycle
+                emit_grouped('data_update', update_coalescer.take_due(time.time(), active_intervals), targets)
+
+                # --- Viewports: rows entering, leaving or changing inside each visible window ---
+                for view, payload in viewports.update(universe_arrays, stream_members(), deltas, snapshot_row):
+                    payload['seq'] = delta_log.seq
+                    socketio.emit('viewport_update', payload, to=viewport_room(view.key))
+            adapt_slow_clients()
+
             if invalid_symbols:
                 socketio.emit('invalid_symbols', {'symbols': list(invalid_symbols)})
 
@@ -469,12 +811,25 @@ def serve_static(path):
         return send_from_directory(app.static_folder, 'index.html')
 
 
+@app.route('/api/latency')
+def latency_stats():
+    """Tick-to-alert latency percentiles per pipeline stage. ?reset=1 starts a new window."""
+    stats = latency_tracker.summary()
+    if request.args.get('reset') == '1':
+        latency_tracker.reset()
+    return jsonify(stats)
+
+
 # --- SocketIO Handlers ---
 @socketio.on('connect')
 def handle_connect():
     """Handle client connection"""
     print(f'Client connected: {request.sid}')
     connected_clients.add(request.sid)
+    for room in stream_subscriptions.register(request.sid):
+        join_room(room)
+    for room in alert_subscriptions.register(request.sid):
+        join_room(room)
     emit('connection_status', {'status': 'connected'})
 
 @socketio.on('disconnect')
@@ -483,47 +838,136 @@ def handle_disconnect():
     global connected_clients
     if request.sid in connected_clients:
         connected_clients.remove(request.sid)
+    alert_subscriptions.unregister(request.sid)
+    stream_subscriptions.unregister(request.sid)
+    viewports.unregister(request.sid)
     print(f"Client disconnected: {request.sid}. Total clients: {len(connected_clients)}")
 
+@socketio.on('set_encoding')
+def handle_set_encoding(data):
+    """
+    Client opts into an encoding for bulk data events: {'encoding': 'msgpack' | 'json'}.
+    Falls back to JSON when msgpack is not installed; replies with the encoding in use
+    and, for msgpack, the full key dictionary.
+    """
+    requested = data.get('encoding') if isinstance(data, dict) else None
+    encoding = requested if requested in ENCODINGS else 'json'
+    if encoding == 'msgpack' and not msgpack_available:
+        encoding = 'json'
+
+    leave, join = stream_subscriptions.set_encoding(request.sid, encoding)
+    for room in leave:
+        leave_room(room)
+    for room in join:
+        join_room(room)
+    # Key dictionary additions go to every msgpack session, whatever strategies it follows
+    if encoding == 'msgpack':
+        join_room(WIRE_KEYS_ROOM)
+    else:
+        leave_room(WIRE_KEYS_ROOM)
+    emit('encoding', {
+        'encoding': encoding,
+        'keys': key_dictionary.all_keys() if encoding == 'msgpack' else None
+    })
+    print(f"Client {request.sid} uses {encoding} encoding (requested {requested}).")
+
 @socketio.on('request_initial_data')
-def handle_initial_data():
-    """Sends the entire dataset, structured by strategy, to a newly connected client."""
-    
-    # Process the full csv_data to match the live data structure
-    initial_full_data = {}
-    for symbol, static_data in csv_data.items():
-        # Create a combined data structure similar to the live one
-        combined_data = {
-            'symbol': symbol,
-            'ltp': 0, 'change': 0, 'volume': 0,
-            'high': 0, 'low': 0, 'open': 0,
-            'last_update': 0
-        }
-        combined_data.update(static_data)
-        initial_full_data[symbol] = combined_data
+def handle_initial_data(data=None):
+    """
+    Sends the client's snapshot: every followed strategy with its rows, from the shared
+    snapshot cache. {'compression': 'gzip'} asks for (and remembers) gzipped snapshots.
 
-    # Group initial data by strategy
-    initial_data_by_strategy = {}
-    for symbol, data in initial_full_data.items():
-        strategies = data.get('chartStrategy', '').split(',')
-        strategies = [s.strip() for s in strategies if s.strip()]
-        if not strategies:
-            strategies = ['Uncategorized']
+    Emits {'version', 'epoch', 'encoding', 'compression', 'data'} where data is the serialized
+    snapshot (JSON text or msgpack), gzipped if requested.
 
-        for strategy in strategies:
-            if not strategy: continue # Skip empty strings
-            if strategy not in initial_data_by_strategy:
-                initial_data_by_strategy[strategy] = {}
-            initial_data_by_strategy[strategy][symbol] = combined_data
+    A reconnecting client sends {'since': <last seq it applied>, 'epoch': <its epoch>}. If the
+    epoch is current and the delta log still covers it, only the missed changes are sent, merged
+    into one data_update {'seq', 'epoch', 'data', 'resync': True}; otherwise it falls back to the
+    full snapshot.
+    """
+    if isinstance(data, dict) and 'compression' in data:
+        compression = data['compression'] if data['compression'] in COMPRESSIONS else None
+        stream_subscriptions.set_compression(request.sid, compression)
+    since = data.get('since') if isinstance(data, dict) else None
+    epoch = data.get('epoch') if isinstance(data, dict) else None
 
-    # Emit the structured data to the requesting client
-    emit('initial_data', initial_data_by_strategy)
-    print(f"Sent initial data for {len(initial_data_by_strategy)} strategies to client {request.sid}.")
+    with broadcast_lock:
+        emit(*session_catch_up(request.sid, since, epoch))
+
+@socketio.on('set_update_interval')
+def handle_set_update_interval(data):
+    """
+    Client picks how often it receives data_update: {'interval': seconds}. Snapped to the
+    nearest supported interval at or above it; replies with 'update_interval' {'interval'}.
+    """
+    seconds = data.get('interval') if isinstance(data, dict) else None
+    if not isinstance(seconds, (int, float)) or seconds <= 0:
+        print(f"Ignoring update interval from {request.sid}. Invalid data: {data}")
+        return
+    interval = snap_interval(seconds)
+    with broadcast_lock:
+        move_session_interval(request.sid, interval, chosen=True)
+    emit('update_interval', {'interval': interval})
+    print(f"Client {request.sid} receives updates every {interval}s (requested {seconds}s).")
+
+@socketio.on('subscribe_viewport')
+def handle_subscribe_viewport(data):
+    """
+    Client subscribes (or re-points) a server-side viewport: {'id', 'strategy', 'sort',
+    'descending', 'filters': {field: '>5' | '2-10' | ...}, 'search', 'offset', 'limit'}.
+    Replies with 'viewport_snapshot' {'id', 'view', 'total', 'order', 'rows'}; afterwards
+    'viewport_update' {'view', 'seq', 'total', 'order', 'entered', 'left', 'changed'} carries
+    only what changed in the window. Clients that only use viewports can subscribe_strategies([]).
+    """
+    client_id = data.get('id') if isinstance(data, dict) else None
+    if not isinstance(client_id, str):
+        print(f"Ignoring viewport subscription from {request.sid}. Invalid data: {data}")
+        return
+    try:
+        with broadcast_lock:
+            view, leave, is_new = viewports.subscribe(request.sid, client_id, data)
+            if leave:
+                leave_room(viewport_room(leave))
+            join_room(viewport_room(view.key))
+            snapshot = view.snapshot(system_alert_engine.arrays, stream_members(), snapshot_row)
+            emit('viewport_snapshot', {'id': client_id, 'seq': delta_log.seq, **snapshot})
+        print(f"Client {request.sid} viewport '{client_id}' -> {view.key}{' (new)' if is_new else ''}: "
+              f"{len(snapshot['order'])} of {snapshot['total']} rows.")
+    except ViewportError as e:
+        print(f"Invalid viewport from {request.sid}: {e}")
+        emit('viewport_error', {'id': client_id, 'message': str(e)})
+
+@socketio.on('unsubscribe_viewport')
+def handle_unsubscribe_viewport(data):
+    """Client drops a viewport: {'id'}."""
+    client_id = data.get('id') if isinstance(data, dict) else None
+    with broadcast_lock:
+        leave = viewports.unsubscribe(request.sid, client_id)
+        if leave:
+            leave_room(viewport_room(leave))
+
+@socketio.on('subscribe_strategies')
+def handle_subscribe_strategies(data):
+    """
+    Client picks the strategy groups it wants updates for: {'strategies': ['Morning', ...]},
+    or {'strategies': null} for all. Replies with initial_data for the new selection.
+    """
+    strategies = data.get('strategies') if isinstance(data, dict) else None
+    if strategies is not None and not isinstance(strategies, list):
+        print(f"Ignoring strategy subscription from {request.sid}. Invalid data: {data}")
+        return
+    leave, join = stream_subscriptions.set_strategies(request.sid, strategies)
+    for room in leave:
+        leave_room(room)
+    for room in join:
+        join_room(room)
+    print(f"Client {request.sid} follows strategies: {strategies if strategies is not None else 'all'}")
+    handle_initial_data()
 
 
 def create_mock_data():
     """Creates mock data if CSV is not found"""
-    global csv_data
+    global csv_data, strategy_index
     mock_symbols = ['NSE:RELIANCE-EQ', 'NSE:TCS-EQ', 'NSE:HDFCBANK-EQ', 'NSE:INFY-EQ', 'NSE:HINDUNILVR-EQ']
     strategies = ['Morning', 'Mid-day', 'Afternoon']
     for symbol in mock_symbols:
@@ -538,21 +982,49 @@ def create_mock_data():
             'pdh': round(random.uniform(100, 3000) * 1.05, 2),
             'announcement': 'yes'
         }
+    strategy_index = StrategyIndex.from_csv_data(csv_data)
     print(f"Created mock data for {len(mock_symbols)} symbols.")
 
-def start_server_process():
-    """Main entry point to start the server"""
-    print("Starting server process...")
+def load_alerts_from_db():
+    """Warms the in-memory alert index and system alert history from the database."""
+    global alert_id_counter
+    try:
+        alerts, last_id = alert_store.load_alerts()
+        for alert in alerts:
+            try:
+                if alert.get('condition'):
+                    rule_book.add(alert)
+                else:
+                    alert_index.add(alert)
+            except ValueError as e:
+                print(f"⚠️  Skipping stored alert {alert['id']}: {e}")
+        alert_id_counter = max(alert_id_counter, last_id)
+        # Stored newest first; the ring buffer is filled oldest first
+        system_alert_history.extend(reversed(alert_store.load_system_alert_history(SYSTEM_ALERT_HISTORY_SIZE)))
+        print(f"✅ Loaded {len(alerts)} user alerts and {len(system_alert_history)} system alerts from the database.")
+    except Exception as e:
+        print(f"❌ Error loading alerts from the database: {e}")
+
+def start_background_services():
+    """Database, precomputed data and the background threads; shared by every server entry point."""
     
     # --- Initialize Database ---
     print("Initializing database...")
     create_tables()
+    load_alerts_from_db()
+    alert_store.start()
     # ---------------------------
 
     # --- Pre-calculate RVol Profiles ---
     calculate_average_intraday_volume(lookback_days=10)
     # -----------------------------------
 
+    # --- Daily Rollup and Previous Day / Week / Month Levels ---
+    prepare_daily_candles()
+    load_reference_levels()
+    schedule_reference_levels_refresh()
+    # ------------------------------------------
+
     # Start the Fyers WebSocket in a background thread
     if fyers_available:
         websocket_thread = threading.Thread(target=start_fyers_websocket, daemon=True)
@@ -563,197 +1035,218 @@ def start_server_process():
     stream_thread = threading.Thread(target=data_stream_thread, daemon=True)
     stream_thread.start()
     print("Data streaming thread started.")
+
+    # Watch the universe CSV for mid-day screener updates
+    watcher_thread = threading.Thread(target=universe_watcher_thread, daemon=True)
+    watcher_thread.start()
+    print("Universe CSV watcher thread started.")
     
-    # Schedule the 5-minute candle check
-    schedule_5min_candle_check()
-    
+    # Schedule the opening range scans
+    schedule_range_scans()
+
+def start_server_process():
+    """Main entry point to start the server"""
+    print("Starting server process...")
+    start_background_services()
+
     # Start Flask-SocketIO server
     print("Starting Flask-SocketIO server on http://0.0.0.0:5000")
     socketio.run(app, host='0.0.0.0', port=5000)
 
 def check_alerts(symbol, ltp):
     """Check user-created alerts and emit if triggered."""
-    global active_alerts
-    
-    triggered_this_tick = False
-    for alert in active_alerts:
-        if alert['symbol'] == symbol and not alert.get('triggered', False):
-            operator = alert['operator']
-            value = alert['value']
-            
-            condition_met = False
-            if operator == '>=' and ltp >= value:
-                    condition_met = True
-            elif operator == '<=' and ltp <= value:
-                    condition_met = True
-
-            if condition_met:
-                alert['triggered'] = True
-                print(f"🔔 ALERT: {symbol} {operator} {value} (LTP: {ltp})")
-                socketio.emit('alert_triggered', {
-                    'symbol': symbol,
-                    'message': f"LTP {ltp} {operator} {value}",
-                    'id': alert['id']
-                })
-                triggered_this_tick = True
-    
-    # If any alert was triggered, broadcast the updated list
-    if triggered_this_tick:
-                socketio.emit('update_alerts', active_alerts)
+    # Only the thresholds this tick crossed are visited (bisect per symbol)
+    fired_alerts = alert_index.check(symbol, ltp)
+    for alert in fired_alerts:
+        alert_store.mark_triggered(alert['id'])
+        print(f"🔔 ALERT: {symbol} {alert['operator']} {alert['value']} (LTP: {ltp})")
+        alert_dispatcher.add_triggered({
+            'symbol': symbol,
+            'message': f"LTP {ltp} {alert['operator']} {alert['value']}",
+            'id': alert['id']
+        }, alert)
+
+def check_rule_alerts(universe_arrays):
+    """Evaluates every rule alert in one batch over the current snapshot."""
+    fired_alerts = rule_book.evaluate(universe_arrays)
+    for alert, symbol in fired_alerts:
+        # Symbol alerts become triggered; universe scans stay active and unchanged
+        changed = alert if alert.get('triggered') else None
+        if changed:
+            alert_store.mark_triggered(alert['id'])
+        print(f"🔔 RULE ALERT: {symbol} matched '{alert['condition']}'")
+        alert_dispatcher.add_triggered({
+            'symbol': symbol,
+            'message': f"{symbol} matched {alert['condition']}",
+            'id': alert['id']
+        }, changed)
+
+def get_all_alerts():
+    """All threshold and rule alerts."""
+    return alert_index.alerts() + rule_book.alerts()
 
 # --- Alert Management Sockets ---
 @socketio.on('get_alerts')
 def handle_get_alerts():
-    """Client requests the current list of alerts."""
-    emit('update_alerts', active_alerts)
+    """Client requests the current list of alerts (sent as a full 'update_alerts' snapshot)."""
+    emit('update_alerts', {'full': True, 'upserts': get_all_alerts(), 'removed': []})
 
 @socketio.on('get_system_alert_history')
-def handle_get_system_alert_history():
-    """Client requests the history of system-triggered alerts."""
-    emit('system_alert_history', system_alert_history)
+def handle_get_system_alert_history(data=None):
+    """
+    Client requests a page of system-triggered alerts, newest first.
+    Optional filters: {'since': seq, 'before': seq, 'limit': n, 'type': alert type, 'symbol': symbol}
+    """
+    try:
+        query = data if isinstance(data, dict) else {}
+        page = system_alert_history.page(
+            since=query.get('since'),
+            before=query.get('before'),
+            limit=query.get('limit'),
+            alert_type=query.get('type'),
+            symbol=query.get('symbol')
+        )
+        emit('system_alert_history', page)
+    except (TypeError, ValueError) as e:
+        print(f"Error reading system alert history. Invalid query: {data}. Error: {e}")
+        emit('alert_error', {'message': str(e)})
 
 @socketio.on('update_alert_settings')
 def handle_update_alert_settings(settings):
-    """Client sends updated alert settings."""
-    global client_alert_settings
-    print(f"Received alert settings update from client: {settings}")
-    # Basic validation to ensure we only accept known keys
-    if isinstance(settings, dict):
-        for key in client_alert_settings:
-            if key in settings and isinstance(settings[key], bool):
-                client_alert_settings[key] = settings[key]
-    print(f"Updated alert settings: {client_alert_settings}")
+    """
+    Client sends updated alert settings for its own session.
+    An optional 'watchlist' (list of symbols) limits alerts to those symbols; null clears it.
+    """
+    print(f"Received alert settings update from {request.sid}: {settings}")
+    if not isinstance(settings, dict):
+        return
+    try:
+        watchlist = settings.get('watchlist')
+        if watchlist is not None:
+            watchlist = [s if ':' in s else f"NSE:{s.upper()}-EQ" for s in watchlist]
+        leave, join, current = alert_subscriptions.update(
+            request.sid, settings, watchlist,
+            clear_watchlist='watchlist' in settings and settings['watchlist'] is None
+        )
+        for room in leave:
+            leave_room(room)
+        for room in join:
+            join_room(room)
+        print(f"Updated alert settings for {request.sid}: {current}")
+    except (KeyError, TypeError, AttributeError) as e:
+        print(f"Error updating alert settings. Invalid data: {settings}. Error: {e}")
+        emit('alert_error', {'message': str(e)})
 
 @socketio.on('add_alert')
 def handle_add_alert(data):
     """Handles adding a new alert."""
-    global active_alerts, alert_id_counter
+    global alert_id_counter
     try:
+        if data.get('condition'):
+            # Rule alert; without a symbol it scans the whole universe
+            symbol = data.get('symbol')
+            new_alert = {
+                "id": alert_id_counter + 1,
+                "symbol": f"NSE:{symbol.upper()}-EQ" if symbol else None,
+                "operator": 'rule',
+                "value": None,
+                "condition": data['condition'],
+                "triggered": False
+            }
+            rule_book.add(new_alert)
+        else:
+            new_alert = {
+                "id": alert_id_counter + 1,
+                "symbol": f"NSE:{data['symbol'].upper()}-EQ",
+                "operator": data['operator'],
+                "value": float(data['value']),
+                "triggered": False
+            }
+            alert_index.add(new_alert)
         alert_id_counter += 1
-        new_alert = {
-            "id": alert_id_counter,
-            "symbol": f"NSE:{data['symbol'].upper()}-EQ",
-            "operator": data['operator'],
-            "value": float(data['value']),
-            "triggered": False
-        }
-        active_alerts.append(new_alert)
+        alert_store.save_alert(new_alert)
         print(f"Alert created: {new_alert}")
-        # Broadcast the full updated list to all clients
-        socketio.emit('update_alerts', active_alerts)
-    except (KeyError, ValueError) as e:
+        socketio.emit('update_alerts', {'full': False, 'upserts': [new_alert], 'removed': []})
+    except (KeyError, ValueError, AttributeError) as e:
         print(f"Error creating alert. Invalid data: {data}. Error: {e}")
+        emit('alert_error', {'message': str(e)})
 
 @socketio.on('delete_alert')
 def handle_delete_alert(data):
     """Handles deletion of an alert by its ID."""
-    global active_alerts
     try:
         alert_id = data.get('id')
         if not alert_id:
             return
 
-        initial_len = len(active_alerts)
-        active_alerts = [alert for alert in active_alerts if alert.get('id') != alert_id]
-        
-        if len(active_alerts) < initial_len:
+        if alert_index.remove(alert_id) is not None or rule_book.remove(alert_id) is not None:
+            alert_store.delete_alert(alert_id)
             print(f"Alert with ID {alert_id} deleted.")
-        
-        # Broadcast the full updated list to all clients
-        socketio.emit('update_alerts', active_alerts)
+            socketio.emit('update_alerts', {'full': False, 'upserts': [], 'removed': [alert_id]})
     except KeyError as e:
         print(f"Error deleting alert. Invalid data: {data}. Error: {e}")
 
-# --- 5-Min Opening Candle Alert ---
-def check_positive_5min_candle_alert():
-    """Scheduled job to check for stocks with a positive 5-minute opening candle."""
-    global system_alert_history, positive_5min_alerted_stocks
-    print("Running scheduled 5-minute opening candle check...")
+# --- Opening Range / Time-Window Scans ---
+def run_range_scan(scan):
+    """Runs one range scan for today with a single grouped query over candles_1min."""
+    print(f"Running scheduled range scan '{scan.name}'...")
 
-    # Only run the check if the alert type is enabled by the client
-    if not client_alert_settings.get('positive_5min_open', True):
-        print("Positive 5-Min Open alert is disabled by client. Skipping check.")
+    # Only run the scan if some session wants this alert type (level scans always load,
+    # so sessions that enable the alert later still get the crosses)
+    if not scan.is_level_scan and not alert_subscriptions.is_active(scan.setting):
+        print(f"{scan.alert_type} alert is not enabled by any client. Skipping scan.")
         return
 
-    # Get a database connection
-    conn = None
     try:
-        conn = pool.connection()
-        with conn.cursor() as cur:
-            # Get the list of all unique symbols from the CSV data
-            all_symbols = list(csv_data.keys())
-            
-            # Define the time range for the first 5 minutes (9:15 to 9:19) for today
-            today = datetime.now().date()
-            start_time = datetime.combine(today, datetime.min.time()) + timedelta(hours=9, minutes=15)
-            end_time = start_time + timedelta(minutes=4) # Candles for 9:15, 9:16, 9:17, 9:18, 9:19
-
-            for symbol in all_symbols:
-                if symbol in positive_5min_alerted_stocks:
-                    continue # Skip if already alerted today
-
-                # Fetch the first 5 candles for the symbol
-                cur.execute("""
-                    SELECT open, high, low, close, timestamp FROM candles_1min
-                    WHERE symbol = %s AND timestamp BETWEEN %s AND %s
-                    ORDER BY timestamp ASC
-                    LIMIT 5;
-                """, (symbol, start_time, end_time))
-                
-                candles = cur.fetchall()
-
-                if len(candles) == 5:
-                    opening_price = candles[0][0] # Open of the first candle
-                    closing_price = candles[4][3] # Close of the fifth candle
-
-                    if closing_price > opening_price:
-                        # Mark as alerted and trigger the alert
-                        positive_5min_alerted_stocks.add(symbol)
-                        message = f"Positive 5-min open candle ({opening_price:.2f} -> {closing_price:.2f})"
-                        alert = {
-                            "id": f"sys_{symbol}_5min_{int(time.time())}",
-                            "symbol": symbol,
-                            "type": "Positive 5-Min Open",
-                            "message": message,
-                            "timestamp": datetime.now().isoformat()
-                        }
-                        system_alert_history.insert(0, alert)
-                        socketio.emit('system_alert_triggered', alert)
-                        print(f"🔔 SYSTEM ALERT: {symbol} - {message}")
+        scan_started = time.time()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                stats_by_symbol = scan.fetch_window_stats(cur, datetime.now().date())
+
+        if scan.is_level_scan:
+            # The window high/low becomes a level column checked every cycle by the engine
+            levels = scan.levels(stats_by_symbol)
+            system_alert_engine.set_levels(scan.name, levels)
+            level_field, direction = LEVEL_COMPARISONS[scan.comparison]
+            system_alert_engine.add_rule(LevelCrossRule(
+                scan.name, scan.setting, scan.alert_type, level=scan.name,
+                label=f"{scan.minutes}-min range {level_field}", direction=direction
+            ))
+            print(f"Range scan '{scan.name}': loaded levels for {len(levels)} symbols.")
+            return
 
+        matches = scan.matches(stats_by_symbol)
+        for symbol, stats in matches.items():
+            emit_system_alert({
+                "id": system_alert_id(symbol, scan.name),
+                "symbol": symbol,
+                "type": scan.alert_type,
+                "message": scan.message(stats),
+                "timestamp": datetime.now().isoformat()
+            }, scan.setting, scan_started)
+        print(f"Range scan '{scan.name}': {len(matches)} of {len(stats_by_symbol)} symbols matched.")
     except Exception as e:
-        print(f"Error checking 5-min candle alert: {e}")
-    finally:
-        if conn:
-            conn.close()
+        print(f"Error running range scan '{scan.name}': {e}")
 
-def schedule_5min_candle_check():
-    """Schedules the 5-min candle check to run daily at 9:20 AM."""
-    
-    def get_next_run_time():
-        now = datetime.now()
-        run_time_today = now.replace(hour=9, minute=20, second=0, microsecond=0)
-        if now > run_time_today:
-            # If it's past 9:20 AM, schedule for tomorrow
-            run_time_tomorrow = run_time_today + timedelta(days=1)
-            return run_time_tomorrow
-        return run_time_today
+def schedule_range_scans():
+    """Schedules every configured range scan to run daily once its window has closed."""
 
-    def schedule_job():
-        next_run = get_next_run_time()
+    def schedule_job(scan):
+        next_run = scan.next_run_time(datetime.now())
         delay = (next_run - datetime.now()).total_seconds()
-        print(f"Scheduling next 5-min candle check in {delay/3600:.2f} hours at {next_run}")
-        
-        # Using a Timer thread to run the check after the delay
-        threading.Timer(delay, run_and_reschedule).start()
+        print(f"Scheduling range scan '{scan.name}' in {delay/3600:.2f} hours at {next_run}")
 
-    def run_and_reschedule():
-        check_positive_5min_candle_alert()
+        # Using a Timer thread to run the scan after the delay
+        threading.Timer(delay, run_and_reschedule, args=(scan,)).start()
+
+    def run_and_reschedule(scan):
+        run_range_scan(scan)
         # Reschedule for the next day
-        schedule_job()
+        schedule_job(scan)
 
-    print("Initial scheduling of 5-min candle check...")
-    schedule_job()
+    print("Initial scheduling of range scans...")
+    for scan in RANGE_SCANS:
+        schedule_job(scan)
 # -----------------------------
 
 # --- RVol Calculation Setup ---
@@ -765,40 +1258,40 @@ def calculate_average_intraday_volume(lookback_days=10):
     global avg_volume_profiles
     print("Calculating average intraday volume profiles...")
     
-    conn = None
     try:
-        conn = pool.connection()
-        with conn.cursor() as cur:
-            # Define the date range for the query
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=lookback_days)
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                # Define the date range for the query
+                end_date = datetime.now().date()
+                start_date = end_date - timedelta(days=lookback_days)
             
-            # SQL query to fetch time interval and average volume
-            cur.execute("""
-                SELECT
-                    symbol,
-                    to_char(timestamp, 'HH24:MI') AS minute_interval,
-                    AVG(volume) AS avg_volume
-                FROM
-                    candles_1min
-                WHERE
-                    timestamp::date >= %s
-                    AND timestamp::date < %s
-                GROUP BY
-                    symbol, minute_interval
-                ORDER BY
-                    symbol, minute_interval;
-            """, (start_date, end_date))
+                # SQL query to fetch time interval and average volume
+                cur.execute("""
+                    SELECT
+                        symbol,
+                        to_char(timestamp, 'HH24:MI') AS minute_interval,
+                        AVG(volume) AS avg_volume
+                    FROM
+                        candles_1min
+                    WHERE
+                        timestamp::date >= %s
+                        AND timestamp::date < %s
+                    GROUP BY
+                        symbol, minute_interval
+                    ORDER BY
+                        symbol, minute_interval;
+                """, (start_date, end_date))
             
-            rows = cur.fetchall()
+                rows = cur.fetchall()
             
-            # Process the results into the desired structure
-            for row in rows:
-                symbol, minute_interval, avg_volume = row
-                if symbol not in avg_volume_profiles:
-                    avg_volume_profiles[symbol] = {}
-                avg_volume_profiles[symbol][minute_interval] = float(avg_volume)
-
+                # Process the results into the desired structure
+                for row in rows:
+                    symbol, minute_interval, avg_volume = row
+                    if symbol not in avg_volume_profiles:
+                        avg_volume_profiles[symbol] = {}
+                    avg_volume_profiles[symbol][minute_interval] = float(avg_volume)
+
+        system_alert_engine.set_volume_profiles(avg_volume_profiles)
         print(f"✅ Successfully calculated RVol profiles for {len(avg_volume_profiles)} symbols.")
         if avg_volume_profiles:
             # Log a sample for verification
@@ -808,11 +1301,70 @@ def calculate_average_intraday_volume(lookback_days=10):
 
     except Exception as e:
         print(f"❌ Error calculating average intraday volume: {e}")
-    finally:
-        if conn:
-            conn.close()
 # --------------------------
 
+# --- Reference Levels (PDH/PDL/PDC, previous week/month) ---
+# Levels for a trading day are computed once from candles_1day and stored in reference_levels;
+# startup and the daily refresh load the whole universe's levels with one query.
+REFERENCE_LEVELS_REFRESH_TIME = '09:00'
+
+def load_reference_levels(recompute=False):
+    """Loads today's reference levels into the system alert arrays, computing them if needed."""
+    print("Loading reference levels...")
+    try:
+        today = datetime.now().date()
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                if recompute:
+                    catch_up_daily_candles(cur) # Picks up days the pipeline missed while down
+                    compute_reference_levels(cur, today)
+                levels = ensure_reference_levels(cur, today)
+
+        for column, values_by_symbol in levels.items():
+            system_alert_engine.set_levels(column, values_by_symbol)
+        print(f"✅ Loaded reference levels for {len(levels['pdh'])} symbols.")
+    except Exception as e:
+        print(f"❌ Error loading reference levels: {e}")
+
+def schedule_reference_levels_refresh():
+    """Recomputes the reference levels every morning before the open."""
+    refresh_at = datetime.strptime(REFERENCE_LEVELS_REFRESH_TIME, '%H:%M').time()
+
+    def schedule_job():
+        now = datetime.now()
+        next_run = datetime.combine(now.date(), refresh_at)
+        if now > next_run:
+            next_run += timedelta(days=1)
+        delay = (next_run - now).total_seconds()
+        print(f"Scheduling reference level refresh in {delay/3600:.2f} hours at {next_run}")
+        threading.Timer(delay, run_and_reschedule).start()
+
+    def run_and_reschedule():
+        load_reference_levels(recompute=True)
+        # Reschedule for the next day
+        schedule_job()
+
+    schedule_job()
+# -----------------------------------------------------------
+
+
+# Socket.IO event -> handler, for entry points that register the handlers on another server (asgi_server, fanout_server)
+EVENT_HANDLERS = {
+    'connect': handle_connect,
+    'disconnect': handle_disconnect,
+    'set_encoding': handle_set_encoding,
+    'request_initial_data': handle_initial_data,
+    'subscribe_strategies': handle_subscribe_strategies,
+    'set_update_interval': handle_set_update_interval,
+    'subscribe_viewport': handle_subscribe_viewport,
+    'unsubscribe_viewport': handle_unsubscribe_viewport,
+    'get_alerts': handle_get_alerts,
+    'get_system_alert_history': handle_get_system_alert_history,
+    'update_alert_settings': handle_update_alert_settings,
+    'add_alert': handle_add_alert,
+    'delete_alert': handle_delete_alert,
+}
+
 
 if __name__ == '__main__':
     # This block now just calls the main server function.
@@ -0,0 +1,100 @@
+"""
+Set-based opening-range / time-window scans over candles_1min.
+
+A RangeScan describes a window (start time and length in minutes), a
+comparison and when to run. One grouped query returns open, high, low,
+close and candle count of the window for every symbol at once, instead of
+one query per symbol.
+
+Comparisons:
+    close_above_open / close_below_open  - evaluated once, when the scan runs
+    breakout_high / breakdown_low        - the window's high/low become a
+                                           level that live prices are checked
+                                           against every cycle
+"""
+
+from datetime import datetime, timedelta
+
+CANDLE_COMPARISONS = {
+    'close_above_open': lambda stats: stats['close'] > stats['open'],
+    'close_below_open': lambda stats: stats['close'] < stats['open'],
+}
+
+# comparison -> (window level used, direction of the cross)
+LEVEL_COMPARISONS = {
+    'breakout_high': ('high', 'above'),
+    'breakdown_low': ('low', 'below'),
+}
+
+
+class RangeScan:
+    """One configured window scan."""
+
+    def __init__(self, name, setting, alert_type, start, minutes, comparison, run_at=None, min_candles=None):
+        if comparison not in CANDLE_COMPARISONS and comparison not in LEVEL_COMPARISONS:
+            raise ValueError(f"Unknown range scan comparison '{comparison}'")
+        self.name = name
+        self.setting = setting  # Key in client_alert_settings
+        self.alert_type = alert_type
+        self.start = datetime.strptime(start, '%H:%M').time()
+        self.minutes = minutes
+        self.comparison = comparison
+        # By default the scan runs as soon as the window's last candle has closed
+        self.run_at = datetime.strptime(run_at, '%H:%M').time() if run_at else None
+        self.min_candles = min_candles if min_candles is not None else minutes
+
+    @property
+    def is_level_scan(self):
+        return self.comparison in LEVEL_COMPARISONS
+
+    def window(self, day):
+        """[start, end) of the window on the given date."""
+        start = datetime.combine(day, self.start)
+        return start, start + timedelta(minutes=self.minutes)
+
+    def next_run_time(self, now):
+        run_time = datetime.combine(now.date(), self.run_at) if self.run_at else self.window(now.date())[1]
+        if now > run_time:
+            run_time += timedelta(days=1)
+        return run_time
+
+    def fetch_window_stats(self, cur, day):
+        """Returns {symbol: {'open', 'high', 'low', 'close', 'candles'}} for the window, in one query."""
+        start, end = self.window(day)
+        cur.execute("""
+            SELECT
+                symbol,
+                (array_agg(open ORDER BY timestamp ASC))[1] AS open,
+                MAX(high) AS high,
+                MIN(low) AS low,
+                (array_agg(close ORDER BY timestamp DESC))[1] AS close,
+                COUNT(*) AS candles
+            FROM candles_1min
+            WHERE timestamp >= %s AND timestamp < %s
+            GROUP BY symbol;
+        """, (start, end))
+        return {
+            symbol: {'open': float(o), 'high': float(h), 'low': float(l), 'close': float(c), 'candles': n}
+            for symbol, o, h, l, c, n in cur.fetchall()
+        }
+
+    def complete(self, stats_by_symbol):
+        """Drops symbols that are missing candles in the window."""
+        return {symbol: stats for symbol, stats in stats_by_symbol.items() if stats['candles'] >= self.min_candles}
+
+    def matches(self, stats_by_symbol):
+        """Symbols whose window satisfies a candle comparison."""
+        condition = CANDLE_COMPARISONS[self.comparison]
+        return {symbol: stats for symbol, stats in self.complete(stats_by_symbol).items() if condition(stats)}
+
+    def levels(self, stats_by_symbol):
+        """{symbol: level} for level scans (the window high or low)."""
+        level_field = LEVEL_COMPARISONS[self.comparison][0]
+        return {symbol: stats[level_field] for symbol, stats in self.complete(stats_by_symbol).items()}
+
+    def message(self, stats):
+        if self.comparison == 'close_above_open':
+            return f"Positive {self.minutes}-min open candle ({stats['open']:.2f} -> {stats['close']:.2f})"
+        if self.comparison == 'close_below_open':
+            return f"Negative {self.minutes}-min open candle ({stats['open']:.2f} -> {stats['close']:.2f})"
+        return f"{self.alert_type} levels set"
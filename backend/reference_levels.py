@@ -0,0 +1,105 @@
+"""
+Precomputed daily reference levels for every symbol.
+
+Previous-day, previous-week and previous-month high/low/close are computed
+from the candles_1day rollup with one set-based statement and stored in
+reference_levels, keyed by the trading date they apply to. Startup (and the
+daily refresh) then loads the whole universe's levels with a single query,
+only computing them when today's row set does not exist yet.
+"""
+
+from datetime import timedelta
+
+# Column -> meaning; every column is also a UniverseArrays column of the same name
+LEVEL_COLUMNS = {
+    'pdh': 'previous day high',
+    'pdl': 'previous day low',
+    'pdc': 'previous day close',
+    'pwh': 'previous week high',
+    'pwl': 'previous week low',
+    'pwc': 'previous week close',
+    'pmh': 'previous month high',
+    'pml': 'previous month low',
+    'pmc': 'previous month close',
+}
+
+
+def level_periods(as_of):
+    """Start/end dates of the previous week and month, and how far back to scan, for a trading date."""
+    week_start = as_of - timedelta(days=as_of.weekday())
+    month_start = as_of.replace(day=1)
+    previous_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    return {
+        'as_of': as_of,
+        # Covers the previous month and, after a long holiday, the previous trading day
+        'scan_start': min(previous_month_start, as_of - timedelta(days=10)),
+        'week_start': week_start - timedelta(days=7),
+        'week_end': week_start,
+        'month_start': previous_month_start,
+        'month_end': month_start,
+    }
+
+
+def compute_reference_levels(cur, as_of):
+    """Computes and stores the levels that apply on `as_of` for all symbols; returns the row count."""
+    cur.execute("""
+        WITH daily AS (
+            SELECT symbol, day, high, low, close
+            FROM candles_1day
+            WHERE day >= %(scan_start)s AND day < %(as_of)s
+        ),
+        previous_day AS (
+            SELECT DISTINCT ON (symbol) symbol, high, low, close
+            FROM daily
+            ORDER BY symbol, day DESC
+        ),
+        previous_week AS (
+            SELECT symbol, MAX(high) AS high, MIN(low) AS low, (array_agg(close ORDER BY day DESC))[1] AS close
+            FROM daily
+            WHERE day >= %(week_start)s AND day < %(week_end)s
+            GROUP BY symbol
+        ),
+        previous_month AS (
+            SELECT symbol, MAX(high) AS high, MIN(low) AS low, (array_agg(close ORDER BY day DESC))[1] AS close
+            FROM daily
+            WHERE day >= %(month_start)s AND day < %(month_end)s
+            GROUP BY symbol
+        )
+        INSERT INTO reference_levels (symbol, as_of, pdh, pdl, pdc, pwh, pwl, pwc, pmh, pml, pmc, computed_at)
+        SELECT
+            d.symbol, %(as_of)s, d.high, d.low, d.close,
+            w.high, w.low, w.close, m.high, m.low, m.close, NOW()
+        FROM previous_day d
+        LEFT JOIN previous_week w USING (symbol)
+        LEFT JOIN previous_month m USING (symbol)
+        ON CONFLICT (symbol, as_of) DO UPDATE SET
+            pdh = EXCLUDED.pdh, pdl = EXCLUDED.pdl, pdc = EXCLUDED.pdc,
+            pwh = EXCLUDED.pwh, pwl = EXCLUDED.pwl, pwc = EXCLUDED.pwc,
+            pmh = EXCLUDED.pmh, pml = EXCLUDED.pml, pmc = EXCLUDED.pmc,
+            computed_at = EXCLUDED.computed_at;
+    """, level_periods(as_of))
+    return cur.rowcount
+
+
+def load_reference_levels(cur, as_of):
+    """Returns {column: {symbol: level}} for `as_of` in one query (empty if not computed yet)."""
+    columns = list(LEVEL_COLUMNS)
+    cur.execute(f"""
+        SELECT symbol, {', '.join(columns)} FROM reference_levels WHERE as_of = %s;
+    """, (as_of,))
+    levels = {column: {} for column in columns}
+    for row in cur.fetchall():
+        symbol = row[0]
+        for column, value in zip(columns, row[1:]):
+            if value is not None:
+                levels[column][symbol] = float(value)
+    return levels
+
+
+def ensure_reference_levels(cur, as_of):
+    """Loads the levels for `as_of`, computing them first if they are missing."""
+    levels = load_reference_levels(cur, as_of)
+    if not levels['pdh']:
+        compute_reference_levels(cur, as_of)
+        levels = load_reference_levels(cur, as_of)
+    return levels
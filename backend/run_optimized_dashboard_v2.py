@@ -10,7 +10,6 @@ import subprocess
 import time
 from pathlib import Path
 import datetime
-import re
 
 # Get the directory where the script is located
 SCRIPT_DIR = Path(__file__).resolve().parent
@@ -26,6 +25,8 @@ except ImportError as e:
     print(f"   Error details: {e}")
     print(f"   Please ensure 'optimized_flask_server_v2.py' is in the same directory as this script: {SCRIPT_DIR}")
     sys.exit(1)
+
+from universe_loader import DEFAULT_DATA_DIR, find_universe_csv
 # -----------------------------
 
 def run_fyers_login():
@@ -63,7 +64,7 @@ def get_dynamic_csv_path():
     Determines the path to the correct consolidated_stock_view CSV file
     based on the current date and stock market hours (9 AM opening).
     """
-    data_dir = Path("C:/Users/shash/Desktop/stock_selection_live/daily_consolidated_views") # User-specified path
+    data_dir = DEFAULT_DATA_DIR # User-specified path
     if not data_dir.is_dir():
         print(f"❌ Error: Data directory '{data_dir}' not found.")
         return None
@@ -78,42 +79,20 @@ def get_dynamic_csv_path():
             target_date -= datetime.timedelta(days=2)  # Target Friday
         elif target_date.weekday() == 5:  # Saturday (was Sunday, went to Sat)
             target_date -= datetime.timedelta(days=1)  # Target Friday
-    
-    target_filename_stem = f"consolidated_stock_view_{target_date.strftime('%Y-%m-%d')}_V2"
-    target_filename = f"{target_filename_stem}.csv"
-    specific_file_path = data_dir / target_filename
 
-    print(f"ℹ️  Attempting to find file for market date {target_date.strftime('%Y-%m-%d')}: {specific_file_path}")
+    print(f"ℹ️  Attempting to find file for market date {target_date.strftime('%Y-%m-%d')} in {data_dir}")
 
-    if specific_file_path.exists() and specific_file_path.is_file():
-        print(f"✅ Found specific target file: {specific_file_path}")
-        return str(specific_file_path)
-    else:
-        print(f"⚠️  Specific file '{specific_file_path.name}' not found in {data_dir}. Looking for the most recent valid file...")
-
-        candidate_files = []
-        file_pattern = re.compile(r"consolidated_stock_view_(\d{4}-\d{2}-\d{2})_V2\.csv")
+    # Checks the dated file directly and only scans the directory if it is missing
+    csv_path = find_universe_csv(data_dir, target_date)
+    if csv_path is None:
+        print(f"❌ Error: No 'consolidated_stock_view_YYYY-MM-DD_V2.csv' files found in {data_dir}.")
+        return None
 
-        for f_path in data_dir.glob("consolidated_stock_view_*-*_V2.csv"):
-            if f_path.is_file():
-                match = file_pattern.match(f_path.name)
-                if match:
-                    date_str = match.group(1)
-                    try:
-                        file_date = datetime.datetime.strptime(date_str, "%Y-%m-%d").date()
-                        candidate_files.append({'path': f_path, 'date': file_date})
-                    except ValueError:
-                        print(f"⚠️  Could not parse date from filename: {f_path.name}")
-        
-        if not candidate_files:
-            print(f"❌ Error: No 'consolidated_stock_view_YYYY-MM-DD_V2.csv' files found in {data_dir}.")
-            return None
-            
-        candidate_files.sort(key=lambda x: x['date'], reverse=True)
-        
-        latest_file = candidate_files[0]['path']
-        print(f"✅ Using the latest available file by date in filename: {latest_file} (dated {candidate_files[0]['date'].strftime('%Y-%m-%d')})")
-        return str(latest_file)
+    if csv_path.name == f"consolidated_stock_view_{target_date.strftime('%Y-%m-%d')}_V2.csv":
+        print(f"✅ Found specific target file: {csv_path}")
+    else:
+        print(f"⚠️  Specific file for {target_date.strftime('%Y-%m-%d')} not found. Using the latest available file by date in filename: {csv_path}")
+    return str(csv_path)
 
 def check_and_install_requirements():
     """Check and install required packages"""
@@ -0,0 +1,64 @@
+"""
+Versioned, pre-serialized initial_data snapshots.
+
+Building initial_data touches every symbol of the followed strategies and
+serializing it is the expensive part of a (re)connect. The cache keeps one
+serialized snapshot per view, i.e. per (encoding, followed strategies), and
+every client asking for that view gets the very same bytes. Gzip copies are
+made once, the first time a client of the view asks for compression.
+
+The stream loop calls invalidate() once per cycle in which data changed, so a
+view is rebuilt at most once per update cycle no matter how many clients
+connect; concurrent requests for a stale view wait for a single rebuild.
+The version is the data_update sequence number the snapshot is current to.
+"""
+
+import gzip
+import threading
+
+COMPRESSIONS = ['gzip']
+GZIP_LEVEL = 6  # Built once per cycle and view, so favour speed over the last few percent
+
+
+class SnapshotCache:
+    """
+    Snapshot bytes per view for the current version.
+
+    build(strategies) returns the grouped {strategy: {symbol: row}} data for a
+    strategy set (None for all); serialize(encoding, groups) turns it into bytes.
+    """
+
+    def __init__(self, build, serialize):
+        self._lock = threading.Lock()
+        self._build = build
+        self._serialize = serialize
+        self.version = 0
+        self._views = {}  # {(encoding, frozenset or None): {'groups': int, 'body': bytes, 'gzip': bytes}}
+
+    def invalidate(self, version=None):
+        """Marks every cached view stale as of `version` (default: the next one); returns it."""
+        with self._lock:
+            self.version = self.version + 1 if version is None else version
+            self._views = {}
+            return self.version
+
+    def get(self, encoding, strategies=None, compression=None):
+        """
+        Returns (version, data, group_count) for a view, building and serializing
+        it only if this version does not have it yet.
+        """
+        key = (encoding, None if strategies is None else frozenset(strategies))
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                groups = self._build(strategies)
+                view = self._views[key] = {
+                    'groups': len(groups),
+                    'body': self._serialize(encoding, groups),
+                }
+            if compression == 'gzip':
+                if 'gzip' not in view:
+                    view['gzip'] = gzip.compress(view['body'], compresslevel=GZIP_LEVEL, mtime=0)
+                return self.version, view['gzip'], view['groups']
+            return self.version, view['body'], view['groups']
+
@@ -0,0 +1,137 @@
+"""
+Which strategy groups each session receives, in which encoding and how often.
+
+A session either follows every strategy or an explicit set of them, at one
+update interval (see update_coalescer.py). It sits in exactly one stream room,
+named after its whole selection:
+
+    stream:<encoding>:<interval>s:*                every strategy (the full grouped payload)
+    stream:<encoding>:<interval>s:=<A>|<B>|...     the followed groups, merged into one payload
+
+so a session gets one update per sequence number however many strategies it
+follows. Sessions with the same selection share the room and its encode, so
+the cost follows the distinct selections sessions make rather than
+universe x clients.
+
+The interval a session asked for is kept apart from the one it gets: a slow
+session can be moved to a slower interval and back without losing its choice.
+"""
+
+import threading
+
+from update_coalescer import DEFAULT_UPDATE_INTERVAL
+
+ALL_STRATEGIES = '*'
+
+
+def stream_room(encoding, interval, strategies=None):
+    """The room of a strategy selection (a set of strategies, or None for all)."""
+    if strategies is None:
+        return f"stream:{encoding}:{interval}s:{ALL_STRATEGIES}"
+    return f"stream:{encoding}:{interval}s:={'|'.join(sorted(strategies))}"
+
+
+class StreamSubscriptions:
+    """Per-session encoding and strategy selection, mapped onto Socket.IO rooms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # {sid: {'encoding', 'strategies': set or None (all), 'interval', 'effective_interval', ...}}
+
+    @staticmethod
+    def _rooms(session):
+        return {stream_room(session['encoding'], session['effective_interval'], session['strategies'])}
+
+    def register(self, sid, encoding='json'):
+        """Adds a session following every strategy; returns the rooms to join."""
+        with self._lock:
+            session = self._sessions[sid] = {
+                'encoding': encoding, 'strategies': None, 'compression': None,
+                'interval': DEFAULT_UPDATE_INTERVAL, 'effective_interval': DEFAULT_UPDATE_INTERVAL,
+                'synced': False
+            }
+            return self._rooms(session)
+
+    def unregister(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def _update(self, sid, **changes):
+        with self._lock:
+            session = self._sessions[sid]
+            old_rooms = self._rooms(session)
+            session.update(changes)
+            new_rooms = self._rooms(session)
+            return old_rooms - new_rooms, new_rooms - old_rooms
+
+    def set_encoding(self, sid, encoding):
+        """Returns (rooms_to_leave, rooms_to_join)."""
+        return self._update(sid, encoding=encoding)
+
+    def set_strategies(self, sid, strategies):
+        """Follows the given strategies, or all of them for None. Returns (rooms_to_leave, rooms_to_join)."""
+        return self._update(sid, strategies=None if strategies is None else frozenset(strategies))
+
+    def set_interval(self, sid, interval):
+        """The session's chosen update interval (also in effect from now on). Returns (rooms_to_leave, rooms_to_join)."""
+        return self._update(sid, interval=interval, effective_interval=interval)
+
+    def set_effective_interval(self, sid, interval):
+        """Moves the session to another interval without changing its choice. Returns (rooms_to_leave, rooms_to_join)."""
+        return self._update(sid, effective_interval=interval)
+
+    def intervals(self):
+        """[(sid, chosen_interval, effective_interval)] for every session."""
+        with self._lock:
+            return [(sid, s['interval'], s['effective_interval']) for sid, s in self._sessions.items()]
+
+    def effective_interval(self, sid):
+        session = self._sessions.get(sid)
+        return session['effective_interval'] if session else DEFAULT_UPDATE_INTERVAL
+
+    def set_compression(self, sid, compression):
+        """Compression of the session's initial_data snapshots (None or 'gzip'); no room change."""
+        with self._lock:
+            if sid in self._sessions:
+                self._sessions[sid]['compression'] = compression
+
+    def mark_synced(self, sid):
+        """The session has been sent a snapshot or resync, so later deltas apply on top of it."""
+        with self._lock:
+            if sid in self._sessions:
+                self._sessions[sid]['synced'] = True
+
+    def is_synced(self, sid):
+        session = self._sessions.get(sid)
+        return bool(session and session['synced'])
+
+    def compression(self, sid):
+        session = self._sessions.get(sid)
+        return session['compression'] if session else None
+
+    def encoding(self, sid):
+        session = self._sessions.get(sid)
+        return session['encoding'] if session else 'json'
+
+    def strategies(self, sid):
+        """The session's followed strategies, or None for all."""
+        session = self._sessions.get(sid)
+        return set(session['strategies']) if session and session['strategies'] is not None else None
+
+    def targets(self):
+        """
+        What a broadcast has to produce: {(encoding, interval): (all_followed, {selection, ...})},
+        i.e. per encoding and interval whether any session follows everything and
+        which strategy selections (frozensets) sessions follow.
+        """
+        with self._lock:
+            targets = {}
+            for session in self._sessions.values():
+                key = (session['encoding'], session['effective_interval'])
+                follow_all, selections = targets.get(key, (False, set()))
+                if session['strategies'] is None:
+                    follow_all = True
+                else:
+                    selections.add(session['strategies'])
+                targets[key] = (follow_all, selections)
+            return targets
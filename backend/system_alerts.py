@@ -0,0 +1,259 @@
+"""
+Vectorized system-alert evaluation over the whole universe.
+
+Live quotes and static levels are held in NumPy column arrays with one row
+per symbol. Each cycle every enabled rule is evaluated as a single array
+comparison; which symbols have already fired is kept as a boolean mask per
+rule, so a full cycle over thousands of symbols costs a few array operations.
+"""
+
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+# Live quote fields loaded each cycle: {array name: key in the Fyers tick}
+QUOTE_FIELDS = {
+    'ltp': 'ltp',
+    'change': 'chp',
+    'volume': 'vol_traded_today',
+    'high': 'high_price',
+    'low': 'low_price',
+    'open': 'open_price',
+}
+
+# Numeric static fields copied from csv_data
+STATIC_FIELDS = ['pdh', 'gap', 'newsWeight']
+
+# Reference levels computed from candles (reference_levels.py); pdh there overrides the CSV value
+REFERENCE_FIELDS = ['pdl', 'pdc', 'pwh', 'pwl', 'pwc', 'pmh', 'pml', 'pmc']
+
+
+def system_alert_id(symbol, name):
+    """A unique system alert id; the random suffix keeps two alerts in the same second apart."""
+    return f"sys_{symbol}_{name}_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+
+
+class UniverseArrays:
+    """Column arrays for the live universe, one row per symbol."""
+
+    def __init__(self, symbols=()):
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+        self.columns = {name: np.zeros(n) for name in list(QUOTE_FIELDS) + STATIC_FIELDS + REFERENCE_FIELDS + ['candle_volume']}
+        self.columns['rvol'] = np.full(n, np.nan)
+        self.has_quote = np.zeros(n, dtype=bool)
+        self.static_columns = {}  # CSV values, the fallback for levels set with set_column
+        # Average volume per (symbol, minute of day), filled by set_volume_profiles
+        self.avg_volume = np.full((n, 0), np.nan, dtype=np.float32)
+        self.minute_columns = {}
+        self._loaded = False  # load_quotes loads every tick once after a rebuild
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def load_static(self, csv_data):
+        """Copies the numeric static fields of csv_data into their columns."""
+        for name in STATIC_FIELDS:
+            self.columns[name] = np.array([_as_float(csv_data.get(s, {}).get(name)) for s in self.symbols])
+            self.static_columns[name] = self.columns[name].copy()
+
+    def load_quotes(self, ltp_data, changed=None):
+        """
+        Loads the ticks of the `changed` symbols (every symbol when None, and on the first call
+        after a rebuild) with one flat array build and one fancy assignment per field.
+        A tick without an ltp leaves its row unquoted rather than at 0.
+        """
+        if changed is None or not self._loaded:
+            changed = ltp_data.keys()
+        self._loaded = True
+        index, keys = self.index, list(QUOTE_FIELDS.values())
+        rows, flat = [], []
+        for symbol in changed:
+            i = index.get(symbol)
+            data = ltp_data.get(symbol)
+            if i is None or not isinstance(data, dict):
+                continue
+            rows.append(i)
+            flat.extend(map(data.get, keys))
+        if not rows:
+            return 0
+
+        values = np.array(flat, dtype=float).reshape(len(rows), len(keys))  # Missing fields become NaN
+        quoted = ~np.isnan(values[:, 0])
+        rows = np.array(rows)
+        self.has_quote[rows] = quoted
+        values = np.nan_to_num(values[quoted])
+        for j, name in enumerate(QUOTE_FIELDS):
+            self.columns[name][rows[quoted]] = values[:, j]
+        return len(rows)
+
+    def set_column(self, name, values_by_symbol, default=0.0):
+        """
+        Creates (or replaces) a column from a {symbol: number} mapping.
+        Symbols missing from the mapping keep their CSV value for static fields, else `default`.
+        """
+        if name in self.static_columns:
+            self.columns[name] = self.static_columns[name].copy()
+        else:
+            self.columns[name] = np.full(len(self.symbols), default)
+        self.load_field(name, values_by_symbol)
+
+    def load_field(self, name, values_by_symbol):
+        """Loads a {symbol: number} mapping into the named column."""
+        rows, values = [], []
+        for symbol, value in values_by_symbol.items():
+            i = self.index.get(symbol)
+            if i is not None:
+                rows.append(i)
+                values.append(value)
+        if rows:
+            self.columns[name][rows] = values
+
+    def set_volume_profiles(self, avg_volume_profiles):
+        """Packs {symbol: {'HH:MM': avg_volume}} into a [symbol x minute] array."""
+        minutes = sorted({minute for profile in avg_volume_profiles.values() for minute in profile})
+        self.minute_columns = {minute: j for j, minute in enumerate(minutes)}
+        self.avg_volume = np.full((len(self.symbols), len(minutes)), np.nan, dtype=np.float32)
+        for symbol, profile in avg_volume_profiles.items():
+            i = self.index.get(symbol)
+            if i is None:
+                continue
+            for minute, avg_volume in profile.items():
+                self.avg_volume[i, self.minute_columns[minute]] = avg_volume
+
+    def compute_rvol(self, minute_key):
+        """Relative volume of the current candle for every symbol (NaN where no profile exists)."""
+        j = self.minute_columns.get(minute_key)
+        if j is None:
+            return np.full(len(self.symbols), np.nan)
+        avg_volume = self.avg_volume[:, j].astype(float)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rvol = np.where(avg_volume > 0, self.columns['candle_volume'] / avg_volume, np.nan)
+        self.columns['rvol'] = rvol
+        return rvol
+
+
+def _as_float(value):
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class LevelCrossRule:
+    """Fires once per symbol when `field` moves above (or below) the per-symbol `level` column."""
+
+    def __init__(self, name, setting, alert_type, level, label, field='ltp', direction='above'):
+        self.name = name
+        self.setting = setting  # Key in client_alert_settings
+        self.alert_type = alert_type
+        self.level = level
+        self.label = label
+        self.field = field
+        self.direction = direction
+
+    def condition(self, arrays):
+        level = arrays[self.level]
+        value = arrays[self.field]
+        crossed = value > level if self.direction == 'above' else value < level
+        return crossed & (level > 0) & arrays.has_quote
+
+    def build_alert(self, symbol, i, arrays):
+        level = arrays[self.level][i]
+        word = 'crossed' if self.direction == 'above' else 'broke below'
+        return {
+            "id": system_alert_id(symbol, self.name),
+            "symbol": symbol,
+            "type": self.alert_type,
+            "message": f"Price {word} {self.label} ({level:.2f})",
+            "timestamp": datetime.now().isoformat()
+        }
+
+
+DEFAULT_RULES = [
+    LevelCrossRule('pdh', 'pdh_cross', 'PDH Crossed', level='pdh', label='PDH'),
+    LevelCrossRule('pdl', 'pdl_break', 'PDL Broken', level='pdl', label='PDL', direction='below'),
+]
+
+
+class SystemAlertEngine:
+    """Evaluates every system rule over the universe arrays in one pass per cycle."""
+
+    def __init__(self, rules=None):
+        self.rules = list(rules if rules is not None else DEFAULT_RULES)
+        self.arrays = UniverseArrays()
+        self.fired = {rule.name: np.zeros(0, dtype=bool) for rule in self.rules}
+        self._csv_data = None
+        self._volume_profiles = {}
+        self._levels = {}  # Extra per-symbol level columns, re-applied on universe rebuilds
+
+    def sync_universe(self, csv_data):
+        """Rebuilds the arrays when csv_data was replaced or resized, keeping fired state per symbol."""
+        if csv_data is self._csv_data and len(csv_data) == len(self.arrays):
+            return
+        old_arrays, old_fired = self.arrays, self.fired
+        self.arrays = UniverseArrays(csv_data.keys())
+        self.arrays.load_static(csv_data)
+        if self._volume_profiles:
+            self.arrays.set_volume_profiles(self._volume_profiles)
+        for column, values_by_symbol in self._levels.items():
+            self.arrays.set_column(column, values_by_symbol)
+
+        kept_new = [i for i, s in enumerate(self.arrays.symbols) if s in old_arrays.index]
+        kept_old = [old_arrays.index[self.arrays.symbols[i]] for i in kept_new]
+        self.fired = {}
+        for rule in self.rules:
+            mask = np.zeros(len(self.arrays), dtype=bool)
+            if kept_new and rule.name in old_fired:
+                mask[kept_new] = old_fired[rule.name][kept_old]
+            self.fired[rule.name] = mask
+        self._csv_data = csv_data
+
+    def set_volume_profiles(self, avg_volume_profiles):
+        self._volume_profiles = avg_volume_profiles
+        self.arrays.set_volume_profiles(avg_volume_profiles)
+
+    def set_levels(self, column, values_by_symbol):
+        """
+        Loads a per-symbol level column (e.g. an opening range high) that rules can cross.
+        Rules crossing this column start over, since the levels are new.
+        """
+        self._levels[column] = values_by_symbol
+        self.arrays.set_column(column, values_by_symbol)
+        for rule in self.rules:
+            if getattr(rule, 'level', None) == column:
+                self.fired[rule.name] = np.zeros(len(self.arrays), dtype=bool)
+
+    def add_rule(self, rule):
+        """Adds a rule, or replaces the one with the same name; its fired state starts empty."""
+        self.fired[rule.name] = np.zeros(len(self.arrays), dtype=bool)
+        self.rules = [r for r in self.rules if r.name != rule.name] + [rule]
+
+    def evaluate(self, settings=None):
+        """
+        Evaluates all enabled rules and marks what fired.
+
+        Returns a list of (rule, row_indices) for rules that fired this cycle.
+        """
+        results = []
+        for rule in self.rules:
+            if settings is not None and not settings.get(rule.setting, True):
+                continue
+            fired = self.fired[rule.name]
+            newly_fired = rule.condition(self.arrays) & ~fired
+            rows = np.flatnonzero(newly_fired)
+            if rows.size:
+                fired[rows] = True
+                results.append((rule, rows))
+        return results
+
+    def build_alerts(self, results):
+        """Turns evaluate() results into system alert dicts."""
+        symbols = self.arrays.symbols
+        return [rule.build_alert(symbols[i], i, self.arrays) for rule, rows in results for i in rows]
@@ -0,0 +1,291 @@
+"""
+Shared loader for the daily consolidated_stock_view universe CSV.
+
+All mapping, parsing and symbol normalization is done as whole-column
+pandas operations and the per-symbol static data mapping is built in one step.
+The parsed universe is cached as a binary snapshot next to the CSV, keyed by
+the file's mtime and content hash, so restarts skip the parse entirely.
+"""
+
+import io
+import os
+import re
+import pickle
+import hashlib
+from pathlib import Path
+
+import pandas as pd
+
+# Where the screener writes the daily consolidated views
+DEFAULT_DATA_DIR = Path("C:/Users/shash/Desktop/stock_selection_live/daily_consolidated_views")
+UNIVERSE_FILE_PATTERN = re.compile(r"consolidated_stock_view_(\d{4}-\d{2}-\d{2})_V2\.csv")
+
+# Bump when the snapshot layout or the parsing rules change
+UNIVERSE_CACHE_VERSION = 1
+
+# Columns that are never sent to the dashboard
+DROPPED_COLUMNS = ['Announcement Links', 'Announcement Text']
+
+# Map CSV columns to dashboard fields
+COLUMN_MAPPING = {
+    'Announcement Weight': 'newsWeight',
+    'chart-ink strategy': 'chartStrategy',
+    'Announcement Description': 'description',
+    'Nse_pre market': 'premarket',
+    'Open in Prev Range Top 20%': 'sopen',
+    'Gap %': 'gap',
+    'PDC strong close': 'spdc',
+    'Prev_High': 'pdh'
+}
+
+# Columns rendered as 'yes' / 'no' flags
+FLAG_COLUMNS = ['Nse_pre market', 'Open in Prev Range Top 20%', 'PDC strong close']
+FLAG_TRUE_VALUES = ['yes', 'true', '1']
+
+
+def normalize_symbols(raw_symbols):
+    """Converts a Series of screener symbols to Fyers format (e.g. 'RELIANCE' -> 'NSE:RELIANCE-EQ')."""
+    symbols = raw_symbols.astype(str)
+    symbols = symbols.where(symbols.str.startswith('NSE:'), 'NSE:' + symbols)
+    symbols = symbols.where(symbols.str.endswith('-EQ'), symbols + '-EQ')
+    return symbols
+
+
+def _to_float(column, strip_chars=''):
+    """Parses a column to float; blanks, '-' and anything non-numeric become 0.0."""
+    if column.dtype == object:
+        column = column.astype(str).str.strip()
+        for char in strip_chars:
+            column = column.str.replace(char, '', regex=False)
+    return pd.to_numeric(column, errors='coerce').fillna(0.0).astype(float)
+
+
+def _to_flag(column):
+    """Maps a yes/true/1 style column to 'yes' / 'no'."""
+    is_set = column.astype(str).str.strip().str.lower().isin(FLAG_TRUE_VALUES)
+    return is_set.map({True: 'yes', False: 'no'})
+
+
+def load_universe_frame(csv_path):
+    """Reads the raw universe CSV. The first column always holds the symbol."""
+    df = pd.read_csv(csv_path)
+    df.iloc[:, 0] = df.iloc[:, 0].astype(str)
+    return df
+
+
+def build_csv_data(df, map_columns=True):
+    """
+    Builds the {fyers_symbol: static_data} mapping from a raw universe frame.
+
+    With map_columns=True the columns are renamed and parsed into the dashboard
+    fields (newsWeight, gap, pdh, yes/no flags, announcement). With
+    map_columns=False the original column names and values are kept, which is
+    what the legacy servers expect.
+    """
+    if df.empty:
+        return {}
+
+    symbols = normalize_symbols(df.iloc[:, 0])
+    static = df.iloc[:, 1:].drop(columns=DROPPED_COLUMNS, errors='ignore')
+
+    if map_columns:
+        parsed = {}
+        for col_name in static.columns:
+            column = static[col_name]
+            if col_name == 'chart-ink strategy':
+                parsed['chartStrategy'] = column.fillna('').astype(str).replace('nan', '')
+            elif col_name.strip().lower() == 'announcement weight':
+                parsed['newsWeight'] = _to_float(column)
+            elif col_name == 'Gap %':
+                parsed['gap'] = _to_float(column, strip_chars='%')
+            elif col_name == 'Prev_High':
+                parsed['pdh'] = _to_float(column)
+            elif col_name in FLAG_COLUMNS:
+                parsed[COLUMN_MAPPING[col_name]] = _to_flag(column)
+            else:
+                mapped_key = COLUMN_MAPPING.get(col_name, col_name.lower().replace(' ', '_'))
+                parsed[mapped_key] = column.astype(object).where(column.notna(), None)
+        static = pd.DataFrame(parsed, index=static.index)
+
+        # Set announcement based on description
+        if 'description' in static.columns:
+            description = static['description']
+            has_announcement = description.notna() & (description.astype(str) != '-') & (description.astype(str) != '')
+        else:
+            has_announcement = pd.Series(False, index=static.index)
+        static['announcement'] = has_announcement.map({True: 'yes', False: 'no'})
+    else:
+        static = static.astype(object).where(static.notna(), None)
+
+    # Later rows win for duplicated symbols, same as the old row-by-row loader
+    static.index = symbols.values
+    static = static[~static.index.duplicated(keep='last')]
+    return static.to_dict(orient='index')
+
+
+def load_universe_csv(csv_path, map_columns=True):
+    """Returns the {fyers_symbol: static_data} mapping for the universe CSV (cached)."""
+    return load_universe_snapshot(csv_path, map_columns=map_columns)['csv_data']
+
+
+def split_strategies(chart_strategy):
+    """Splits a comma separated chartStrategy string; symbols without one are 'Uncategorized'."""
+    if not chart_strategy:
+        return ['Uncategorized']
+    strategies = [s.strip() for s in str(chart_strategy).split(',') if s.strip()]
+    return strategies or ['Uncategorized']
+
+
+class StrategyIndex:
+    """
+    Strategy membership parsed once per universe load.
+
+    members: {strategy: [symbol, ...]} in universe order
+    by_symbol: {symbol: (strategy, ...)}
+    """
+
+    def __init__(self, strategies_by_symbol=None):
+        self.by_symbol = {symbol: tuple(strategies) for symbol, strategies in (strategies_by_symbol or {}).items()}
+        self.members = {}
+        for symbol, strategies in self.by_symbol.items():
+            for strategy in strategies:
+                self.members.setdefault(strategy, []).append(symbol)
+
+    @classmethod
+    def from_csv_data(cls, csv_data, strategy_key='chartStrategy'):
+        return cls({symbol: split_strategies(static.get(strategy_key)) for symbol, static in csv_data.items()})
+
+    def strategies_of(self, symbol):
+        return self.by_symbol.get(symbol, ('Uncategorized',))
+
+    def group(self, rows_by_symbol):
+        """Groups {symbol: row} into {strategy: {symbol: row}} with one lookup per symbol."""
+        grouped = {}
+        for symbol, row in rows_by_symbol.items():
+            for strategy in self.strategies_of(symbol):
+                group = grouped.get(strategy)
+                if group is None:
+                    group = grouped[strategy] = {}
+                group[symbol] = row
+        return grouped
+
+
+def build_universe_snapshot(df, map_columns=True):
+    """Builds the cacheable universe: symbols, static fields and strategy membership."""
+    csv_data = build_csv_data(df, map_columns=map_columns)
+    strategy_key = 'chartStrategy' if map_columns else 'chart-ink strategy'
+    return {
+        'version': UNIVERSE_CACHE_VERSION,
+        'columns': list(df.columns),
+        'symbols': list(csv_data.keys()),
+        'csv_data': csv_data,
+        'strategies': {symbol: split_strategies(static.get(strategy_key)) for symbol, static in csv_data.items()},
+    }
+
+
+# --- Binary Snapshot Cache ---
+def universe_cache_path(csv_path, map_columns=True):
+    """The snapshot lives next to the CSV, one per column mode."""
+    csv_path = Path(csv_path)
+    suffix = '.universe.pkl' if map_columns else '.universe_raw.pkl'
+    return csv_path.with_name(csv_path.name + suffix)
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            snapshot = pickle.load(f)
+        if isinstance(snapshot, dict) and snapshot.get('version') == UNIVERSE_CACHE_VERSION:
+            return snapshot
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️  Ignoring unreadable universe cache '{cache_path}': {e}")
+    return None
+
+
+def _write_cache(cache_path, snapshot):
+    # Write to a temp file first so a crash never leaves a half-written cache behind
+    tmp_path = cache_path.with_name(cache_path.name + '.tmp')
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        print(f"⚠️  Could not write universe cache '{cache_path}': {e}")
+
+
+def load_universe_snapshot(csv_path, map_columns=True):
+    """
+    Returns the parsed universe snapshot for csv_path, using the binary cache when it is current.
+
+    The cache is trusted when the CSV's mtime and size match. If only the mtime
+    changed (e.g. the file was copied or touched), the content hash decides.
+    The CSV is parsed only when its content actually changed.
+    """
+    csv_path = Path(csv_path)
+    cache_path = universe_cache_path(csv_path, map_columns)
+    stat = csv_path.stat()
+
+    cached = _read_cache(cache_path)
+    if cached and cached['csv_mtime_ns'] == stat.st_mtime_ns and cached['csv_size'] == stat.st_size:
+        return cached
+
+    content = csv_path.read_bytes()
+    digest = hashlib.sha1(content).hexdigest()
+    if cached and cached['csv_sha1'] == digest:
+        cached['csv_mtime_ns'] = stat.st_mtime_ns
+        _write_cache(cache_path, cached)
+        return cached
+
+    print(f"ℹ️  Parsing universe CSV (cache miss): {csv_path.name}")
+    snapshot = build_universe_snapshot(load_universe_frame(io.BytesIO(content)), map_columns=map_columns)
+    snapshot['csv_mtime_ns'] = stat.st_mtime_ns
+    snapshot['csv_size'] = stat.st_size
+    snapshot['csv_sha1'] = digest
+    _write_cache(cache_path, snapshot)
+    return snapshot
+
+
+def find_universe_csv(data_dir, target_date):
+    """
+    Returns the universe CSV for target_date, or the most recent dated one in data_dir.
+
+    The dated file is checked with a single stat; the directory is only scanned
+    when it is missing, in one pass that keeps the newest date seen.
+    """
+    data_dir = Path(data_dir)
+    specific_file_path = data_dir / f"consolidated_stock_view_{target_date.strftime('%Y-%m-%d')}_V2.csv"
+    if specific_file_path.is_file():
+        return specific_file_path
+
+    latest_date, latest_path = None, None
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            match = UNIVERSE_FILE_PATTERN.fullmatch(entry.name)
+            # ISO dates compare correctly as strings
+            if match and (latest_date is None or match.group(1) > latest_date) and entry.is_file():
+                latest_date, latest_path = match.group(1), Path(entry.path)
+    return latest_path
+
+
+def diff_universe(old_csv_data, new_csv_data):
+    """
+    Compares two {symbol: static_data} mappings.
+
+    Returns (added, removed, changed): added is {symbol: static_data}, removed
+    is a list of symbols and changed is {symbol: {field: new_value}} holding
+    only the fields that differ (fields that disappeared map to None).
+    """
+    added = {symbol: static for symbol, static in new_csv_data.items() if symbol not in old_csv_data}
+    removed = [symbol for symbol in old_csv_data if symbol not in new_csv_data]
+
+    changed = {}
+    for symbol, new_static in new_csv_data.items():
+        old_static = old_csv_data.get(symbol)
+        if old_static is None or old_static == new_static:
+            continue
+        fields = {key: value for key, value in new_static.items() if old_static.get(key) != value}
+        fields.update({key: None for key in old_static if key not in new_static})
+        changed[symbol] = fields
+    return added, removed, changed
@@ -0,0 +1,98 @@
+"""
+Per-rate coalescing of the data_update stream.
+
+Sessions pick an update interval, snapped to one of UPDATE_INTERVALS. Every
+interval with subscribers is a tier with one pending buffer: each cycle's
+grouped deltas are merged into it (latest value per symbol and field wins)
+and the tier is flushed to its rooms when its interval has elapsed. Clients
+on the same rate therefore share one merge and one encode per flush, and a
+5-second client receives each changed symbol once per 5 seconds however often
+it ticked. A flush carries the newest sequence number merged into it, so
+resync (delta_log) works the same at every rate.
+"""
+
+import threading
+
+# Seconds; the stream loop runs once a second, so that is also the fastest rate
+UPDATE_INTERVALS = [1, 2, 5]
+DEFAULT_UPDATE_INTERVAL = 1
+FLUSH_TOLERANCE = 0.1 # Loop jitter allowed before a flush counts as due
+
+
+def snap_interval(seconds):
+    """The fastest tier not faster than `seconds` (the slowest tier for anything above it)."""
+    for interval in UPDATE_INTERVALS:
+        if seconds <= interval:
+            return interval
+    return UPDATE_INTERVALS[-1]
+
+
+def slower_interval(interval):
+    """The next slower tier, or None when already at the slowest."""
+    slower = [i for i in UPDATE_INTERVALS if i > interval]
+    return slower[0] if slower else None
+
+
+def _merge(pending, groups):
+    for strategy, group in groups.items():
+        target = pending.get(strategy)
+        if target is None:
+            target = pending[strategy] = {}
+        for symbol, fields in group.items():
+            row = target.get(symbol)
+            if row is None:
+                target[symbol] = dict(fields)
+            else:
+                row.update(fields)
+
+
+class UpdateCoalescer:
+    """Pending merged deltas per active interval tier."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tiers = {} # {interval: {'groups', 'owned', 'seq', 'last_flush', 'flushed_seq'}}
+
+    def add(self, groups, seq, active_intervals):
+        """Merges one cycle's grouped deltas into every active tier; drops inactive tiers."""
+        with self._lock:
+            for interval in list(self._tiers):
+                if interval not in active_intervals:
+                    del self._tiers[interval]
+            for interval in active_intervals:
+                tier = self._tiers.get(interval)
+                if tier is None:
+                    tier = self._tiers[interval] = {'groups': None, 'owned': False, 'seq': None,
+                                                    'last_flush': 0, 'flushed_seq': None}
+                if tier['groups'] is None:
+                    # Shared with the caller until a second cycle has to be merged in
+                    tier['groups'], tier['owned'] = groups, False
+                else:
+                    if not tier['owned']:
+                        shared, tier['groups'], tier['owned'] = tier['groups'], {}, True
+                        _merge(tier['groups'], shared)
+                    _merge(tier['groups'], groups)
+                tier['seq'] = seq
+
+    def take_due(self, now, active_intervals, force=False):
+        """
+        Returns [(interval, groups, seq)] for every tier whose interval elapsed (any tier when
+        `force`) with changes pending.
+        """
+        due = []
+        with self._lock:
+            for interval in active_intervals:
+                tier = self._tiers.get(interval)
+                if tier is None or tier['groups'] is None:
+                    continue
+                if force or now - tier['last_flush'] >= interval - FLUSH_TOLERANCE:
+                    due.append((interval, tier['groups'], tier['seq']))
+                    tier['groups'], tier['owned'], tier['last_flush'] = None, False, now
+                    tier['flushed_seq'] = tier['seq']
+        return due
+
+    def flushed_seq(self, interval):
+        """Sequence number of the tier's last flush (what its clients are current to), or None."""
+        with self._lock:
+            tier = self._tiers.get(interval)
+            return tier['flushed_seq'] if tier else None
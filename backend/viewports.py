@@ -0,0 +1,291 @@
+"""
+Server-side sorted and filtered viewports over the live universe.
+
+A client subscribes to a view instead of whole strategy groups:
+
+    {'id': 'morning-table', 'strategy': 'Morning', 'sort': 'change', 'descending': true,
+     'filters': {'change': '>5', 'gap': '2-10', 'ltp': '>=100'}, 'search': 'BANK',
+     'offset': 0, 'limit': 30}
+
+Filters use the dashboard's syntax: '>5', '>=100', '<=3', '!=0', '7' (equals)
+and ranges '2-10' (inclusive). Fields are the alert-rule fields (ltp, change,
+gap, rvol, pdh, ...); 'search' matches part of the symbol.
+
+Identical specs share one view, one room and one computation, however many
+clients watch them. Each cycle a view is re-ranked only if a field it sorts or
+filters on changed (top-k by partition, ties broken by universe order). Views
+on fields the deltas do not carry (candle_volume, reference levels, ...) are
+re-ranked every cycle, since their changes cannot be seen. Either way,
+its subscribers get just the rows entering or leaving the window, the changed
+fields of rows inside it and the new order when it moved.
+"""
+
+import re
+import json
+import hashlib
+import threading
+
+import numpy as np
+
+from alert_rules import FIELD_ALIASES, COMPARISONS
+
+MAX_VIEWPORT_ROWS = 200
+
+NUMBER = r'[-+]?\d+(?:\.\d+)?'
+RANGE_PATTERN = re.compile(rf'^({NUMBER})\s*-\s*({NUMBER})$')
+COMPARISON_PATTERN = re.compile(rf'^(>=|<=|!=|==|=|>|<|≥|≤)?\s*({NUMBER})$')
+OPERATOR_ALIASES = {'=': '==', '≥': '>=', '≤': '<=', None: '=='}
+
+
+class ViewportError(ValueError):
+    """Raised when a viewport subscription is invalid."""
+
+
+def parse_filter(expression):
+    """Parses a filter expression into a function column -> boolean mask."""
+    text = str(expression).strip()
+    match = RANGE_PATTERN.match(text)
+    if match:
+        low, high = sorted((float(match.group(1)), float(match.group(2))))
+        return lambda column: (column >= low) & (column <= high)
+    match = COMPARISON_PATTERN.match(text)
+    if match:
+        operator = OPERATOR_ALIASES.get(match.group(1), match.group(1))
+        compare, value = COMPARISONS[operator], float(match.group(2))
+        return lambda column: compare(column, value)
+    raise ViewportError(f"Invalid filter '{expression}'. Use e.g. '>5', '>=100', '2-10' or '7'.")
+
+
+def _field(name):
+    field = FIELD_ALIASES.get(str(name).lower())
+    if field is None:
+        raise ViewportError(f"Unknown field '{name}'. Known fields: {', '.join(sorted(FIELD_ALIASES))}")
+    return field
+
+
+def normalize_spec(data):
+    """Validates a subscription and returns the canonical spec (everything but the client's id)."""
+    if not isinstance(data, dict):
+        raise ViewportError("Viewport subscription must be an object.")
+    sort = data.get('sort') or 'symbol'
+    filters = data.get('filters') or {}
+    if not isinstance(filters, dict):
+        raise ViewportError("'filters' must map fields to expressions.")
+    try:
+        offset = int(data.get('offset') or 0)
+        limit = int(data.get('limit') or 50)
+    except (TypeError, ValueError):
+        raise ViewportError("'offset' and 'limit' must be integers.")
+    if offset < 0 or not 0 < limit <= MAX_VIEWPORT_ROWS:
+        raise ViewportError(f"'offset' must be >= 0 and 'limit' between 1 and {MAX_VIEWPORT_ROWS}.")
+    spec = {
+        'strategy': data.get('strategy'),
+        'sort': 'symbol' if sort == 'symbol' else _field(sort),
+        'descending': bool(data.get('descending')),
+        'filters': {_field(field): str(expression).strip() for field, expression in filters.items() if str(expression).strip()},
+        'search': str(data.get('search') or '').strip().upper(),
+        'offset': offset,
+        'limit': limit,
+    }
+    for expression in spec['filters'].values():
+        parse_filter(expression)
+    return spec
+
+
+def viewport_key(spec):
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def viewport_room(key):
+    return f"viewport:{key}"
+
+
+class Viewport:
+    """One distinct view spec: its current window and the inputs it was computed from."""
+
+    def __init__(self, key, spec):
+        self.key = key
+        self.spec = spec
+        self.filters = [(field, parse_filter(expression)) for field, expression in spec['filters'].items()]
+        self.fields = {spec['sort']} | set(spec['filters']) # Changes to these can reorder the window
+        self.window = None # Ordered symbols in the window; None until first computed
+        self.total = 0 # Matching rows, whether in the window or not
+        self._rows_source = None
+        self._rows = None
+        self._search_mask = None
+        self._symbol_rank = None
+
+    def _source(self, arrays, members):
+        strategy = self.spec['strategy']
+        return (arrays.symbols, members.get(strategy) if strategy is not None else None)
+
+    def is_stale(self, arrays, members):
+        """True when the universe or the strategy's membership changed since the last compute."""
+        source = self._source(arrays, members)
+        return self._rows_source is None or any(a is not b for a, b in zip(self._rows_source, source))
+
+    def _member_rows(self, arrays, members):
+        """Row indices of the view's strategy (all rows without one), cached per universe/membership."""
+        strategy = self.spec['strategy']
+        source = self._source(arrays, members)
+        if self.is_stale(arrays, members):
+            if strategy is None:
+                rows = np.arange(len(arrays))
+            else:
+                rows = np.array([arrays.index[s] for s in members.get(strategy, ()) if s in arrays.index], dtype=int)
+            self._rows_source, self._rows = source, rows
+            search = self.spec['search']
+            self._search_mask = np.array([search in arrays.symbols[i].upper() for i in rows], dtype=bool) if search else None
+            self._symbol_rank = None
+        return self._rows
+
+    def _sort_key(self, arrays, rows):
+        if self.spec['sort'] == 'symbol':
+            if self._symbol_rank is None:
+                names = [arrays.symbols[i] for i in rows]
+                rank = np.empty(len(rows))
+                rank[np.argsort(names, kind='stable')] = np.arange(len(rows))
+                self._symbol_rank = rank
+            return self._symbol_rank
+        return arrays[self.spec['sort']][rows]
+
+    def compute(self, arrays, members):
+        """Re-ranks the view; returns (ordered window symbols, total matching rows)."""
+        rows = self._member_rows(arrays, members)
+        mask = np.ones(len(rows), dtype=bool) if self._search_mask is None else self._search_mask.copy()
+        with np.errstate(invalid='ignore'):
+            for field, test in self.filters:
+                mask &= test(arrays[field][rows])
+        candidates = np.flatnonzero(mask)
+        total = len(candidates)
+        key = self._sort_key(arrays, rows)[candidates].astype(float)
+        if self.spec['descending']:
+            key = -key
+        key[np.isnan(key)] = np.inf # Missing values sort last either way
+
+        end = min(total, self.spec['offset'] + self.spec['limit'])
+        if end == 0:
+            return [], total
+        if end < total:
+            # Only rows up to the window's end need ordering: everything at or below the end-th key
+            kth = np.partition(key, end - 1)[end - 1]
+            picked = np.flatnonzero(key <= kth)
+        else:
+            picked = np.arange(total)
+        order = picked[np.lexsort((candidates[picked], key[picked]))][self.spec['offset']:end]
+        return [arrays.symbols[rows[candidates[i]]] for i in order], total
+
+    def snapshot(self, arrays, members, row_for):
+        """The full window for a new subscriber: {'view', 'total', 'order', 'rows': {symbol: row}}."""
+        if self.window is None or self.is_stale(arrays, members):
+            self.window, self.total = self.compute(arrays, members)
+        return {
+            'view': self.key,
+            'total': self.total,
+            'order': self.window,
+            'rows': {symbol: row_for(symbol) for symbol in self.window},
+        }
+
+
+class ViewportRegistry:
+    """
+    Distinct views and which sessions (under which client ids) watch them.
+    `delta_fields` are the fields whose changes update() is told about.
+    """
+
+    def __init__(self, delta_fields):
+        self.delta_fields = set(delta_fields)
+        self._lock = threading.Lock()
+        self.views = {} # {key: Viewport}
+        self._subscribers = {} # {key: {(sid, client_id)}}
+        self._sessions = {} # {sid: {client_id: key}}
+
+    def subscribe(self, sid, client_id, data):
+        """
+        Points the session's viewport `client_id` at the view for `data`.
+        Returns (view, key_to_leave or None, is_new_view). Raises ViewportError.
+        """
+        spec = normalize_spec(data)
+        key = viewport_key(spec)
+        with self._lock:
+            old_key = self._sessions.get(sid, {}).get(client_id)
+            if old_key == key:
+                return self.views[key], None, False
+            leave = self._drop(sid, client_id) if old_key else None
+            is_new = key not in self.views
+            if is_new:
+                self.views[key] = Viewport(key, spec)
+            self._subscribers.setdefault(key, set()).add((sid, client_id))
+            self._sessions.setdefault(sid, {})[client_id] = key
+            # Leave the old room only if no other viewport of this session still uses it
+            if leave and leave in self._sessions[sid].values():
+                leave = None
+            return self.views[key], leave, is_new
+
+    def unsubscribe(self, sid, client_id):
+        """Returns the view key whose room the session should leave, or None."""
+        with self._lock:
+            key = self._drop(sid, client_id)
+            if key and key in self._sessions.get(sid, {}).values():
+                return None
+            return key
+
+    def unregister(self, sid):
+        with self._lock:
+            for client_id in list(self._sessions.get(sid, {})):
+                self._drop(sid, client_id)
+            self._sessions.pop(sid, None)
+
+    def _drop(self, sid, client_id):
+        key = self._sessions.get(sid, {}).pop(client_id, None)
+        if key is None:
+            return None
+        subscribers = self._subscribers.get(key)
+        if subscribers is not None:
+            subscribers.discard((sid, client_id))
+            if not subscribers:
+                del self._subscribers[key]
+                del self.views[key]
+        return key
+
+    def client_ids(self, sid, key):
+        """The session's client ids that point at view `key`."""
+        with self._lock:
+            return [client_id for client_id, k in self._sessions.get(sid, {}).items() if k == key]
+
+    def update(self, arrays, members, deltas, row_for):
+        """
+        Advances every view by one cycle of {symbol: changed fields}. Returns
+        [(view, payload)] for the views with something to send, payload being
+        {'view', 'total', 'order' (or None), 'entered': {symbol: row}, 'left': [...], 'changed': {symbol: fields}}.
+        """
+        with self._lock:
+            views = list(self.views.values())
+        touched_fields = set()
+        for fields in deltas.values():
+            touched_fields.update(fields)
+
+        updates = []
+        for view in views:
+            old_window = view.window or []
+            untracked = view.fields - self.delta_fields - {'symbol'}
+            if view.window is None or untracked or view.fields & touched_fields or view.is_stale(arrays, members):
+                window, total = view.compute(arrays, members)
+            else:
+                window, total = old_window, view.total
+            old_set, new_set = set(old_window), set(window)
+            entered = {symbol: row_for(symbol) for symbol in window if symbol not in old_set}
+            left = [symbol for symbol in old_window if symbol not in new_set]
+            changed = {symbol: deltas[symbol] for symbol in window if symbol in old_set and symbol in deltas}
+            order = window if window != old_window else None
+            view.window, previous_total, view.total = window, view.total, total
+            if entered or left or changed or order is not None or total != previous_total:
+                updates.append((view, {
+                    'view': view.key,
+                    'total': total,
+                    'order': order,
+                    'entered': entered,
+                    'left': left,
+                    'changed': changed,
+                }))
+        return updates
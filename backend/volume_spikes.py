@@ -0,0 +1,125 @@
+"""
+Rolling-window volume spike detection over [symbol x window] ring buffers.
+
+Each symbol owns a row of a ring buffer holding its most recent closed-candle
+volumes. For every configured lookback the detector keeps a rolling sum and
+sum of squares per symbol, so mean and standard deviation of the previous
+`lookback` candles are O(1) to read and O(1) to update. All candles that
+closed in a cycle are evaluated and pushed in one vectorized step.
+"""
+
+import numpy as np
+
+# The original detector: current candle > 2.5x the average of the previous 9
+DEFAULT_SPIKE_RULES = [
+    {'lookback': 9, 'multiplier': 2.5},
+]
+
+# Rolling sums are recomputed exactly from the buffer every N pushes to stop float drift
+RESYNC_EVERY = 500
+
+
+class VolumeSpikeDetector:
+    """
+    Detects closed-candle volume spikes against several lookbacks at once.
+
+    A rule is a dict with a 'lookback' and either a 'multiplier' (current >
+    multiplier x mean) or a 'zscore' (current > mean + zscore x std), or both.
+    """
+
+    def __init__(self, rules=None, initial_capacity=1024):
+        self.rules = [dict(rule) for rule in (rules if rules is not None else DEFAULT_SPIKE_RULES)]
+        for rule in self.rules:
+            if rule['lookback'] < 1 or not ('multiplier' in rule or 'zscore' in rule):
+                raise ValueError(f"Invalid volume spike rule: {rule}")
+        self.lookbacks = sorted({rule['lookback'] for rule in self.rules})
+        self.window = max(self.lookbacks)
+
+        self.index = {}
+        self.buffer = np.zeros((initial_capacity, self.window))
+        self.position = np.zeros(initial_capacity, dtype=np.int64)  # Next slot to write
+        self.count = np.zeros(initial_capacity, dtype=np.int64)     # Candles seen (capped at window)
+        self.sums = {lookback: np.zeros(initial_capacity) for lookback in self.lookbacks}
+        self.sumsqs = {lookback: np.zeros(initial_capacity) for lookback in self.lookbacks}
+        self._pushes = 0
+
+    def _rows_for(self, symbols):
+        rows = []
+        for symbol in symbols:
+            row = self.index.get(symbol)
+            if row is None:
+                row = self.index[symbol] = len(self.index)
+            rows.append(row)
+        if len(self.index) > len(self.position):
+            self._grow(len(self.index))
+        return np.array(rows, dtype=np.int64)
+
+    def _grow(self, needed):
+        capacity = max(needed, 2 * len(self.position))
+        extra = capacity - len(self.position)
+        self.buffer = np.vstack([self.buffer, np.zeros((extra, self.window))])
+        self.position = np.concatenate([self.position, np.zeros(extra, dtype=np.int64)])
+        self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+        for lookback in self.lookbacks:
+            self.sums[lookback] = np.concatenate([self.sums[lookback], np.zeros(extra)])
+            self.sumsqs[lookback] = np.concatenate([self.sumsqs[lookback], np.zeros(extra)])
+
+    def evaluate(self, symbols, volumes):
+        """
+        Checks the just-closed candle of each symbol against its history, then records it.
+
+        symbols/volumes are parallel sequences with at most one entry per symbol.
+        Returns a list of (symbol, rule, current_volume, average_volume, zscore).
+        """
+        if not len(symbols):
+            return []
+        rows = self._rows_for(symbols)
+        current = np.asarray(volumes, dtype=float)
+        count = self.count[rows]
+
+        fired = []
+        for rule in self.rules:
+            lookback = rule['lookback']
+            mean = self.sums[lookback][rows] / lookback
+            variance = np.maximum(self.sumsqs[lookback][rows] / lookback - mean * mean, 0.0)
+            std = np.sqrt(variance)
+
+            spike = (count >= lookback) & (mean > 0)
+            if 'multiplier' in rule:
+                spike &= current > mean * rule['multiplier']
+            if 'zscore' in rule:
+                spike &= current > mean + rule['zscore'] * std
+            with np.errstate(divide='ignore', invalid='ignore'):
+                zscore = np.where(std > 0, (current - mean) / std, np.inf)
+            for k in np.flatnonzero(spike):
+                fired.append((symbols[k], rule, current[k], mean[k], zscore[k]))
+
+        self._push(rows, current)
+        return fired
+
+    def _push(self, rows, current):
+        position = self.position[rows]
+        for lookback in self.lookbacks:
+            # The value leaving this lookback's window (zero until the window has filled)
+            outgoing = self.buffer[rows, (position - lookback) % self.window]
+            outgoing = np.where(self.count[rows] >= lookback, outgoing, 0.0)
+            self.sums[lookback][rows] += current - outgoing
+            self.sumsqs[lookback][rows] += current * current - outgoing * outgoing
+
+        self.buffer[rows, position] = current
+        self.position[rows] = (position + 1) % self.window
+        self.count[rows] = np.minimum(self.count[rows] + 1, self.window)
+
+        self._pushes += 1
+        if self._pushes % RESYNC_EVERY == 0:
+            self._resync()
+
+    def _resync(self):
+        """Recomputes every rolling sum exactly from the ring buffer."""
+        for lookback in self.lookbacks:
+            # Offsets 1..lookback behind the write position, i.e. the newest `lookback` values
+            offsets = (self.position[:, None] - np.arange(1, lookback + 1)[None, :]) % self.window
+            values = np.take_along_axis(self.buffer, offsets, axis=1)
+            values = np.where(np.arange(1, lookback + 1)[None, :] <= self.count[:, None], values, 0.0)
+            self.sums[lookback] = values.sum(axis=1)
+            self.sumsqs[lookback] = (values * values).sum(axis=1)
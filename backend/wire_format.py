@@ -0,0 +1,110 @@
+"""
+Opt-in binary (MessagePack) encoding of the bulk data events.
+
+Clients stay on JSON unless they ask for 'msgpack' and the server has the
+msgpack package. Binary payloads are columnar and use integer key ids:
+
+    {
+        'v': 1,
+        's': [symbol, ...],                       # each symbol once
+        'g': {strategy: [row, ...]},              # group membership by row
+        'f': {key_id: [[row, ...], [value, ...]]} # sparse columns, one per field
+    }
+
+A symbol tagged with several strategies is encoded once, and field names are
+replaced by ids from a KeyDictionary. The dictionary is append-only: a session
+receives all keys when it switches to msgpack and any keys added later in a
+'wire_keys' event sent before the first payload that uses them.
+"""
+
+import json
+import threading
+
+try:
+    import msgpack
+    msgpack_available = True
+except ImportError:
+    msgpack = None
+    msgpack_available = False
+
+FORMAT_VERSION = 1
+ENCODINGS = ['json', 'msgpack']
+
+
+class KeyDictionary:
+    """Append-only field name -> integer id mapping shared by every msgpack session."""
+
+    def __init__(self, keys=()):
+        self._lock = threading.Lock()
+        self.keys = []
+        self.ids = {}
+        self._announced = 0  # Keys already sent to sessions
+        for key in keys:
+            self.id_for(key)
+
+    def id_for(self, key):
+        key_id = self.ids.get(key)
+        if key_id is None:
+            with self._lock:
+                key_id = self.ids.get(key)
+                if key_id is None:
+                    key_id = self.ids[key] = len(self.keys)
+                    self.keys.append(key)
+        return key_id
+
+    def take_new_keys(self):
+        """Keys added since the last call as {id: key} (to announce to existing sessions)."""
+        with self._lock:
+            new_keys = {i: self.keys[i] for i in range(self._announced, len(self.keys))}
+            self._announced = len(self.keys)
+            return new_keys
+
+    def all_keys(self):
+        with self._lock:
+            return dict(enumerate(self.keys))
+
+
+def to_columnar(groups, key_dictionary):
+    """Converts {strategy: {symbol: {field: value}}} into the columnar payload dict."""
+    rows = {}
+    symbols = []
+    membership = {}
+    columns = {}
+    for strategy, group in groups.items():
+        members = membership[strategy] = []
+        for symbol, fields in group.items():
+            row = rows.get(symbol)
+            if row is None:
+                # First sighting of the symbol: its fields go into the columns once
+                row = rows[symbol] = len(symbols)
+                symbols.append(symbol)
+                for field, value in fields.items():
+                    column = columns.get(field)
+                    if column is None:
+                        column = columns[field] = ([], [])
+                    column[0].append(row)
+                    column[1].append(value)
+            members.append(row)
+    return {
+        'v': FORMAT_VERSION,
+        's': symbols,
+        'g': membership,
+        'f': {key_dictionary.id_for(field): [column[0], column[1]] for field, column in columns.items()},
+    }
+
+
+def encode_groups(groups, encoding, key_dictionary=None):
+    """Encodes a strategy-grouped payload for the given encoding (dict for JSON, bytes for msgpack)."""
+    if encoding == 'msgpack':
+        return msgpack.packb(to_columnar(groups, key_dictionary), use_bin_type=True)
+    return groups
+
+
+def json_bytes(payload):
+    """The compact JSON encoding of a payload (as Socket.IO serializes it)."""
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+
+def json_size(payload):
+    """Bytes the JSON encoding of a payload takes on the wire."""
+    return len(json_bytes(payload))
@@ -33,6 +33,25 @@ interface AllStrategies {
   [strategyName: string]: StrategyGroup;
 }
 
+// initial_data envelope: the serialized snapshot, shared byte-for-byte by every client of the same view
+interface InitialSnapshot {
+  version: number;
+  epoch: string;
+  encoding: 'json' | 'msgpack';
+  compression: 'gzip' | null;
+  data: ArrayBuffer;
+}
+
+// data_update: changed fields only, grouped by strategy.
+// universe_update (CSV reload) has the same shape plus the rows leaving each group.
+interface DataUpdate {
+  seq: number;
+  epoch: string;
+  data: Record<string, Record<string, Partial<StockData>>>;
+  resync?: boolean;
+  removed?: Record<string, string[]>;
+}
+
 // --- Socket.io Connection ---
 // Connect to the backend Flask-SocketIO server
 const socket = io('http://localhost:5000', {
@@ -57,6 +76,46 @@ const playSystemAlertSound = () => {
   });
 };
 
+// Ask for gzipped snapshots when the browser can inflate them natively
+const SNAPSHOT_COMPRESSION = typeof DecompressionStream !== 'undefined' ? 'gzip' : null;
+
+const decodeSnapshot = async (snapshot: InitialSnapshot): Promise<AllStrategies> => {
+  let bytes: Blob = new Blob([snapshot.data]);
+  if (snapshot.compression === 'gzip') {
+    bytes = await new Response(bytes.stream().pipeThrough(new DecompressionStream('gzip'))).blob();
+  }
+  return JSON.parse(await bytes.text());
+};
+
+// Drops the rows an update removes, then merges its changed fields into each stock
+// (creating strategy groups as needed; a group left empty is dropped)
+const applyUpdate = (strategies: AllStrategies, update: DataUpdate): AllStrategies => {
+  const newStrategies = { ...strategies };
+  for (const strategyName in update.removed || {}) {
+    if (!newStrategies[strategyName]) {
+      continue;
+    }
+    const group = { ...newStrategies[strategyName] };
+    for (const symbol of update.removed![strategyName]) {
+      delete group[symbol];
+    }
+    if (Object.keys(group).length) {
+      newStrategies[strategyName] = group;
+    } else {
+      delete newStrategies[strategyName];
+    }
+  }
+  const updatedStrategies = update.data;
+  for (const strategyName in updatedStrategies) {
+    const group = { ...(newStrategies[strategyName] || {}) };
+    for (const symbol in updatedStrategies[strategyName]) {
+      group[symbol] = { ...group[symbol], ...updatedStrategies[strategyName][symbol] } as StockData;
+    }
+    newStrategies[strategyName] = group;
+  }
+  return newStrategies;
+};
+
 // --- Column Configuration ---
 const ALL_COLUMNS: { key: keyof StockData; label: string; isNumeric?: boolean }[] = [
   { key: 'symbol', label: 'Symbol' },
@@ -118,9 +177,24 @@ function App() {
   const [isSettingsPanelOpen, setIsSettingsPanelOpen] = useState(false);
   const [alertSettings, setAlertSettings] = useState({
     pdh_cross: true,
+    pdl_break: true,
     positive_5min_open: true,
     volume_spike: true,
   });
+  // Latest settings, re-sent on every (re)connect since the server keeps them per session
+  const alertSettingsRef = useRef(alertSettings);
+  alertSettingsRef.current = alertSettings;
+  // Seconds between data updates; the server merges changes in between (and may slow a lagging client down)
+  const [updateInterval, setUpdateInterval] = useState(1);
+  const updateIntervalRef = useRef(updateInterval);
+  updateIntervalRef.current = updateInterval;
+  // Sequence number of the last snapshot/update applied; on reconnect only later changes are requested
+  const lastSeqRef = useRef<number | null>(null);
+  // Server epoch that sequence numbers belong to; a restarted server has a new one and sends a full snapshot
+  const epochRef = useRef<string | null>(null);
+  // Updates that arrive while a snapshot is still being decoded; replayed on top of it (null = none decoding)
+  const pendingUpdatesRef = useRef<DataUpdate[] | null>(null);
+  const snapshotCountRef = useRef(0);
 
   const handleResetLayout = () => {
     setLayoutResetKey(prevKey => prevKey + 1);
@@ -131,7 +205,9 @@ function App() {
     socket.on('connect', () => {
       setStatus('Connected');
       console.log('Socket connected, requesting initial data and alerts...');
-      socket.emit('request_initial_data');
+      socket.emit('update_alert_settings', alertSettingsRef.current);
+      socket.emit('set_update_interval', { interval: updateIntervalRef.current });
+      socket.emit('request_initial_data', { compression: SNAPSHOT_COMPRESSION, since: lastSeqRef.current, epoch: epochRef.current });
       socket.emit('get_alerts');
     });
 
@@ -140,91 +216,144 @@ function App() {
       console.log('Socket disconnected.');
     });
 
-    socket.on('initial_data', (data: AllStrategies) => {
-      console.log('Received initial data:', data);
-      setStrategies(data);
-      setStatus('Connected');
-      setLastUpdateTime(new Date());
-    });
-
-    socket.on('stock_update', (updatedStrategies: AllStrategies) => {
-      // Create a new state object to ensure React re-renders
-      setStrategies(prevStrategies => {
-        const newStrategies = { ...prevStrategies };
-        for (const strategyName in updatedStrategies) {
-          if (!newStrategies[strategyName]) {
-            newStrategies[strategyName] = {}; // Create strategy group if new
-          }
-          // Merge updated stocks into the existing strategy group
-          newStrategies[strategyName] = {
-            ...newStrategies[strategyName],
-            ...updatedStrategies[strategyName],
-          };
+    socket.on('initial_data', (snapshot: InitialSnapshot) => {
+      // Decoding is async and live updates keep coming meanwhile: hold them back until the
+      // snapshot is in place, then replay the ones newer than it. Only the latest snapshot applies.
+      const snapshotNumber = ++snapshotCountRef.current;
+      if (pendingUpdatesRef.current === null) {
+        pendingUpdatesRef.current = [];
+      }
+      decodeSnapshot(snapshot).then(data => {
+        if (snapshotNumber !== snapshotCountRef.current) {
+          return;
+        }
+        console.log(`Received initial data v${snapshot.version}:`, data);
+        // An update from a newer epoch (a universe reload) always postdates the snapshot
+        const newer = (pendingUpdatesRef.current || []).filter(
+          update => update.epoch !== snapshot.epoch || update.seq > snapshot.version
+        );
+        pendingUpdatesRef.current = null;
+        setStrategies(newer.reduce(applyUpdate, data));
+        epochRef.current = snapshot.epoch;
+        lastSeqRef.current = newer.length ? newer[newer.length - 1].seq : snapshot.version;
+        setStatus('Connected');
+        setLastUpdateTime(new Date());
+      }).catch(error => {
+        console.error('Failed to decode initial data:', error);
+        if (snapshotNumber !== snapshotCountRef.current) {
+          return;
+        }
+        // Keep what was held back rather than losing it
+        const held = pendingUpdatesRef.current || [];
+        pendingUpdatesRef.current = null;
+        setStrategies(prevStrategies => held.reduce(applyUpdate, prevStrategies));
+        if (held.length) {
+          epochRef.current = held[held.length - 1].epoch;
+          lastSeqRef.current = held[held.length - 1].seq;
         }
-        return newStrategies;
       });
+    });
+
+    const handleUpdate = (update: DataUpdate) => {
+      if (pendingUpdatesRef.current !== null) {
+        pendingUpdatesRef.current.push(update);
+        return;
+      }
+      epochRef.current = update.epoch;
+      lastSeqRef.current = update.seq;
+      setStrategies(prevStrategies => applyUpdate(prevStrategies, update));
       setLastUpdateTime(new Date());
+    };
+
+    socket.on('data_update', (update: DataUpdate) => {
+      // Updates carry only the fields that changed; merge them into each stock.
+      // A resync update is every change missed while disconnected, merged into one.
+      if (update.resync) {
+        console.log(`Resynced to seq ${update.seq}.`);
+      }
+      handleUpdate(update);
+    });
+
+    socket.on('universe_update', (update: DataUpdate) => {
+      // The universe CSV was reloaded: new and moved rows come in full, rows that stayed
+      // carry their changed static fields, and `removed` lists the rows leaving each group
+      console.log(`Universe reloaded at seq ${update.seq}.`);
+      handleUpdate(update);
     });
 
     // --- Alert System Listeners ---
-    socket.on('update_alerts', (receivedAlerts: Alert[]) => {
-      console.log('Received updated alerts:', receivedAlerts);
-      setAlerts(receivedAlerts);
+    socket.on('update_alerts', (delta: { full: boolean; upserts: Alert[]; removed: number[] }) => {
+      // A full snapshot replaces the list; otherwise merge the changed alerts in by id
+      setAlerts(prevAlerts => {
+        if (delta.full) {
+          return delta.upserts;
+        }
+        const byId = new Map(prevAlerts.map(existing => [existing.id, existing]));
+        delta.removed.forEach(id => byId.delete(id));
+        delta.upserts.forEach(changed => byId.set(changed.id, changed));
+        return Array.from(byId.values());
+      });
     });
 
-    socket.on('alert_triggered', (triggeredAlert: Alert) => {
-      // Play the audio cue for the alert
+    socket.on('alerts_triggered', (triggeredAlerts: Array<{ id: number; symbol: string; message: string }>) => {
+      // One sound and one notification per batch
       playPriceAlertSound();
 
-      // Find the clean symbol name for the notification
-      const symbolTofind = triggeredAlert.symbol.replace('NSE:', '').replace('-EQ', '');
       const allStocks = Object.values(strategies).flatMap(group => Object.values(group));
-      const stockInfo = allStocks.find(stock => stock.symbol.includes(symbolTofind));
-      const cleanSymbol = stockInfo ? stockInfo.symbol : triggeredAlert.symbol;
+      const lines = triggeredAlerts.map(triggered => {
+        // Find the clean symbol name for the notification
+        const symbolTofind = triggered.symbol.replace('NSE:', '').replace('-EQ', '');
+        const stockInfo = allStocks.find(stock => stock.symbol.includes(symbolTofind));
+        const cleanSymbol = stockInfo ? stockInfo.symbol : triggered.symbol;
+        return `${cleanSymbol}: ${triggered.message}`;
+      });
 
-      alert(
-        `🔔 ALERT TRIGGERED! 🔔\n\n` +
-        `Symbol: ${cleanSymbol}\n` +
-        `Condition: Price ${triggeredAlert.operator} ${triggeredAlert.value}`
-      );
+      alert(`🔔 ALERT TRIGGERED! 🔔\n\n` + lines.join('\n'));
     });
 
-    socket.on('system_alert_triggered', (systemAlert: {
+    socket.on('system_alerts_triggered', (systemAlerts: Array<{
       type: string;
       symbol: string;
       message: string;
       timestamp: string;
-    }) => {
-      // Play system alert sound
+    }>) => {
+      // Play system alert sound once per batch
       playSystemAlertSound();
 
-      // Add toast to the stack
-      const toastId = Date.now();
-      setToastMessages(prev => [...prev, { id: toastId, message: systemAlert.message }]);
-      
-      // Auto-hide toast after 5 seconds
-      setTimeout(() => {
-        setToastMessages(prev => prev.filter(toast => toast.id !== toastId));
-      }, 5000);
+      systemAlerts.forEach((systemAlert, index) => {
+        // Add toast to the stack
+        const toastId = Date.now() + index;
+        setToastMessages(prev => [...prev, { id: toastId, message: systemAlert.message }]);
+
+        // Auto-hide toast after 5 seconds
+        setTimeout(() => {
+          setToastMessages(prev => prev.filter(toast => toast.id !== toastId));
+        }, 5000);
+      });
 
-      console.log('System Alert:', systemAlert);
+      console.log('System Alerts:', systemAlerts);
     });
 
-    socket.on('system_alert_history', (history: Array<{
-      type: string;
-      symbol: string;
-      message: string;
-      timestamp: string;
-      pdh_value?: number;
-      trigger_price?: number;
-      open_price?: number;
-      close_price?: number;
-      gain_percent?: number;
-      current_volume?: number;
-      average_volume?: number;
-      spike_factor?: number;
-    }>) => {
-      setSystemAlertHistory(history);
+    socket.on('system_alert_history', (page: {
+      alerts: Array<{
+        type: string;
+        symbol: string;
+        message: string;
+        timestamp: string;
+        pdh_value?: number;
+        trigger_price?: number;
+        open_price?: number;
+        close_price?: number;
+        gain_percent?: number;
+        current_volume?: number;
+        average_volume?: number;
+        spike_factor?: number;
+      }>;
+      latest_seq: number;
+      oldest_seq: number;
+      has_more: boolean;
+    }) => {
+      setSystemAlertHistory(page.alerts);
     });
 
     // --- Cleanup on component unmount ---
@@ -232,10 +361,11 @@ function App() {
       socket.off('connect');
       socket.off('disconnect');
       socket.off('initial_data');
-      socket.off('stock_update');
+      socket.off('data_update');
+      socket.off('universe_update');
       socket.off('update_alerts');
-      socket.off('alert_triggered');
-      socket.off('system_alert_triggered');
+      socket.off('alerts_triggered');
+      socket.off('system_alerts_triggered');
       socket.off('system_alert_history');
     };
   }, [strategies]);
@@ -369,6 +499,11 @@ function App() {
     });
   };
 
+  const handleUpdateIntervalChange = (interval: number) => {
+    setUpdateInterval(interval);
+    socket.emit('set_update_interval', { interval });
+  };
+
   return (
     <>
       <style>{`
@@ -629,6 +764,8 @@ function App() {
           onClose={() => setIsSettingsPanelOpen(false)}
           settings={alertSettings}
           onSettingChange={handleAlertSettingChange}
+          updateInterval={updateInterval}
+          onUpdateIntervalChange={handleUpdateIntervalChange}
         />
       </div>
     </>
@@ -1206,15 +1343,20 @@ const StockRow = ({ stock, columns, columnWidths }: {
 };
 
 // --- Settings Panel Component ---
-const SettingsPanel = ({ isOpen, onClose, settings, onSettingChange }: {
+const UPDATE_INTERVALS = [1, 2, 5]; // Seconds, as supported by the server
+
+const SettingsPanel = ({ isOpen, onClose, settings, onSettingChange, updateInterval, onUpdateIntervalChange }: {
   isOpen: boolean;
   onClose: () => void;
   settings: {
     pdh_cross: boolean;
+    pdl_break: boolean;
     positive_5min_open: boolean;
     volume_spike: boolean;
   };
   onSettingChange: (setting: keyof typeof settings) => void;
+  updateInterval: number;
+  onUpdateIntervalChange: (interval: number) => void;
 }) => {
   return (
     <div style={{ ...styles.settingsPanel, transform: isOpen ? 'translateX(0)' : 'translateX(100%)' }}>
@@ -1228,6 +1370,11 @@ const SettingsPanel = ({ isOpen, onClose, settings, onSettingChange }: {
           isOn={settings.pdh_cross}
           onToggle={() => onSettingChange('pdh_cross')}
         />
+        <SwitchToggle
+          label="PDL Broken"
+          isOn={settings.pdl_break}
+          onToggle={() => onSettingChange('pdl_break')}
+        />
         <SwitchToggle
           label="Positive 5-Min Open"
           isOn={settings.positive_5min_open}
@@ -1238,6 +1385,14 @@ const SettingsPanel = ({ isOpen, onClose, settings, onSettingChange }: {
           isOn={settings.volume_spike}
           onToggle={() => onSettingChange('volume_spike')}
         />
+        <div style={styles.switchContainer}>
+          <span style={styles.switchLabel}>Update Interval</span>
+          <select value={updateInterval} onChange={e => onUpdateIntervalChange(Number(e.target.value))}>
+            {UPDATE_INTERVALS.map(interval => (
+              <option key={interval} value={interval}>{interval}s</option>
+            ))}
+          </select>
+        </div>
       </div>
     </div>
   );